@@ -1,5 +1,6 @@
 set -o errexit
 
 pip install -r requirements.txt
+python manage.py build_assets
 python manage.py collectstatic --noinput
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
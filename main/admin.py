@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import ServiceType, Customer, Barber, Schedule, Reservation
+from django.utils import timezone
+from .models import ServiceType, Customer, Barber, Schedule, Reservation, ArchivedReservation
+from .querycache import bump_version
+from . import calendar_feed, rollups
 
 
 class CustomerInline(admin.StackedInline):
@@ -72,11 +75,13 @@ class ServiceTypeAdmin(admin.ModelAdmin):
     
     def make_active(self, request, queryset):
         updated = queryset.update(is_active=True)
+        bump_version(ServiceType)  # bulk update() skips post_save
         self.message_user(request, f'{updated} services marked as active.')
     make_active.short_description = "Mark selected services as active"
     
     def make_inactive(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_version(ServiceType)  # bulk update() skips post_save
         self.message_user(request, f'{updated} services marked as inactive.')
     make_inactive.short_description = "Mark selected services as inactive"
 
@@ -178,11 +183,13 @@ class BarberAdmin(admin.ModelAdmin):
     
     def make_available(self, request, queryset):
         updated = queryset.update(is_available_for_booking=True)
+        bump_version(Barber)  # bulk update() skips post_save
         self.message_user(request, f'{updated} barbers marked as available for booking.')
     make_available.short_description = "Mark selected barbers as available"
     
     def make_unavailable(self, request, queryset):
         updated = queryset.update(is_available_for_booking=False)
+        bump_version(Barber)  # bulk update() skips post_save
         self.message_user(request, f'{updated} barbers marked as unavailable for booking.')
     make_unavailable.short_description = "Mark selected barbers as unavailable"
 
@@ -251,6 +258,15 @@ class ScheduleAdmin(admin.ModelAdmin):
     make_unavailable.short_description = "Mark selected schedules as unavailable"
 
 
+def _bulk_update_scope(queryset):
+    """
+    Days touched by a bulk update, so their daily rollups can be rebuilt, and
+    the barbers whose calendar feeds must be bumped
+    """
+    rows = list(queryset.values_list('appointment_datetime', 'barber_id'))
+    return {timezone.localdate(value) for value, _ in rows}, {barber_id for _, barber_id in rows}
+
+
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_customer_name', 'get_barber_name', 'appointment_datetime', 
@@ -307,12 +323,20 @@ class ReservationAdmin(admin.ModelAdmin):
     actions = ['confirm_reservations', 'mark_completed', 'send_reminders']
     
     def confirm_reservations(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='confirmed')
+        pending = queryset.filter(status='pending')
+        touched, barbers = _bulk_update_scope(pending)
+        updated = pending.update(status='confirmed')
+        rollups.rebuild(touched)
+        calendar_feed.bump(barbers)
         self.message_user(request, f'{updated} reservations confirmed.')
     confirm_reservations.short_description = "Confirm selected reservations"
     
     def mark_completed(self, request, queryset):
-        updated = queryset.filter(status='confirmed').update(status='completed')
+        confirmed = queryset.filter(status='confirmed')
+        touched, barbers = _bulk_update_scope(confirmed)
+        updated = confirmed.update(status='completed')
+        rollups.rebuild(touched)
+        calendar_feed.bump(barbers)
         self.message_user(request, f'{updated} reservations marked as completed.')
     mark_completed.short_description = "Mark selected reservations as completed"
     
@@ -330,7 +354,24 @@ class ReservationAdmin(admin.ModelAdmin):
     send_reminders.short_description = "Send reminders for selected reservations"
 
 
+@admin.register(ArchivedReservation)
+class ArchivedReservationAdmin(admin.ModelAdmin):
+    """Read-only view of reservations moved out by archive_reservations"""
+    list_display = ('id', 'customer', 'barber', 'appointment_datetime', 'service_type', 'status', 'price', 'archived_at')
+    list_filter = ('status', 'booking_source', 'service_type')
+    search_fields = ('customer__user__username', 'barber__user__username')
+    date_hierarchy = 'appointment_datetime'
+    list_select_related = ('customer__user', 'barber__user', 'service_type')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Customize admin site header
 admin.site.site_header = "Haircut Booking System Administration"
 admin.site.site_title = "Booking Admin"
 admin.site.index_title = "Welcome to Haircut Booking Administration"
+
@@ -0,0 +1,181 @@
+"""
+Barber utilization heatmap.
+
+utilization[barber][weekday][hour] = booked minutes / available minutes over
+a date range. Bookings (live and archived) are grouped in SQL by (barber,
+weekday, start minute, duration), so the database returns a few hundred rows
+however many reservations there are. Availability comes from WeeklyAvailability with the
+Schedule overrides applied day by day. Both sides are then spread over the
+24 hour buckets with numpy broadcasting and summed with np.add.at.
+"""
+import hashlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, ExtractMinute
+
+from . import querycache
+from .models import ArchivedReservation, Barber, Reservation, Schedule, WeeklyAvailability
+from .partitioning import datetime_bounds
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HOURS = 24
+MAX_RANGE_DAYS = 366
+
+# Statuses that occupy the chair (a no-show still blocked the slot)
+OCCUPYING_STATUSES = ['pending', 'confirmed', 'in_progress', 'completed', 'no_show']
+
+_HOUR_STARTS = np.arange(HOURS) * 60
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def spread_over_hours(starts, ends):
+    """
+    Minutes of each [start, end) interval (minutes since midnight) falling
+    into each hour of the day; returns an array of shape (len(starts), 24)
+    """
+    starts = np.asarray(starts, dtype=np.int64)[:, None]
+    ends = np.asarray(ends, dtype=np.int64)[:, None]
+    overlap = np.minimum(ends, _HOUR_STARTS + 60) - np.maximum(starts, _HOUR_STARTS)
+    return np.clip(overlap, 0, None)
+
+
+def _accumulate(shape, barber_index, weekdays, starts, ends, weights=None):
+    matrix = np.zeros(shape, dtype=np.int64)
+    if len(starts):
+        minutes = spread_over_hours(starts, ends)
+        if weights is not None:
+            minutes = minutes * np.asarray(weights, dtype=np.int64)[:, None]
+        np.add.at(matrix, (np.asarray(barber_index), np.asarray(weekdays)), minutes)
+    return matrix
+
+
+def _grouped_bookings(model, barber_ids, start, end):
+    return (
+        model.objects.filter(
+            barber_id__in=barber_ids,
+            appointment_datetime__gte=start,
+            appointment_datetime__lt=end,
+            status__in=OCCUPYING_STATUSES,
+        )
+        .annotate(
+            weekday=ExtractIsoWeekDay('appointment_datetime'),
+            start_minute=ExtractHour('appointment_datetime') * 60 + ExtractMinute('appointment_datetime'),
+        )
+        .values('barber_id', 'weekday', 'start_minute', 'duration')
+        .annotate(bookings=Count('id'))
+        .order_by()
+    )
+
+
+def booked_minutes(barber_ids, start_date, end_date):
+    """(barbers, 7, 24) array of booked minutes from grouped live and archived reservation rows"""
+    index = {barber_id: i for i, barber_id in enumerate(barber_ids)}
+    start, end = datetime_bounds(start_date, end_date)
+    # Finished bookings older than RESERVATION_ARCHIVE_DAYS have moved to the archive
+    rows = [
+        row for model in (Reservation, ArchivedReservation)
+        for row in _grouped_bookings(model, barber_ids, start, end)
+    ]
+    return _accumulate(
+        (len(barber_ids), 7, HOURS),
+        [index[row['barber_id']] for row in rows],
+        [row['weekday'] - 1 for row in rows],
+        [row['start_minute'] for row in rows],
+        [row['start_minute'] + row['duration'] for row in rows],
+        [row['bookings'] for row in rows],
+    )
+
+
+def available_minutes(barber_ids, start_date, end_date):
+    """(barbers, 7, 24) array of working minutes: weekly rules, overridden/blocked by Schedule"""
+    index = {barber_id: i for i, barber_id in enumerate(barber_ids)}
+    weekly = {
+        (rule.barber_id, rule.day_of_week): rule
+        for rule in WeeklyAvailability.objects.filter(barber_id__in=barber_ids, is_available=True)
+        if rule.start_time and rule.end_time
+    }
+    overrides, blocks = {}, []
+    for schedule in Schedule.objects.filter(barber_id__in=barber_ids, date__gte=start_date, date__lte=end_date):
+        if schedule.is_available:
+            overrides.setdefault((schedule.barber_id, schedule.date), schedule)
+        else:
+            blocks.append(schedule)
+
+    def window_for(barber_id, day):
+        return overrides.get((barber_id, day)) or weekly.get((barber_id, day.weekday()))
+
+    # Working windows: one per barber and day in the range
+    barber_index, weekdays, starts, ends = [], [], [], []
+    day = start_date
+    while day <= end_date:
+        for barber_id in barber_ids:
+            window = window_for(barber_id, day)
+            if window:
+                barber_index.append(index[barber_id])
+                weekdays.append(day.weekday())
+                starts.append(_minutes(window.start_time))
+                ends.append(_minutes(window.end_time))
+        day += timedelta(days=1)
+    available = _accumulate((len(barber_ids), 7, HOURS), barber_index, weekdays, starts, ends)
+
+    # Blocked time only counts where the barber would otherwise have been working
+    barber_index, weekdays, starts, ends = [], [], [], []
+    for block in blocks:
+        window = window_for(block.barber_id, block.date)
+        if window:
+            barber_index.append(index[block.barber_id])
+            weekdays.append(block.date.weekday())
+            starts.append(max(_minutes(block.start_time), _minutes(window.start_time)))
+            ends.append(min(_minutes(block.end_time), _minutes(window.end_time)))
+    blocked = _accumulate((len(barber_ids), 7, HOURS), barber_index, weekdays, starts, ends)
+    # Overlapping blocks must not push a bucket below zero
+    return np.clip(available - blocked, 0, None)
+
+
+def utilization_matrix(start_date, end_date, barber_ids=None):
+    """JSON-ready heatmap for the range, cached per (range, barbers)"""
+    if barber_ids is None:
+        barber_ids = list(Barber.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+    barber_ids = sorted(barber_ids)
+
+    versions = '.'.join(str(querycache.get_version(model)) for model in (Barber, WeeklyAvailability))
+    barber_key = hashlib.md5(','.join(map(str, barber_ids)).encode()).hexdigest()
+    cache_key = f'analytics:utilization:{start_date}:{end_date}:{barber_key}:{versions}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    booked = booked_minutes(barber_ids, start_date, end_date)
+    available = available_minutes(barber_ids, start_date, end_date)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(available > 0, np.round(booked / available, 3), np.nan)
+
+    names = {
+        barber.id: barber.get_full_name()
+        for barber in Barber.objects.filter(id__in=barber_ids).select_related('user')
+    }
+    result = {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'weekdays': WEEKDAYS,
+        'hours': list(range(HOURS)),
+        'barbers': [
+            {
+                'id': barber_id,
+                'name': names.get(barber_id, ''),
+                'utilization': [[None if np.isnan(v) else float(v) for v in row] for row in ratio[i]],
+                'booked_minutes': booked[i].tolist(),
+                'available_minutes': available[i].tolist(),
+            }
+            for i, barber_id in enumerate(barber_ids)
+        ],
+    }
+    cache.set(cache_key, result, getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 10 * 60))
+    return result
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import calendar_feed, dbpool, querycache, ratelimit, rollups, slowqueries, waitlist
+        dbpool.install()
+        slowqueries.install()
+        querycache.install()
+        ratelimit.install()
+        rollups.install()
+        calendar_feed.install()
+        waitlist.install()
@@ -0,0 +1,149 @@
+"""
+Hot/cold split for reservations.
+
+Finished reservations (completed, cancelled, rejected, no-show) older than
+RESERVATION_ARCHIVE_DAYS are moved from Reservation into ArchivedReservation
+by `python manage.py archive_reservations`, one batch per transaction. The
+live table then only holds recent and upcoming bookings, so its indexes stay
+small. Customer history and the reports read across both tables through the
+helpers below.
+"""
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from . import metrics, rollups
+from .models import ArchivedReservation, Reservation
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled', 'rejected', 'no_show')
+
+# Columns copied verbatim (by attname, so FKs are copied as ids without a join)
+ARCHIVE_FIELDS = [
+    field.attname for field in Reservation._meta.concrete_fields
+]
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'RESERVATION_ARCHIVE_DAYS', 180)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_reservations(cutoff):
+    return Reservation.objects.filter(
+        appointment_datetime__lt=cutoff,
+        status__in=ARCHIVABLE_STATUSES,
+    )
+
+
+def archive_batch(cutoff, batch_size=500):
+    """Move up to `batch_size` reservations in one transaction; returns the number moved"""
+    with transaction.atomic():
+        rows = list(
+            archivable_reservations(cutoff)
+            .select_for_update()
+            .order_by('appointment_datetime', 'id')
+            .values(*ARCHIVE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedReservation.objects.bulk_create(
+            [ArchivedReservation(**row) for row in rows],
+            ignore_conflicts=True,
+        )
+        # The rows still exist (archived), so daily rollups must not subtract them
+        with rollups.paused():
+            Reservation.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    metrics.incr('archive.reservations_moved', len(rows))
+    return len(rows)
+
+
+def archive_reservations(days=None, batch_size=500, max_batches=None):
+    """Archive everything older than the cutoff, batch by batch"""
+    cutoff = archive_cutoff(days)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
+
+
+# -------------------------------
+# READS ACROSS BOTH TABLES
+# -------------------------------
+
+def customer_history(customer, hot_querysets, limit=10, before=None):
+    """
+    Most recent `limit` past bookings for a customer, newest first. Each of
+    `hot_querysets` (live rows, already filtered to the customer's past
+    bookings) and the archive is read with its own index-ordered LIMIT query
+    and the results are merged. `before` is the (appointment_datetime, id)
+    cursor of the last row already shown.
+    """
+    related = ('barber__user', 'service_type')
+    sources = [*hot_querysets, ArchivedReservation.objects.filter(customer=customer)]
+    pages = []
+    for queryset in sources:
+        if before is not None:
+            # A range on appointment_datetime plus a tie-break on id, rather than an OR
+            queryset = queryset.filter(appointment_datetime__lte=before[0]).exclude(
+                appointment_datetime=before[0], id__gte=before[1]
+            )
+        pages.append(list(
+            queryset.select_related(*related).order_by('-appointment_datetime', '-id')[:limit]
+        ))
+    return list(islice(heapq.merge(*pages, key=history_key, reverse=True), limit))
+
+
+def history_key(booking):
+    return booking.appointment_datetime, booking.id
+
+
+def history_cursor(booking):
+    return f'{booking.appointment_datetime.isoformat()}|{booking.id}'
+
+
+def parse_history_cursor(value):
+    """(appointment_datetime, id) from history_cursor(); raises ValueError"""
+    stamp, _, pk = value.rpartition('|')
+    moment = datetime.fromisoformat(stamp)
+    if timezone.is_naive(moment):
+        raise ValueError("Cursor timestamp must include an offset")
+    return moment, int(pk)
+
+
+def completed_count(barber):
+    return (
+        barber.reservations.filter(status='completed').count()
+        + barber.archived_reservations.filter(status='completed').count()
+    )
+
+
+async def acompleted_count(barber):
+    live, archived = await asyncio.gather(
+        barber.reservations.filter(status='completed').acount(),
+        barber.archived_reservations.filter(status='completed').acount(),
+    )
+    return live + archived
+
+
+def rating_summary(barber):
+    """(average, count) of ratings on completed bookings, live and archived"""
+    total = count = 0
+    for queryset in (barber.reservations, barber.archived_reservations):
+        data = queryset.filter(status='completed', rating__isnull=False).aggregate(
+            avg=Avg('rating'), count=Count('id')
+        )
+        if data['count']:
+            total += data['avg'] * data['count']
+            count += data['count']
+    return (total / count if count else None), count
@@ -0,0 +1,225 @@
+"""
+Build-time static asset pipeline (pure Python, no node toolchain).
+
+`python manage.py build_assets` (run from build.sh before collectstatic):
+  - bundles each page's CSS (base.css + page stylesheet) and minifies it
+  - extracts the page's "critical" rules (layout, navbar, buttons and the
+    above-the-fold components listed in PAGE_BUNDLES) for inlining
+  - bundles and minifies the page's JavaScript (extracted from the templates
+    into static/js/)
+Output goes to main/static/build/. collectstatic's
+CompressedManifestStaticFilesStorage then fingerprints and gzip/brotli
+compresses the bundles, and WhiteNoise serves the hashed names with
+far-future cache headers.
+
+Templates use {% page_css 'name' %} / {% page_js 'name' %} from
+templatetags/assets.py, which fall back to the unbundled source files when
+the build output is missing (e.g. in development).
+"""
+import posixpath
+import re
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+BUILD_DIRNAME = 'build'
+BUILD_DIR = STATIC_DIR / BUILD_DIRNAME
+FONTS_DIR = STATIC_DIR / 'fonts'
+
+# Self-hosted fonts (see static/fonts.css and the vendor_fonts command)
+FONTS = [
+    {'family': 'Inter', 'weights': '400..800', 'file': 'inter-latin.woff2'},
+    {'family': 'Playfair Display', 'weights': '700..900', 'file': 'playfair-display-latin.woff2'},
+]
+
+# Rules whose leading selector matches one of these are inlined on every page.
+# Entries starting with '.' are class prefixes; anything else must match exactly.
+CRITICAL_SELECTORS = [
+    ':root', '*', 'html', 'body', 'a', 'h1', 'h2', 'h3',
+    '.container', '.navbar', '.logo', '.brand-mark', '.nav-', '.btn', '.user-greeting',
+]
+
+PAGE_BUNDLES = {
+    'landing': {
+        'css': ['fonts.css', 'base.css', 'landing.css'],
+        'js': ['js/landing.js'],
+        'critical': ['.hero', '.kicker'],
+    },
+    'auth': {
+        'css': ['fonts.css', 'base.css', 'auth.css'],
+        'js': ['js/auth.js'],
+        'critical': ['.auth-', '.tab'],
+    },
+    'customer_dashboard': {
+        'css': ['fonts.css', 'base.css', 'customer_dashboard.css'],
+        'js': ['js/customer_dashboard.js'],
+        'critical': ['.dashboard-', '.alert', '.messages'],
+    },
+    'barber_dashboard': {
+        'css': ['fonts.css', 'base.css', 'barber_dashboard.css'],
+        'js': ['js/barber_dashboard.js'],
+        'critical': ['.dashboard-', '.page-header'],
+    },
+    'barber_schedule': {
+        'css': ['fonts.css', 'base.css', 'barber_schedule.css'],
+        'js': ['js/barber_schedule.js'],
+        'critical': ['.page-header', '.schedule-'],
+    },
+    'manage_weekly_availability': {
+        'css': ['fonts.css', 'base.css', 'manage_weekly_availability.css'],
+        'js': ['js/manage_weekly_availability.js'],
+        'critical': ['.page-header'],
+    },
+    'admin_dashboard': {
+        'css': ['fonts.css', 'base.css', 'admin_dashboard.css'],
+        'js': ['js/admin_dashboard.js'],
+        'critical': ['.admin-', '.stats-', '.stat-'],
+    },
+    'password_reset': {
+        'css': ['fonts.css', 'base.css', 'password_reset.css'],
+        'js': [],
+        'critical': ['.login-', '.reset-'],
+    },
+}
+
+
+# -------------------------------
+# CSS
+# -------------------------------
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(css):
+    """Conservative minifier: drops comments and redundant whitespace only"""
+    css = _CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Whitespace after ':' is never significant (declarations, pseudo-classes, media features)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def rebase_css_urls(css, source_path, target_path):
+    """Rewrite relative url()s so they still resolve from the bundle's location"""
+    source_dir = posixpath.dirname(source_path)
+    target_dir = posixpath.dirname(target_path)
+
+    def _rebase(match):
+        quote, url = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', url, re.I):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url({quote}{posixpath.relpath(resolved, target_dir or ".")}{quote})'
+
+    return _CSS_URL.sub(_rebase, css)
+
+
+def split_css_blocks(css):
+    """Yield (prelude, body) for each top-level block of minified CSS"""
+    depth, start, prelude_end = 0, 0, None
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                yield css[start:prelude_end].strip(), css[prelude_end + 1:i]
+                start = i + 1
+        elif char == ';' and depth == 0:
+            # Top-level statement such as @import/@charset
+            yield css[start:i].strip(), None
+            start = i + 1
+
+
+def _leading_selector(selector):
+    root = re.match(r'[^\s>+~]*', selector.strip()).group(0)
+    return root if root.startswith(':') else re.split(r':+', root)[0]
+
+
+def _is_critical_selector_list(prelude, patterns):
+    for selector in prelude.split(','):
+        root = _leading_selector(selector)
+        for pattern in patterns:
+            if (pattern.startswith('.') and root.startswith(pattern)) or root == pattern:
+                return True
+    return False
+
+
+def extract_critical_css(css, patterns):
+    """Return the subset of minified `css` needed for first paint"""
+    critical = []
+    for prelude, body in split_css_blocks(css):
+        if body is None:
+            continue
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = extract_critical_css(body, patterns)
+            if inner:
+                critical.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@font-face'):
+            critical.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            # @keyframes etc. only matter once the full stylesheet has loaded
+            continue
+        elif _is_critical_selector_list(prelude, patterns):
+            critical.append(f'{prelude}{{{body}}}')
+    return ''.join(critical)
+
+
+# -------------------------------
+# JS
+# -------------------------------
+
+def minify_js(js):
+    """
+    Whitespace-only JS minifier: strips indentation, blank lines and lines that
+    are entirely // comments. Statements are never joined, so ASI is unaffected.
+    """
+    lines = []
+    for line in js.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+# -------------------------------
+# BUILD
+# -------------------------------
+
+def bundle_path(page, kind):
+    """Static path (relative to STATIC_URL) of a built bundle"""
+    return f'{BUILD_DIRNAME}/{page}.{kind}'
+
+
+def build_page(page, config, static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    """Build one page's bundles; returns {output filename: size in bytes}"""
+    outputs = {}
+
+    css_target = bundle_path(page, 'css')
+    css = ''.join(
+        rebase_css_urls(minify_css((static_dir / name).read_text(encoding='utf-8')), name, css_target)
+        for name in config['css']
+    )
+    outputs[f'{page}.css'] = css
+    outputs[f'{page}.critical.css'] = extract_critical_css(css, CRITICAL_SELECTORS + config.get('critical', []))
+
+    if config.get('js'):
+        outputs[f'{page}.js'] = ''.join(
+            minify_js((static_dir / name).read_text(encoding='utf-8')) for name in config['js']
+        )
+
+    build_dir.mkdir(parents=True, exist_ok=True)
+    sizes = {}
+    for filename, content in outputs.items():
+        (build_dir / filename).write_text(content, encoding='utf-8')
+        sizes[filename] = len(content.encode('utf-8'))
+    return sizes
+
+
+def build_all(static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    return {page: build_page(page, config, static_dir, build_dir) for page, config in PAGE_BUNDLES.items()}
@@ -0,0 +1,191 @@
+"""
+Per-barber iCalendar (.ics) feed of upcoming appointments.
+
+Each barber gets a secret token; calendar apps subscribe to
+/calendar/<token>.ics and poll it every few minutes. Every Reservation write
+stores a new change stamp for that barber in the cache. The stamp is the
+feed's ETag and Last-Modified, so an unchanged feed is answered with a 304
+from two cache reads and no query. The body is rendered from one projected
+query (no model instances) and cached per (barber, stamp).
+"""
+import secrets
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from . import metrics
+from .models import Barber, Reservation
+from .routers import primary_reads
+
+FEED_STATUSES = ['pending', 'confirmed', 'in_progress']
+FEED_PAST_DAYS = 7
+
+ICS_STATUS = {'pending': 'TENTATIVE', 'confirmed': 'CONFIRMED', 'in_progress': 'CONFIRMED'}
+
+FEED_FIELDS = (
+    'id', 'appointment_datetime', 'duration', 'status', 'updated_at', 'service_description',
+    'service_type__name', 'customer__user__first_name', 'customer__user__last_name',
+)
+
+
+# -------------------------------
+# TOKENS
+# -------------------------------
+
+def _token_key(token):
+    return f'ics:token:{token}'
+
+
+def get_token(barber):
+    """The barber's feed token, created on first use"""
+    if not barber.calendar_token:
+        # `barber` may come from a lagging replica: only fill an empty token, then
+        # read back whichever one the primary holds (ours or a concurrent request's)
+        Barber.objects.filter(pk=barber.pk, calendar_token=None).update(calendar_token=secrets.token_urlsafe(24))
+        with primary_reads():
+            barber.calendar_token = Barber.objects.values_list('calendar_token', flat=True).get(pk=barber.pk)
+    return barber.calendar_token
+
+
+def reset_token(barber):
+    """Issue a new token; subscriptions using the old link stop working"""
+    if barber.calendar_token:
+        cache.delete(_token_key(barber.calendar_token))
+    barber.calendar_token = secrets.token_urlsafe(24)
+    Barber.objects.filter(pk=barber.pk).update(calendar_token=barber.calendar_token)
+    return barber.calendar_token
+
+
+def barber_id_for_token(token):
+    """Barber id for a feed token (cached), or None"""
+    key = _token_key(token)
+    barber_id = cache.get(key)
+    if barber_id is None:
+        barber_id = Barber.objects.filter(calendar_token=token, is_active=True).values_list('id', flat=True).first()
+        if barber_id is None:
+            return None
+        cache.set(key, barber_id, getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60))
+    return barber_id
+
+
+# -------------------------------
+# CHANGE STAMPS
+# -------------------------------
+
+def _stamp_key(barber_id):
+    return f'ics:changed:{barber_id}'
+
+
+def get_stamp(barber_id):
+    """Time of the barber's last reservation change (now, if it was never recorded or got evicted)"""
+    return cache.get_or_set(_stamp_key(barber_id), lambda: round(time.time(), 6), timeout=None)
+
+
+def bump(barber_ids):
+    stamp = round(time.time(), 6)
+    cache.set_many({_stamp_key(barber_id): stamp for barber_id in barber_ids}, timeout=None)
+
+
+def etag(barber_id):
+    return quote_etag(f'{barber_id}-{get_stamp(barber_id)}')
+
+
+def last_modified(barber_id):
+    return datetime.fromtimestamp(int(get_stamp(barber_id)), tz=dt_timezone.utc)
+
+
+def _reservation_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump([instance.barber_id])
+
+
+def install():
+    """Bump a barber's feed on every Reservation write; called from MainConfig.ready()"""
+    post_save.connect(_reservation_changed, sender=Reservation, dispatch_uid='main.calendar_feed.save')
+    post_delete.connect(_reservation_changed, sender=Reservation, dispatch_uid='main.calendar_feed.delete')
+
+
+# -------------------------------
+# RENDERING
+# -------------------------------
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split content lines longer than 75 octets (RFC 5545 3.1)"""
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, 74  # continuation lines start with a space
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_rows(barber_id):
+    start = timezone.now() - timedelta(days=FEED_PAST_DAYS)
+    return (
+        Reservation.objects.filter(
+            barber_id=barber_id, appointment_datetime__gte=start, status__in=FEED_STATUSES
+        )
+        .order_by('appointment_datetime')
+        .values_list(*FEED_FIELDS)
+    )
+
+
+def render_feed(rows):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Trimly//Barber Appointments//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Trimly appointments',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+    ]
+    for pk, starts, duration, status, updated, notes, service, first_name, last_name in rows:
+        customer = f'{first_name} {last_name}'.strip()
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:reservation-{pk}@trimly',
+            f'DTSTAMP:{_utc(updated)}',
+            f'DTSTART:{_utc(starts)}',
+            f'DTEND:{_utc(starts + timedelta(minutes=duration))}',
+            f'SUMMARY:{_escape(f"{service} - {customer}" if customer else service)}',
+            f'STATUS:{ICS_STATUS[status]}',
+        ]
+        if notes:
+            lines.append(f'DESCRIPTION:{_escape(notes)}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def get_feed(barber_id):
+    """ICS text for the barber's current change stamp, rendered on a cache miss"""
+    key = f'ics:feed:{barber_id}:{get_stamp(barber_id)}'
+    feed = cache.get(key)
+    if feed is None:
+        metrics.incr('calendar_feed.rendered')
+        feed = render_feed(feed_rows(barber_id))
+        cache.set(key, feed, getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60))
+    return feed
+
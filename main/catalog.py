@@ -0,0 +1,65 @@
+"""
+Service catalog and barber directory.
+
+A precomputed snapshot of the active services and bookable barbers shared by
+the landing page, the customer booking form and the catalog JSON API. The
+snapshot is versioned by the querycache versions of ServiceType, Barber and
+User, so it is only rebuilt after one of those rows changes. Rebuilds read
+from the primary, so a lagging replica can't store a pre-write snapshot
+under the new version.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from . import querycache
+from .models import Barber, ServiceType
+from .routers import primary_reads
+
+CATALOG_MODELS = (ServiceType, Barber, User)
+
+
+def get_catalog_version():
+    """Opaque version string; changes whenever the catalog needs a rebuild"""
+    return '.'.join(str(querycache.get_version(model)) for model in CATALOG_MODELS)
+
+
+def build_catalog():
+    """Query the database and build a fresh snapshot (plain dicts/values only)"""
+    services = [
+        {
+            'id': service.id,
+            'name': service.name,
+            'price': service.price,
+            'duration': service.duration,
+            'description': service.description,
+        }
+        for service in ServiceType.objects.filter(is_active=True).order_by('name')
+    ]
+    barbers = [
+        {
+            'id': barber.id,
+            'name': barber.get_full_name(),
+            'bio': barber.bio,
+            'experience_years': barber.experience_years,
+            'average_rating': barber.average_rating,
+            'total_ratings': barber.total_ratings,
+        }
+        for barber in Barber.objects.filter(
+            is_active=True, is_available_for_booking=True, is_approved=True
+        ).select_related('user').order_by('user__first_name', 'user__last_name')
+    ]
+    return {'services': services, 'barbers': barbers}
+
+
+def get_catalog():
+    """Return the current snapshot, building it on a cache miss"""
+    version = get_catalog_version()
+    cache_key = f'catalog:{version}'
+    catalog = cache.get(cache_key)
+    if catalog is None:
+        with primary_reads():
+            catalog = build_catalog()
+        catalog['version'] = version
+        cache.set(cache_key, catalog, getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60))
+    return catalog
@@ -0,0 +1,46 @@
+"""
+Database connection reuse metrics.
+
+With persistent connections (CONN_MAX_AGE) we count how often a worker had
+to open a brand new connection; with the native psycopg pool (DB_POOL=true)
+we also report the pool's own stats and its utilization.
+"""
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    metrics.incr(f'db.{connection.alias}.connections_opened')
+
+
+def pool_stats():
+    """Per-alias connection settings and (if pooled) live pool utilization"""
+    stats = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        entry = {
+            'vendor': connections[alias].vendor,
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE', 0),
+            'health_checks': settings_dict.get('CONN_HEALTH_CHECKS', False),
+            'pooled': bool(settings_dict.get('OPTIONS', {}).get('pool')),
+            'connections_opened': metrics.get_counters().get(f'db.{alias}.connections_opened', 0),
+        }
+        if entry['pooled']:
+            pool_data = connections[alias].pool.get_stats()
+            in_use = pool_data.get('pool_size', 0) - pool_data.get('pool_available', 0)
+            pool_max = pool_data.get('pool_max') or 1
+            entry.update({
+                'pool': pool_data,
+                'in_use': in_use,
+                'utilization': round(in_use / pool_max, 3),
+            })
+        stats[alias] = entry
+    return stats
+
+
+def install():
+    """Hook connection tracking into Django; called from MainConfig.ready()"""
+    connection_created.connect(_on_connection_created, dispatch_uid='main.dbpool.connection_created')
+    metrics.register_collector('database', pool_stats)
@@ -1,8 +1,13 @@
+import logging
+
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.utils import timezone
 from django.utils.html import strip_tags
 
+logger = logging.getLogger(__name__)
+
 
 def send_appointment_confirmation_email(appointment, recipient_email):
     """
@@ -43,8 +48,8 @@ def send_appointment_confirmation_email(appointment, recipient_email):
     try:
         email.send()
         return True
-    except Exception as e:
-        print(f"Error sending confirmation email: {e}")
+    except Exception:
+        logger.exception("Error sending confirmation email", extra={'recipient': recipient_email})
         return False
 
 
@@ -87,6 +92,49 @@ def send_appointment_cancellation_email(appointment, recipient_email):
     try:
         email.send()
         return True
-    except Exception as e:
-        print(f"Error sending cancellation email: {e}")
+    except Exception:
+        logger.exception("Error sending cancellation email", extra={'recipient': recipient_email})
+        return False
+
+
+def send_waitlist_offer_email(entry, recipient_email):
+    """
+    Tell a waitlisted customer that a slot opened up
+    Args:
+        entry: WaitlistEntry with offered_barber and offered_start set
+        recipient_email: Email address to send to
+    """
+    start = timezone.localtime(entry.offered_start)
+    subject = f'A Slot Opened Up - {start.strftime("%B %d, %Y")}'
+    
+    # Render HTML template
+    html_content = render_to_string('emails/waitlist_offer.html', {
+        'entry': entry,
+        'customer_name': entry.customer.user.get_full_name() or entry.customer.user.username,
+        'service': entry.service_type.name,
+        'date': start.date(),
+        'time': start.time(),
+        'barber_name': entry.offered_barber.get_full_name(),
+    })
+    
+    # Create plain text version
+    text_content = strip_tags(html_content)
+    
+    # Create email
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient_email]
+    )
+    
+    # Attach HTML version
+    email.attach_alternative(html_content, "text/html")
+    
+    # Send email
+    try:
+        email.send()
+        return True
+    except Exception:
+        logger.exception("Error sending waitlist offer email", extra={'recipient': recipient_email})
         return False
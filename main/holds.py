@@ -0,0 +1,80 @@
+"""
+Short-lived slot holds during checkout.
+
+When a customer picks a time, the booking form POSTs to the slot-hold API,
+which stores a SlotHold for (barber, start, end) owned by the session for
+SLOT_HOLD_SECONDS. Slot lookups treat other sessions' unexpired holds like
+bookings, so the slot stops being offered to anyone else while the owner
+fills in the rest of the form, and the final booking POST no longer loses
+races it could have avoided. Holds are placed under a row lock on the
+barber, so two sessions can't hold overlapping slots. Each session keeps at
+most one hold, and a booking releases it. Expired rows are never read; they
+are deleted lazily when the barber gets a new hold and by
+`python manage.py purge_slot_holds`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Barber, SlotHold
+
+
+def hold_seconds():
+    return getattr(settings, 'SLOT_HOLD_SECONDS', 5 * 60)
+
+
+def active_holds(barber, start, end, exclude_session=None):
+    """Unexpired holds overlapping [start, end), other than `exclude_session`'s"""
+    holds = SlotHold.objects.filter(
+        barber=barber, start__lt=end, end__gt=start, expires_at__gt=timezone.now()
+    )
+    if exclude_session:
+        holds = holds.exclude(session_key=exclude_session)
+    return holds
+
+
+def place_hold(barber, session_key, start, end, is_available):
+    """
+    Hold [start, end) for the session, replacing its previous hold.
+    `is_available()` re-checks the slot (excluding this session's holds)
+    while the barber is locked; returns the SlotHold, or None if taken.
+    """
+    with transaction.atomic():
+        # Serialise holds per barber: the availability check and the insert must not interleave
+        Barber.objects.select_for_update().filter(pk=barber.pk).exists()
+        purge_expired(barber)
+        release(session_key)
+        if not is_available():
+            metrics.incr('holds.conflict')
+            return None
+        hold = SlotHold.objects.create(
+            barber=barber,
+            session_key=session_key,
+            start=start,
+            end=end,
+            expires_at=timezone.now() + timedelta(seconds=hold_seconds()),
+        )
+    metrics.incr('holds.placed')
+    return hold
+
+
+def release(session_key):
+    """Drop the session's hold (after booking, or when it picks another slot)"""
+    if session_key:
+        SlotHold.objects.filter(session_key=session_key).delete()
+
+
+def purge_expired(barber=None, batch_size=1000):
+    """Delete expired holds (for one barber, or all in batches); returns the number deleted"""
+    expired = SlotHold.objects.filter(expires_at__lte=timezone.now())
+    if barber is not None:
+        return expired.filter(barber=barber).delete()[0]
+    total = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += SlotHold.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,206 @@
+"""
+Structured logging.
+
+Records leave request threads through QueueHandler: it only puts the record
+on a bounded in-memory queue, and a listener thread formats it (one JSON
+object per line, JsonFormatter) and writes it to stdout. When the queue is
+full the record is dropped and counted (`logs.dropped` on the metrics
+endpoint), so a slow or blocked stdout never stalls a request.
+
+RequestIdMiddleware gives each request an id (the incoming X-Request-ID, or
+a new one), echoes it in the response and stores it in a context variable
+that RequestIdFilter copies onto every record logged while the request is
+handled, including from async views and sync_to_async threads.
+
+DEBUG records can be sampled per logger (LOG_SAMPLE_RATES). The decision is
+made per request id, so a sampled request keeps all of its debug lines.
+Levels are set per module with LOG_LEVEL and LOG_LEVELS (see settings.py).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+# -------------------------------
+# REQUEST IDS
+# -------------------------------
+
+class RequestIdMiddleware:
+    """Tag the request (and everything it logs) with an id; returned as X-Request-ID"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            return self.finish(request, self.get_response(request))
+        finally:
+            _request_id.reset(token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            return self.finish(request, await self.get_response(request))
+        finally:
+            _request_id.reset(token)
+
+    def start(self, request):
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        request.request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        return _request_id.set(request.request_id)
+
+    def finish(self, request, response):
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+
+# -------------------------------
+# FILTERS
+# -------------------------------
+
+class RequestIdFilter(logging.Filter):
+    """Copy the current request id onto the record, before it is queued"""
+
+    def filter(self, record):
+        # django.request logs 4xx/5xx after the middleware returned, but passes the request
+        record.request_id = _request_id.get() or getattr(getattr(record, 'request', None), 'request_id', None)
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records: `rates` maps logger name prefixes
+    to the fraction kept (longest prefix wins). Inside a request the choice
+    is a hash of the request id, so it is the same for all of its records.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                break
+        else:
+            return True
+        if rate >= 1:
+            return True
+        request_id = _request_id.get()
+        roll = (zlib.crc32(request_id.encode()) % 10000) / 10000 if request_id else random.random()
+        return roll < rate
+
+
+# -------------------------------
+# FORMATTING
+# -------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request_id, extras, exception"""
+
+    def format(self, record):
+        data = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str)
+
+
+# -------------------------------
+# NON-BLOCKING OUTPUT
+# -------------------------------
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to a listener thread that writes them to `stream` using this
+    handler's formatter (JsonFormatter by default). The listener is started
+    on first use in each process, so forked workers get their own.
+    """
+
+    def __init__(self, maxsize=10000, stream=None):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = None
+        self._pid = None
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (the args may change later), keeping
+        # exc_text separate so the formatter can emit it as its own field
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = (self.formatter or JsonFormatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr('logs.dropped')
+
+    def start(self):
+        self._pid = os.getpid()
+        self.target.setFormatter(self.formatter or JsonFormatter())
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.flush_and_stop)
+
+    def flush_and_stop(self):
+        """Write out what is queued and stop the listener (at exit, and in tests)"""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from main.archive import archivable_reservations, archive_cutoff, archive_reservations
+
+
+class Command(BaseCommand):
+    help = 'Move finished reservations older than RESERVATION_ARCHIVE_DAYS into the archive table (in batches)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive bookings older than this many days (default: RESERVATION_ARCHIVE_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_reservations(archive_cutoff(options['days'])).count()
+            self.stdout.write(f'{count} reservations would be archived')
+            return
+
+        moved = archive_reservations(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} reservations'))
@@ -0,0 +1,171 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from main.models import Barber
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests/sec of the slot and barber dashboard APIs through the WSGI handler '
+        '(sync views, threads) and the ASGI handler (async views, one event loop), '
+        'in-process on this machine against the configured database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=('both',) + MODES, default='both')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight (threads for WSGI)')
+        parser.add_argument('--barber', help='Username of the barber to query as (default: first approved)')
+        parser.add_argument('--date', help='Slot date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--json', action='store_true', help='Print results as one JSON line')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            results = {mode: self.run_child(mode, options) for mode in MODES}
+        else:
+            if settings.SERVER_MODE != options['mode']:
+                raise CommandError(f"Run with SERVER_MODE={options['mode']} so the matching views are routed")
+            results = {options['mode']: self.run_mode(options)}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        for mode, endpoints in results.items():
+            for path, stats in endpoints.items():
+                self.stdout.write(
+                    f"{mode.upper():5} {path:45} {stats['rps']:8.1f} req/s  "
+                    f"mean {stats['mean_ms']:6.1f} ms  p95 {stats['p95_ms']:6.1f} ms"
+                )
+
+    def run_child(self, mode, options):
+        """Each mode runs in its own process: URL routing and middleware depend on SERVER_MODE"""
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_api',
+            '--mode', mode, '--json',
+            '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+        ]
+        for option in ('barber', 'date'):
+            if options[option]:
+                command += [f'--{option}', options[option]]
+        child = subprocess.run(command, env={**os.environ, 'SERVER_MODE': mode}, capture_output=True, text=True)
+        if child.returncode:
+            raise CommandError(f'{mode} run failed:\n{child.stderr}')
+        return json.loads(child.stdout.strip().splitlines()[-1])[mode]
+
+    def run_mode(self, options):
+        barbers = Barber.objects.filter(is_approved=True).select_related('user').order_by('id')
+        if options['barber']:
+            barbers = barbers.filter(user__username=options['barber'])
+        barber = barbers.first()
+        if barber is None:
+            raise CommandError('No approved barber to benchmark with (see create_test_data)')
+
+        client = Client()
+        client.force_login(barber.user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        day = options['date'] or timezone.localdate().isoformat()
+        paths = [
+            (f'/api/get-slots/{barber.id}/{day}/', 'duration=30'),
+            ('/dashboard/barber/api/', ''),
+        ]
+
+        run = self.run_asgi if settings.ASGI_MODE else self.run_wsgi
+        results = {}
+        # One user sends every request: the API rate limits would turn most of them into 429s
+        with override_settings(RATE_LIMITS={}):
+            for path, query in paths:
+                # Warm-up (template loading, caches) and a sanity check
+                self.check_statuses(path, run(path, query, cookie, 5, 1)[0])
+                started = time.perf_counter()
+                statuses, latencies = run(path, query, cookie, options['requests'], options['concurrency'])
+                elapsed = time.perf_counter() - started
+                self.check_statuses(path, statuses)
+                results[path] = self.summarize(latencies, elapsed)
+        return results
+
+    @staticmethod
+    def check_statuses(path, statuses):
+        failed = [status for status in statuses if status != 200]
+        if failed:
+            raise CommandError(f'{path}: {len(failed)} of {len(statuses)} responses were not 200 (e.g. {failed[0]})')
+
+    @staticmethod
+    def summarize(latencies, elapsed):
+        latencies = sorted(latencies)
+        return {
+            'rps': len(latencies) / elapsed,
+            'mean_ms': statistics.mean(latencies) * 1000,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        }
+
+    def run_wsgi(self, path, query, cookie, total, concurrency):
+        handler = WSGIHandler()
+        statuses = []
+
+        def one(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.append(int(status[:3])))
+            b''.join(response)
+            response.close()
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(one, range(total)))
+        return statuses, latencies
+
+    def run_asgi(self, path, query, cookie, total, concurrency):
+        handler = ASGIHandler()
+        statuses = []
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'root_path': '', 'query_string': query.encode(),
+            'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+        }
+
+        async def one(semaphore):
+            body_sent = asyncio.Event()
+
+            async def receive():
+                if body_sent.is_set():
+                    await asyncio.Event().wait()  # no disconnect while the response is written
+                body_sent.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                return time.perf_counter() - started
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(one(semaphore) for _ in range(total)))
+
+        latencies = list(asyncio.run(main()))
+        return statuses, latencies
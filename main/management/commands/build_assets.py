@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.assets import BUILD_DIR, build_all
+
+
+class Command(BaseCommand):
+    help = 'Bundle and minify per-page CSS/JS and extract critical CSS into main/static/build/ (run before collectstatic)'
+
+    def handle(self, *args, **kwargs):
+        results = build_all()
+        for page, sizes in results.items():
+            summary = ', '.join(f'{name} {size / 1024:.1f} KB' for name, size in sizes.items())
+            self.stdout.write(f'{page}: {summary}')
+        self.stdout.write(self.style.SUCCESS(f'Built {len(results)} page bundles into {BUILD_DIR}'))
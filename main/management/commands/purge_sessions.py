@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+DB_BACKED_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete expired database sessions in small batches (a batched alternative to clearsessions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_BACKED_ENGINES:
+            self.stdout.write(f'{settings.SESSION_ENGINE} expires sessions by itself; nothing to purge.')
+            return
+
+        now = timezone.now()
+        total = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            total += len(keys)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} expired sessions'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main import holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired slot holds (they are already ignored by availability; this keeps the table small)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Holds deleted per statement')
+
+    def handle(self, *args, **options):
+        total = holds.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} expired slot holds'))
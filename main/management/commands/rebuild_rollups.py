@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily booking rollups from live and archived reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD); default: all history')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD); default: same as --start')
+
+    def handle(self, *args, **options):
+        if not options['start']:
+            written = rebuild()
+        else:
+            try:
+                start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+                end = datetime.strptime(options['end'] or options['start'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Dates must be in YYYY-MM-DD format.')
+            if end < start:
+                raise CommandError('--end must not be before --start.')
+            written = rebuild(start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows'))
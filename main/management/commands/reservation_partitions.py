@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly partitions of the reservations table (PostgreSQL only; no-op elsewhere)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Migrate the existing unpartitioned table to monthly partitions')
+        parser.add_argument('--keep-old', action='store_true',
+                            help='With --convert, keep the old table as main_reservation_unpartitioned')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future months to create partitions for')
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            self.stdout.write('Not a PostgreSQL database; reservations stay unpartitioned.')
+            return
+
+        if options['convert']:
+            try:
+                created = partitioning.convert_to_partitioned(options['months_ahead'], options['keep_old'])
+            except Exception as exc:
+                raise CommandError(f'Conversion failed (nothing was changed): {exc}')
+            self.stdout.write(self.style.SUCCESS(f'Converted {partitioning.TABLE}; {len(created)} partitions created'))
+            return
+
+        if not partitioning.is_partitioned():
+            raise CommandError(f'{partitioning.TABLE} is not partitioned; run with --convert first.')
+        created = partitioning.ensure_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} new partitions'))
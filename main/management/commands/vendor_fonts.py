@@ -0,0 +1,53 @@
+import re
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.assets import FONTS, FONTS_DIR
+
+GOOGLE_FONTS_CSS = 'https://fonts.googleapis.com/css2?family={family}:wght@{weights}&display=swap'
+# Google Fonts only serves WOFF2 to browsers it recognises
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def _fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def latin_woff2_url(css):
+    """Pick the 'latin' subset's WOFF2 URL out of a Google Fonts stylesheet"""
+    match = re.search(r'/\* latin \*/\s*@font-face\s*{[^}]*?url\((https://[^)]+\.woff2)\)', css)
+    return match.group(1) if match else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the committed latin-subset variable WOFF2 files in main/static/fonts/ '
+        'from Google Fonts (not part of the build)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='Do nothing for fonts that are already vendored')
+
+    def handle(self, *args, **options):
+        FONTS_DIR.mkdir(parents=True, exist_ok=True)
+        for font in FONTS:
+            target = FONTS_DIR / font['file']
+            if options['skip_existing'] and target.exists():
+                self.stdout.write(f"{font['file']}: already vendored")
+                continue
+
+            css_url = GOOGLE_FONTS_CSS.format(family=font['family'].replace(' ', '+'), weights=font['weights'])
+            try:
+                css = _fetch(css_url).decode('utf-8')
+                woff2_url = latin_woff2_url(css)
+                if not woff2_url:
+                    raise CommandError(f"No latin WOFF2 subset found for {font['family']}")
+                target.write_bytes(_fetch(woff2_url))
+            except OSError as e:
+                raise CommandError(f"Could not download {font['family']}: {e}")
+
+            self.stdout.write(self.style.SUCCESS(f"{font['file']}: {target.stat().st_size / 1024:.1f} KB"))
@@ -0,0 +1,48 @@
+"""
+Lightweight in-process metrics.
+
+Counters are per worker process (gunicorn/uvicorn workers each keep their
+own), which is enough for spotting trends on the staff metrics endpoint.
+Subsystems can also register collectors that report a live snapshot
+(e.g. database pool utilization) when the endpoint is read.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_collectors = {}
+
+
+def incr(name, amount=1):
+    """Increment a named counter"""
+    with _lock:
+        _counters[name] += amount
+
+
+def get_counters(prefix=''):
+    """Return a copy of all counters, optionally filtered by name prefix"""
+    with _lock:
+        return {name: value for name, value in _counters.items() if name.startswith(prefix)}
+
+
+def reset_counters():
+    """Clear all counters (used by tests)"""
+    with _lock:
+        _counters.clear()
+
+
+def register_collector(name, func):
+    """Register a callable returning a JSON-serialisable snapshot for `name`"""
+    _collectors[name] = func
+
+
+def snapshot():
+    """Counters plus the output of every registered collector"""
+    data = {'counters': get_counters()}
+    for name, func in _collectors.items():
+        try:
+            data[name] = func()
+        except Exception as e:
+            data[name] = {'error': str(e)}
+    return data
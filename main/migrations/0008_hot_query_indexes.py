@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_reservation_booking_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='barber',
+            index=models.Index(fields=['phone_number'], name='barber_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_number'], name='customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'status', 'appointment_datetime'], name='reservation_cust_status_dt'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['barber', 'status', 'appointment_datetime'], name='reservation_barb_status_dt'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'in_progress'])), fields=['barber', 'appointment_datetime'], name='reservation_barber_active'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['barber', 'date', 'is_available'], name='schedule_barber_date_avail'),
+        ),
+        # login_view resolves "email or username" with User.objects.get(email=...);
+        # auth_user ships without an index on email, so add one here.
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX IF EXISTS auth_user_email_idx;',
+        ),
+    ]
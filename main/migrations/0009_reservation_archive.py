@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment_datetime', models.DateTimeField()),
+                ('duration', models.PositiveIntegerField(default=30)),
+                ('service_description', models.TextField(blank=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('status', models.CharField(choices=[('pending', 'Pending Confirmation'), ('confirmed', 'Confirmed'), ('rejected', 'Rejected'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('no_show', 'No Show')], max_length=20)),
+                ('booking_source', models.CharField(choices=[('online', 'Online'), ('walk_in', 'Walk-in')], default='online', max_length=20)),
+                ('cancellation_reason', models.TextField(blank=True, null=True)),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                ('rating', models.PositiveIntegerField(blank=True, null=True)),
+                ('feedback', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('confirmation_sent', models.BooleanField(default=False)),
+                ('reminder_sent', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='main.barber')),
+                ('cancelled_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='main.customer')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='main.servicetype')),
+            ],
+            options={
+                'verbose_name': 'Archived Reservation',
+                'verbose_name_plural': 'Archived Reservations',
+                'ordering': ['-appointment_datetime'],
+                'indexes': [models.Index(fields=['customer', 'appointment_datetime'], name='archived_res_cust_dt'), models.Index(fields=['barber', 'status'], name='archived_res_barber_status'), models.Index(fields=['appointment_datetime'], name='archived_res_dt')],
+            },
+        ),
+    ]
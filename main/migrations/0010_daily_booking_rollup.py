@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Initial rollups from existing reservations (later kept up to date by main.rollups)"""
+    DailyBookingRollup = apps.get_model('main', 'DailyBookingRollup')
+    key_fields = ('barber_id', 'service_type_id', 'booking_source', 'status')
+    totals = {}
+    for model_name in ('Reservation', 'ArchivedReservation'):
+        rows = (
+            apps.get_model('main', model_name).objects
+            .annotate(day=TruncDate('appointment_datetime'))
+            .values('day', *key_fields)
+            .annotate(count=Count('id'), revenue=Sum('price'), minutes=Sum('duration'))
+            .order_by()
+        )
+        for row in rows:
+            key = (row['day'],) + tuple(row[name] for name in key_fields)
+            count, revenue, minutes = totals.get(key, (0, 0, 0))
+            totals[key] = (count + row['count'], revenue + (row['revenue'] or 0), minutes + (row['minutes'] or 0))
+    DailyBookingRollup.objects.bulk_create([
+        DailyBookingRollup(
+            date=key[0], barber_id=key[1], service_type_id=key[2], booking_source=key[3], status=key[4],
+            booking_count=count, revenue=revenue, minutes_booked=minutes,
+        )
+        for key, (count, revenue, minutes) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_reservation_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booking_source', models.CharField(choices=[('online', 'Online'), ('walk_in', 'Walk-in')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending Confirmation'), ('confirmed', 'Confirmed'), ('rejected', 'Rejected'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('no_show', 'No Show')], max_length=20)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('minutes_booked', models.IntegerField(default=0)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='main.barber')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='main.servicetype')),
+            ],
+            options={
+                'verbose_name': 'Daily Booking Rollup',
+                'verbose_name_plural': 'Daily Booking Rollups',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['status', 'date'], name='daily_rollup_status_date')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'barber', 'service_type', 'booking_source', 'status'), name='daily_rollup_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    """
+    Clear blank phone numbers (NULLs may repeat, '' may not), then stop with a
+    list of the accounts to fix if a phone or email is still shared: there is
+    no safe way to pick which account keeps it.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    problems = []
+    for model_name in ('Customer', 'Barber'):
+        model = apps.get_model('main', model_name)
+        model.objects.filter(phone_number='').update(phone_number=None)
+        shared = (
+            model.objects.exclude(phone_number=None).values('phone_number')
+            .annotate(n=Count('id')).filter(n__gt=1).values_list('phone_number', flat=True)
+        )
+        for phone in shared:
+            users = model.objects.filter(phone_number=phone).values_list('user_id', flat=True)
+            problems.append(f'{model_name} phone {phone}: user ids {sorted(users)}')
+    shared = (
+        User.objects.exclude(email='').values('email')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('email', flat=True)
+    )
+    for email in shared:
+        users = User.objects.filter(email=email).values_list('id', flat=True)
+        problems.append(f'email {email}: user ids {sorted(users)}')
+    if problems:
+        raise ValueError(
+            'Duplicate registration data; edit these accounts, then migrate again:\n  '
+            + '\n  '.join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_daily_booking_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='barber',
+            name='barber_phone_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_phone_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='barber',
+            constraint=models.UniqueConstraint(fields=('phone_number',), name='barber_phone_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(fields=('phone_number',), name='customer_phone_unique'),
+        ),
+        # auth_user.email isn't unique in Django; enforce it for non-empty emails so concurrent
+        # sign-ups can't both pass main.registration's check (auth_user_email_idx still serves lookups)
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX IF NOT EXISTS auth_user_email_unique ON auth_user (email) WHERE email <> '';",
+            reverse_sql='DROP INDEX IF EXISTS auth_user_email_unique;',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_registration_unique_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'appointment_datetime'], name='reservation_cust_dt'),
+        ),
+    ]
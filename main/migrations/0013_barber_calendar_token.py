@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_customer_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barber',
+            name='calendar_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
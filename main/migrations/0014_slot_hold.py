@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_barber_calendar_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(max_length=40)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='main.barber')),
+            ],
+            options={
+                'verbose_name': 'Slot Hold',
+                'verbose_name_plural': 'Slot Holds',
+                'indexes': [models.Index(fields=['barber', 'start'], name='slot_hold_barber_start'), models.Index(fields=['session_key'], name='slot_hold_session'), models.Index(fields=['expires_at'], name='slot_hold_expires')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_slot_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offered_at', models.DateTimeField(blank=True, null=True)),
+                ('offered_start', models.DateTimeField(blank=True, null=True)),
+                ('barber', models.ForeignKey(blank=True, help_text='Empty for any barber', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='main.barber')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='main.customer')),
+                ('offered_barber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.barber')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='main.servicetype')),
+            ],
+            options={
+                'verbose_name': 'Waitlist Entry',
+                'verbose_name_plural': 'Waitlist Entries',
+                'indexes': [models.Index(fields=['barber', 'status', 'date_from'], name='waitlist_barber_date'), models.Index(fields=['customer', 'status'], name='waitlist_customer_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicates(apps, schema_editor):
+    """Stop with a list of the accounts whose emails differ only by case"""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    users = User.objects.exclude(email='').annotate(email_lower=Lower('email'))
+    shared = (
+        users.values('email_lower').annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('email_lower', flat=True)
+    )
+    problems = [
+        f'email {email}: user ids {sorted(users.filter(email_lower=email).values_list("id", flat=True))}'
+        for email in shared
+    ]
+    if problems:
+        raise ValueError(
+            'Emails that differ only by case; edit these accounts, then migrate again:\n  '
+            + '\n  '.join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_waitlist_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        # One account per email regardless of case (main.registration.users_with_email)
+        migrations.RunSQL(
+            sql=[
+                'DROP INDEX IF EXISTS auth_user_email_unique;',
+                "CREATE UNIQUE INDEX IF NOT EXISTS auth_user_email_lower_unique ON auth_user (LOWER(email)) WHERE email <> '';",
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS auth_user_email_lower_unique;',
+                "CREATE UNIQUE INDEX IF NOT EXISTS auth_user_email_unique ON auth_user (email) WHERE email <> '';",
+            ],
+        ),
+        # The unique index is partial, so it can't serve `LOWER(email) = ...` lookups on its own
+        migrations.RunSQL(
+            sql=[
+                'DROP INDEX IF EXISTS auth_user_email_idx;',
+                'CREATE INDEX IF NOT EXISTS auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS auth_user_email_lower_idx;',
+                'CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email);',
+            ],
+        ),
+    ]
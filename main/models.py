@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
@@ -58,6 +59,9 @@ class Barber(models.Model):
     # **Admin approval field**
     is_approved = models.BooleanField(default=False, help_text="Indicates if the barber has been approved by an admin")
     
+    # Secret token of the barber's calendar (.ics) feed; see calendar_feed.py
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    
     # Ratings (calculated from customer feedback)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_ratings = models.PositiveIntegerField(default=0)
@@ -69,6 +73,10 @@ class Barber(models.Model):
     class Meta:
         verbose_name = "Barber"
         verbose_name_plural = "Barbers"
+        constraints = [
+            # Backs the registration uniqueness check (also serves phone lookups); NULLs may repeat
+            models.UniqueConstraint(fields=['phone_number'], name='barber_phone_unique'),
+        ]
 
     def __str__(self):
         return f"Barber: {self.user.username}"
@@ -78,18 +86,13 @@ class Barber(models.Model):
         return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
 
     def update_rating(self):
-        """Update average rating based on completed reservations"""
-        completed_reservations = self.reservations.filter(
-            status='completed',
-            rating__isnull=False
-        )
-        
-        if completed_reservations.exists():
-            avg_rating = completed_reservations.aggregate(
-                avg_rating=models.Avg('rating')
-            )['avg_rating']
+        """Update average rating based on completed reservations (live and archived)"""
+        from .archive import rating_summary
+
+        avg_rating, total_ratings = rating_summary(self)
+        if total_ratings:
             self.average_rating = round(avg_rating, 2)
-            self.total_ratings = completed_reservations.count()
+            self.total_ratings = total_ratings
             self.save()
 
 
@@ -121,6 +124,10 @@ class Customer(models.Model):
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
         ordering = ['user__first_name', 'user__last_name']
+        constraints = [
+            # Backs the registration uniqueness check (also serves phone lookups); NULLs may repeat
+            models.UniqueConstraint(fields=['phone_number'], name='customer_phone_unique'),
+        ]
 
     def __str__(self):
         return f"Customer: {self.user.username}"
@@ -130,8 +137,8 @@ class Customer(models.Model):
         return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
 
     def get_total_appointments(self):
-        """Get total number of reservations for this customer"""
-        return self.reservations.count()
+        """Get total number of reservations for this customer (including archived ones)"""
+        return self.reservations.count() + self.archived_reservations.count()
 
 
 class WeeklyAvailability(models.Model):
@@ -220,6 +227,10 @@ class Schedule(models.Model):
         verbose_name_plural = "Schedules"
         unique_together = ['barber', 'date', 'start_time', 'end_time']
         ordering = ['date', 'start_time']
+        indexes = [
+            # Slot generation looks up overrides/blockers per (barber, date, is_available)
+            models.Index(fields=['barber', 'date', 'is_available'], name='schedule_barber_date_avail'),
+        ]
 
     def __str__(self):
         return f"{self.barber.get_full_name()} - {self.date} ({self.start_time}-{self.end_time})"
@@ -333,6 +344,18 @@ class Reservation(models.Model):
             models.Index(fields=['appointment_datetime']),
             models.Index(fields=['status']),
             models.Index(fields=['barber', 'appointment_datetime']),
+            # Customer dashboard: upcoming/past bookings per customer and status
+            models.Index(fields=['customer', 'status', 'appointment_datetime'], name='reservation_cust_status_dt'),
+            # Customer history: everything before a point in time, newest first
+            models.Index(fields=['customer', 'appointment_datetime'], name='reservation_cust_dt'),
+            # Barber dashboard stats and slot checks per barber and status
+            models.Index(fields=['barber', 'status', 'appointment_datetime'], name='reservation_barb_status_dt'),
+            # Slot availability only ever looks at active bookings; keep that index small
+            models.Index(
+                fields=['barber', 'appointment_datetime'],
+                condition=Q(status__in=['pending', 'confirmed', 'in_progress']),
+                name='reservation_barber_active',
+            ),
         ]
 
     def __str__(self):
@@ -399,3 +422,156 @@ class Reservation(models.Model):
     def get_end_time(self):
         """Get the end time of the appointment"""
         return self.appointment_datetime + timedelta(minutes=self.duration)
+
+
+class ArchivedReservation(models.Model):
+    """
+    Cold storage for finished reservations (see main/archive.py).
+    Rows keep their original primary key and the same columns as Reservation,
+    so templates and reports can treat both interchangeably.
+    """
+    id = models.BigIntegerField(primary_key=True)
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_reservations')
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='archived_reservations')
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='archived_reservations')
+
+    appointment_datetime = models.DateTimeField()
+    duration = models.PositiveIntegerField(default=30)
+    service_description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    booking_source = models.CharField(max_length=20, choices=Reservation.BOOKING_SOURCE_CHOICES, default='online')
+
+    cancellation_reason = models.TextField(blank=True, null=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    cancelled_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    rating = models.PositiveIntegerField(null=True, blank=True)
+    feedback = models.TextField(blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    confirmation_sent = models.BooleanField(default=False)
+    reminder_sent = models.BooleanField(default=False)
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Archived bookings are read-only history (no rating/reschedule links)
+    is_archived = True
+
+    class Meta:
+        verbose_name = "Archived Reservation"
+        verbose_name_plural = "Archived Reservations"
+        ordering = ['-appointment_datetime']
+        indexes = [
+            models.Index(fields=['customer', 'appointment_datetime'], name='archived_res_cust_dt'),
+            models.Index(fields=['barber', 'status'], name='archived_res_barber_status'),
+            models.Index(fields=['appointment_datetime'], name='archived_res_dt'),
+        ]
+
+    def __str__(self):
+        return f"[archived] {self.customer.get_full_name()} - {self.barber.get_full_name()} on {self.appointment_datetime}"
+
+    def get_end_time(self):
+        """Get the end time of the appointment"""
+        return self.appointment_datetime + timedelta(minutes=self.duration)
+
+
+class DailyBookingRollup(models.Model):
+    """
+    Pre-aggregated bookings per day (see main/rollups.py). Kept in step with
+    Reservation writes and rebuildable with `manage.py rebuild_rollups`;
+    admin reports read these rows instead of scanning reservations.
+    """
+    date = models.DateField()
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='daily_rollups')
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='daily_rollups')
+    booking_source = models.CharField(max_length=20, choices=Reservation.BOOKING_SOURCE_CHOICES)
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+
+    booking_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    minutes_booked = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily Booking Rollup"
+        verbose_name_plural = "Daily Booking Rollups"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'barber', 'service_type', 'booking_source', 'status'],
+                name='daily_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'date'], name='daily_rollup_status_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.barber_id}/{self.service_type_id} {self.booking_source} {self.status}: {self.booking_count}"
+
+
+class SlotHold(models.Model):
+    """
+    A slot reserved for one session while its owner completes checkout (see
+    main/holds.py). Unexpired holds are treated like bookings by everyone
+    else's availability; expired rows are ignored and swept lazily.
+    """
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='slot_holds')
+    session_key = models.CharField(max_length=40)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Slot Hold"
+        verbose_name_plural = "Slot Holds"
+        indexes = [
+            models.Index(fields=['barber', 'start'], name='slot_hold_barber_start'),
+            models.Index(fields=['session_key'], name='slot_hold_session'),
+            models.Index(fields=['expires_at'], name='slot_hold_expires'),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.barber_id} {self.start:%Y-%m-%d %H:%M}-{self.end:%H:%M} until {self.expires_at:%H:%M:%S}"
+
+
+class WaitlistEntry(models.Model):
+    """
+    A customer's request to be told when a slot frees up with a barber (or
+    any barber) between date_from and date_to (see main/waitlist.py).
+    """
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('offered', 'Offered'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='waitlist_entries')
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='waitlist_entries', help_text="Empty for any barber")
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date_from = models.DateField()
+    date_to = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # The slot that was offered
+    offered_at = models.DateTimeField(null=True, blank=True)
+    offered_barber = models.ForeignKey(Barber, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    offered_start = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Waitlist Entry"
+        verbose_name_plural = "Waitlist Entries"
+        indexes = [
+            # Matching reads waiting entries for one barber (or NULL) in a short date_from range
+            models.Index(fields=['barber', 'status', 'date_from'], name='waitlist_barber_date'),
+            models.Index(fields=['customer', 'status'], name='waitlist_customer_status'),
+        ]
+
+    def __str__(self):
+        barber = self.barber.get_full_name() if self.barber_id else "any barber"
+        return f"{self.customer} waiting for {barber} {self.date_from}..{self.date_to} ({self.status})"
@@ -0,0 +1,131 @@
+"""
+Full-page cache for anonymous visitors.
+
+The rendered page is stored once per content version together with gzip and
+(if the optional `brotli` package is installed) brotli variants, so a cache
+hit is served straight from bytes: no template render, no query and no
+per-request compression. Authenticated users, and visitors with pending
+flash messages, always get a fresh render.
+
+The key also carries the asset version (a hash of the collectstatic
+manifest), because the cached HTML embeds hashed bundle URLs, inlined
+critical CSS and font preloads that change with each deploy.
+"""
+import gzip
+import hashlib
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import metrics, querycache
+from .assets import BUILD_DIR
+
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None
+
+
+def _has_session_cookie(request):
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def _is_anonymous(request):
+    # Without a session cookie the user can't be logged in; skip the session lookup entirely
+    return not _has_session_cookie(request) or not request.user.is_authenticated
+
+
+def _has_pending_messages(request):
+    # len() loads the stored messages without marking them as shown
+    return hasattr(request, '_messages') and len(get_messages(request)) > 0
+
+
+def _asset_version():
+    """Hash of the collectstatic manifest, or of the built bundles when there is none"""
+    manifest = Path(settings.STATIC_ROOT) / 'staticfiles.json' if settings.STATIC_ROOT else None
+    paths = [manifest] if manifest and manifest.is_file() else sorted(BUILD_DIR.glob('*'))
+    digest = hashlib.md5()
+    for path in paths:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+_asset_version_cached = lru_cache(maxsize=None)(_asset_version)
+
+
+def asset_version():
+    # A deploy restarts the workers; in development rebuilt bundles show up immediately
+    return _asset_version() if settings.DEBUG else _asset_version_cached()
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return {part.split(';')[0].strip().lower() for part in header.split(',') if part.strip()}
+
+
+def build_entry(response):
+    """Precompress a rendered response into the cached representation"""
+    content = response.content
+    return {
+        'content_type': response['Content-Type'],
+        'identity': content,
+        'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+        'br': brotli.compress(content, quality=11) if brotli else None,
+    }
+
+
+def response_from_entry(request, entry):
+    """Pick the best variant the client accepts"""
+    accepted = _accepted_encodings(request)
+    if entry['br'] is not None and 'br' in accepted:
+        encoding, body = 'br', entry['br']
+    elif 'gzip' in accepted:
+        encoding, body = 'gzip', entry['gzip']
+    else:
+        encoding, body = None, entry['identity']
+
+    response = HttpResponse(body, content_type=entry['content_type'])
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(body))
+    return response
+
+
+def anonymous_page_cache(key, depends_on, timeout=None):
+    """
+    Cache a view's full response for anonymous GET/HEAD requests.
+    The entry is keyed by the asset version and the querycache versions of
+    `depends_on`, so a deploy or a write to any of those models invalidates it.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _is_anonymous(request) or _has_pending_messages(request):
+                response = view_func(request, *args, **kwargs)
+                patch_vary_headers(response, ('Cookie',))
+                return response
+
+            versions = '.'.join(str(querycache.get_version(model)) for model in depends_on)
+            cache_key = f'page:{key}:{asset_version()}:{versions}'
+            entry = cache.get(cache_key)
+            if entry is None:
+                metrics.incr(f'pagecache.{key}.miss')
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming or response.cookies:
+                    return response
+                entry = build_entry(response)
+                cache.set(cache_key, entry, timeout or getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60))
+            else:
+                metrics.incr(f'pagecache.{key}.hit')
+
+            response = response_from_entry(request, entry)
+            patch_vary_headers(response, ('Cookie', 'Accept-Encoding'))
+            return response
+        return _wrapped_view
+    return decorator
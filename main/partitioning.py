@@ -0,0 +1,194 @@
+"""
+Optional monthly range partitioning of main_reservation on PostgreSQL.
+
+    python manage.py reservation_partitions --convert        # one-off migration
+    python manage.py reservation_partitions --months-ahead 3  # cron, e.g. daily
+
+`--convert` rebuilds main_reservation as a table partitioned by month on
+appointment_datetime: the existing table is renamed, a partitioned copy with
+the same columns, indexes and foreign keys is created, rows are copied over
+and the old table is dropped (or kept with --keep-old). PostgreSQL requires
+the partition key in the primary key, so it becomes (id, appointment_datetime);
+ids still come from a sequence and Django keeps using `id` as the pk.
+
+A DEFAULT partition catches rows outside the created months, and creating a
+month later moves any such rows into it. On SQLite (and on an unconverted
+PostgreSQL table) everything here is a no-op and the table stays unpartitioned.
+
+Queries prune partitions when they compare appointment_datetime directly with
+constant bounds; `datetime_bounds()` builds those instead of `__date` lookups.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLE = 'main_reservation'
+LEGACY_TABLE = 'main_reservation_unpartitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_id_seq'
+
+
+def datetime_bounds(start_date, end_date=None):
+    """
+    Aware [start, end) datetimes covering start_date..end_date (inclusive,
+    defaults to a single day) in the current time zone
+    """
+    end_date = end_date or start_date
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def month_range(first, last):
+    """Month starts from `first` through `last` (inclusive)"""
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions():
+    """Names of the partitions currently attached to main_reservation"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _bounds_sql(month):
+    # UTC bounds so partitions line up the same whatever the session time zone is
+    return f"'{month:%Y-%m-%d} 00:00:00+00'", f"'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'"
+
+
+def create_month_partition(cursor, month):
+    """
+    Create and attach one month's partition. Rows for that month that landed
+    in the DEFAULT partition are moved into it first (attaching would fail
+    otherwise).
+    """
+    name = partition_name(month)
+    lower, upper = _bounds_sql(month)
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+        f'WHERE appointment_datetime >= {lower} AND appointment_datetime < {upper} RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM ({lower}) TO ({upper})')
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """Create any missing partitions from the current month to `months_ahead` months out"""
+    if not is_partitioned():
+        return []
+    first = month_start(today or timezone.now().date())
+    wanted = list(month_range(first, add_months(first, months_ahead)))
+    existing = existing_partitions()
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month in wanted:
+            if partition_name(month) not in existing:
+                create_month_partition(cursor, month)
+                created.append(partition_name(month))
+    return created
+
+
+def convert_to_partitioned(months_ahead=3, keep_old=False):
+    """
+    One-off migration of an existing unpartitioned main_reservation.
+    Runs in a single transaction holding an exclusive lock on the table.
+    Returns the names of the partitions created.
+    """
+    if not is_supported():
+        raise RuntimeError('Reservation partitioning requires PostgreSQL.')
+    if is_partitioned():
+        return []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        index_defs = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min(appointment_datetime), max(appointment_datetime), max(id) FROM "{TABLE}"')
+        oldest, newest, max_id = cursor.fetchone()
+
+        # Free up the names (table, pkey, indexes, id sequence) for the new table
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" RENAME CONSTRAINT "{TABLE}_pkey" TO "{LEGACY_TABLE}_pkey"')
+        for index_name, _ in index_defs:
+            cursor.execute(f'DROP INDEX "{index_name}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS "{SEQUENCE}"')
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (appointment_datetime)'
+        )
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+        cursor.execute(f'''ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval('"{SEQUENCE}"')''')
+        if max_id:
+            cursor.execute('SELECT setval(%s, %s)', [SEQUENCE, max_id])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id, appointment_datetime)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        first = month_start(oldest.date() if oldest else timezone.now().date())
+        last = add_months(month_start(max(newest.date() if newest else first, timezone.now().date())), months_ahead)
+        created = []
+        for month in month_range(first, last):
+            create_month_partition(cursor, month)
+            created.append(partition_name(month))
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY_TABLE}"')
+
+        # The definitions name the table as main_reservation, which is now the partitioned one
+        for _, index_def in index_defs:
+            cursor.execute(index_def)
+        for constraint_name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" DROP CONSTRAINT "{constraint_name}"')
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{constraint_name}" {definition}')
+
+        if not keep_old:
+            cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+    return created
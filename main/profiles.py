@@ -0,0 +1,135 @@
+"""
+Per-request user, profile and role resolution.
+
+ProfileBackend loads the user together with barber_profile and
+customer_profile in one joined query (both at login and on every request via
+AuthenticationMiddleware), so `user.barber_profile` / `hasattr(user,
+"customer_profile")` never hit the database again; aget_user does the same
+for request.auser() under ASGI. ProfileMiddleware then exposes the result
+lazily:
+
+    request.role              'barber' | 'customer' | 'staff' | 'user' | 'anonymous'
+    request.profile.barber    Barber or None
+    request.profile.customer  Customer or None
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.utils.functional import SimpleLazyObject, cached_property
+
+ROLE_BARBER = 'barber'
+ROLE_CUSTOMER = 'customer'
+ROLE_STAFF = 'staff'
+ROLE_USER = 'user'
+ROLE_ANONYMOUS = 'anonymous'
+
+PROFILE_RELATIONS = ('barber_profile', 'customer_profile')
+
+# Dotted path for login() after registration (ModelBackend is configured too)
+PROFILE_BACKEND = 'main.profiles.ProfileBackend'
+
+
+def users_with_profiles():
+    return get_user_model()._default_manager.select_related(*PROFILE_RELATIONS)
+
+
+def get_barber(user):
+    """The user's Barber profile or None (no query once the profile is loaded)"""
+    return getattr(user, 'barber_profile', None) if user.is_authenticated else None
+
+
+def get_customer(user):
+    return getattr(user, 'customer_profile', None) if user.is_authenticated else None
+
+
+def get_role(user):
+    """Same precedence as the login redirect: barber, customer, staff, plain user"""
+    if not user.is_authenticated:
+        return ROLE_ANONYMOUS
+    role = getattr(user, '_trimly_role', None)
+    if role is None:
+        if get_barber(user) is not None:
+            role = ROLE_BARBER
+        elif get_customer(user) is not None:
+            role = ROLE_CUSTOMER
+        elif user.is_staff or user.is_superuser:
+            role = ROLE_STAFF
+        else:
+            role = ROLE_USER
+        user._trimly_role = role
+    return role
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend that fetches both profiles in the same query as the user"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = users_with_profiles().get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Run the hasher anyway so missing users take as long as wrong passwords
+            UserModel().set_password(password)
+            raise PermissionDenied
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        # Stop authenticate() here: ModelBackend (listed for old sessions) would hash again
+        raise PermissionDenied
+
+    def get_user(self, user_id):
+        try:
+            user = users_with_profiles().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # request.auser() under ASGI; ModelBackend's version would drop the select_related
+        try:
+            user = await users_with_profiles().aget(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class RequestProfile:
+    """Lazily resolved role and profiles of request.user"""
+
+    def __init__(self, request):
+        self._request = request
+
+    @cached_property
+    def role(self):
+        return get_role(self._request.user)
+
+    @cached_property
+    def barber(self):
+        return get_barber(self._request.user)
+
+    @cached_property
+    def customer(self):
+        return get_customer(self._request.user)
+
+
+class ProfileMiddleware:
+    """Attach request.profile and a lazy request.role (must follow AuthenticationMiddleware)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Under ASGI get_response is async and this returns its coroutine
+        request.profile = RequestProfile(request)
+        request.role = SimpleLazyObject(lambda: request.profile.role)
+        return self.get_response(request)
+
@@ -0,0 +1,246 @@
+"""
+On-demand view profiling.
+
+ProfilingMiddleware runs the view under cProfile when a staff user asks for
+it (X-Profile: 1 header or ?profile=1) or, for URL names listed in
+PROFILE_SAMPLE_RATES ({url_name: N}), for about 1 in N requests from
+anyone. Other requests pay a header check and a dict lookup.
+
+Each profile is saved to PROFILE_DIR as <id>.prof (pstats format, for
+snakeviz and friends) and <id>.json with the request and a breakdown of
+where the time went:
+- sql: time in database queries (timed by an execute_wrapper);
+- templates: time inside Template.render, minus the queries it ran;
+- python: the rest of the view.
+Staff can browse them at /admin-dashboard/profiles/. Only the newest
+PROFILE_KEEP profiles are kept.
+
+The middleware must come last in MIDDLEWARE: it calls the view itself from
+process_view. Async views (ASGI mode) are not profiled.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+
+from . import metrics
+from .logs import get_request_id
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+_VALID_PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+_TEMPLATE_RENDER = Template.render.__code__
+_TEMPLATE_DIR = os.sep + os.path.join('django', 'template') + os.sep
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def _profile_requested(request):
+    return request.headers.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_PARAM) == '1'
+
+
+def _sampled(url_name):
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATES', {}).get(url_name)
+    return bool(rate) and random.randrange(rate) == 0
+
+
+# -------------------------------
+# MEASURING
+# -------------------------------
+
+class QueryTimer:
+    """execute_wrapper totalling query time, and the part issued while rendering templates"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self._in_template():
+                self.template_seconds += elapsed
+
+    @staticmethod
+    def _in_template():
+        frame = sys._getframe(2)
+        while frame is not None:
+            if _TEMPLATE_DIR in frame.f_code.co_filename:
+                return True
+            frame = frame.f_back
+        return False
+
+
+def _template_seconds(stats):
+    """Cumulative time in Template.render (nested renders counted once)"""
+    key = (_TEMPLATE_RENDER.co_filename, _TEMPLATE_RENDER.co_firstlineno, _TEMPLATE_RENDER.co_name)
+    entry = stats.stats.get(key)
+    return entry[3] if entry else 0.0
+
+
+def profile_call(func, *args, **kwargs):
+    """Run func under cProfile; returns (result, pstats.Stats, breakdown)"""
+    timer = QueryTimer()
+    profiler = cProfile.Profile()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+            # Lazy responses (TemplateResponse) render here, still under the profiler
+            if hasattr(result, 'render') and callable(result.render) and not getattr(result, 'is_rendered', True):
+                result.render()
+        finally:
+            profiler.disable()
+            total = time.perf_counter() - started
+    stats = pstats.Stats(profiler)
+    templates = max(0.0, _template_seconds(stats) - timer.template_seconds)
+    breakdown = {
+        'total_ms': round(total * 1000, 2),
+        'sql_ms': round(timer.seconds * 1000, 2),
+        'sql_queries': timer.count,
+        'templates_ms': round(templates * 1000, 2),
+        'python_ms': round(max(0.0, total - timer.seconds - templates) * 1000, 2),
+    }
+    return result, stats, breakdown
+
+
+# -------------------------------
+# STORAGE
+# -------------------------------
+
+def save(stats, info):
+    """Write <id>.prof and <id>.json to PROFILE_DIR; returns the id"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f'{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}'
+    stats.dump_stats(directory / f'{profile_id}.prof')
+    (directory / f'{profile_id}.json').write_text(json.dumps({'id': profile_id, **info}, default=str))
+    _prune(directory)
+    metrics.incr('profiling.saved')
+    return profile_id
+
+
+def _prune(directory):
+    keep = getattr(settings, 'PROFILE_KEEP', 200)
+    for meta in sorted(directory.glob('*.json'), reverse=True)[keep:]:
+        meta.unlink(missing_ok=True)
+        meta.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def list_profiles(limit=200):
+    """Saved profiles' metadata, newest first"""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for meta in sorted(directory.glob('*.json'), reverse=True)[:limit]:
+        try:
+            profiles.append(json.loads(meta.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, suffix):
+    """Path of a saved profile's file, or None for an unknown/invalid id"""
+    if not _VALID_PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f'{profile_id}{suffix}'
+    return path if path.is_file() else None
+
+
+def report(profile_id, sort='cumulative', limit=60):
+    """(metadata, top functions as text) for a saved profile, or None"""
+    meta_path, prof_path = profile_path(profile_id, '.json'), profile_path(profile_id, '.prof')
+    if meta_path is None or prof_path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(prof_path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return json.loads(meta_path.read_text()), out.getvalue()
+
+
+# -------------------------------
+# MIDDLEWARE
+# -------------------------------
+
+class ProfilingMiddleware:
+    """Profile staff-requested or sampled views (keep it last in MIDDLEWARE)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Keeps the common no-profile path on the event loop, without a thread hop
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        # A coroutine in async mode; the handler awaits it
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trigger = self.trigger(request, request.user if _profile_requested(request) else None)
+        if trigger is None or iscoroutinefunction(view_func):
+            return None
+        return self.profile(trigger, request, view_func, view_args, view_kwargs)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            return None
+        trigger = self.trigger(request, await request.auser() if _profile_requested(request) else None)
+        if trigger is None:
+            return None
+        return await sync_to_async(self.profile)(trigger, request, view_func, view_args, view_kwargs)
+
+    def trigger(self, request, requesting_user):
+        if requesting_user is not None and requesting_user.is_staff:
+            return 'request'
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        return 'sample' if _sampled(url_name) else None
+
+    def profile(self, trigger, request, view_func, view_args, view_kwargs):
+        response, stats, breakdown = profile_call(view_func, request, *view_args, **view_kwargs)
+        user = request.user
+        profile_id = save(stats, {
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'url_name': request.resolver_match.url_name if request.resolver_match else None,
+            'view': f'{view_func.__module__}.{getattr(view_func, "__qualname__", view_func.__name__)}',
+            'status': response.status_code,
+            'user': user.get_username() if user.is_authenticated else None,
+            'trigger': trigger,
+            'request_id': get_request_id(),
+            **breakdown,
+        })
+        if trigger == 'request':
+            response['X-Profile-Id'] = profile_id
+        return response
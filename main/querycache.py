@@ -0,0 +1,101 @@
+"""
+Versioned ORM query cache for read-mostly tables.
+
+Views declare what they want cached and which models the result depends on:
+
+    services = cached_queryset(
+        'services:active',
+        lambda: ServiceType.objects.filter(is_active=True).order_by('name'),
+        depends_on=[ServiceType],
+    )
+
+Every cached model has a version counter in the cache. Cache keys embed the
+current versions of their dependencies, and saving/deleting a row bumps the
+version, so stale entries are never read again and simply expire. Uses the
+'default' cache (Redis when REDIS_URL is set, locmem otherwise). Misses are
+filled from the primary database even inside @replica_reads views: a lagging
+replica would otherwise store pre-write rows under the post-write version.
+
+A version that goes missing (eviction, Redis restart) is re-seeded from the
+clock rather than a constant, so it can't come back to a value that older
+entries were cached under.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .routers import primary_reads
+
+KEY_PREFIX = 'qc'
+
+
+def _version_key(model):
+    return f'{KEY_PREFIX}:ver:{model._meta.label_lower}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def get_version(model):
+    """Current cache version for a model (seeded from the clock)"""
+    return cache.get_or_set(_version_key(model), _new_version, timeout=None)
+
+
+def bump_version(model):
+    """Invalidate every cached query that depends on `model`"""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing/evicted: start from a value no earlier entry can carry
+        cache.set(key, _new_version(), timeout=None)
+
+
+def cached_queryset(key, queryset, depends_on, timeout=None):
+    """
+    Return list(queryset) from cache, evaluating it only on a miss.
+    `queryset` may be a QuerySet or a zero-argument callable returning one
+    (a callable avoids even building the query on a hit).
+    """
+    versions = '.'.join(str(get_version(model)) for model in depends_on)
+    cache_key = f'{KEY_PREFIX}:{key}:{versions}'
+    result = cache.get(cache_key)
+    if result is None:
+        with primary_reads():
+            result = list(queryset() if callable(queryset) else queryset)
+        if timeout is None:
+            timeout = getattr(settings, 'QUERY_CACHE_TIMEOUT', 60 * 60)
+        cache.set(cache_key, result, timeout)
+    return result
+
+
+def _invalidate(sender, **kwargs):
+    bump_version(sender)
+
+
+def _invalidate_user(sender, update_fields=None, **kwargs):
+    # Cached barber lists embed user names; ignore the last_login write done on every login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_version(User)
+
+
+def register(model):
+    """Invalidate cached queries for `model` whenever one of its rows changes"""
+    uid = f'main.querycache.{model._meta.label_lower}'
+    post_save.connect(_invalidate, sender=model, dispatch_uid=f'{uid}.save')
+    post_delete.connect(_invalidate, sender=model, dispatch_uid=f'{uid}.delete')
+
+
+def install():
+    """Register the read-mostly models; called from MainConfig.ready()"""
+    from .models import Barber, ServiceType, WeeklyAvailability
+
+    for model in (ServiceType, Barber, WeeklyAvailability):
+        register(model)
+    post_save.connect(_invalidate_user, sender=User, dispatch_uid='main.querycache.auth.user.save')
+    post_delete.connect(_invalidate, sender=User, dispatch_uid='main.querycache.auth.user.delete')
@@ -0,0 +1,153 @@
+"""
+Sliding-window rate limits for API endpoints.
+
+Limits are set per URL name in RATE_LIMITS ({url_name: (limit, window
+seconds)}) and apply to each logged-in user, or to each client IP for
+anonymous requests. RateLimitMiddleware enforces them for every configured
+URL; `@rate_limit(...)` does the same for a single view with its own
+limit. Over the limit, the response is a JSON 429 with Retry-After.
+
+Counts live in the 'default' cache (Redis when REDIS_URL is set, locmem
+otherwise) as one counter per fixed window, and a request is judged on the
+sliding estimate `previous * (1 - elapsed / window) + current`. That is two
+keys per client and endpoint, an atomic add/incr per request, and no burst
+of 2x the limit at window boundaries the way plain fixed windows allow.
+Rejected requests count too, so a client hammering the endpoint stays
+blocked until it backs off. If the cache is unreachable, requests are let
+through.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from . import metrics
+from .throttle import client_ip
+
+DEFAULT_RATE_LIMITS = {
+    # url_name: (requests, window in seconds)
+    'get_available_slots_api': (60, 60),
+}
+
+
+def get_rate_limits():
+    return getattr(settings, 'RATE_LIMITS', DEFAULT_RATE_LIMITS)
+
+
+def client_key(request):
+    """The user id when logged in, else the client IP (hashed)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return 'ip:' + hashlib.sha256(client_ip(request).encode()).hexdigest()[:32]
+
+
+def _retry_after(previous, current, elapsed, limit, window):
+    """Seconds until the sliding estimate leaves room for one more request"""
+    if current < limit:
+        # Wait for the previous window's weight to decay enough
+        wait = window * (1 - (limit - 1 - current) / previous) - elapsed
+    else:
+        # Wait for the next window, then for this one's weight to decay
+        wait = (window - elapsed) + window * (1 - (limit - 1) / current)
+    return max(1, math.ceil(wait))
+
+
+def hit(name, identity, limit, window, now=None):
+    """Count a request; returns 0 if it is within the limit, else the Retry-After in seconds"""
+    now = time.time() if now is None else now
+    index, elapsed = divmod(now, window)
+    prefix = f'ratelimit:{name}:{identity}'
+    current_key = f'{prefix}:{int(index)}'
+    try:
+        cache.add(current_key, 0, timeout=window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # evicted between add and incr
+            cache.set(current_key, 1, timeout=window * 2)
+            current = 1
+        previous = cache.get(f'{prefix}:{int(index) - 1}', 0)
+    except Exception:
+        metrics.incr(f'ratelimit.{name}.cache_errors')
+        return 0
+    estimate = previous * (1 - elapsed / window) + current
+    if estimate <= limit:
+        metrics.incr(f'ratelimit.{name}.allowed')
+        return 0
+    metrics.incr(f'ratelimit.{name}.rejected')
+    return _retry_after(previous, current, elapsed, limit, window)
+
+
+def too_many_requests(wait):
+    response = JsonResponse(
+        {"success": False, "error": f"Too many requests. Please try again in {wait} seconds."}, status=429
+    )
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def check(request, name, limit, window):
+    """The 429 response when the request is over the limit, else None"""
+    wait = hit(name, client_key(request), limit, window)
+    return too_many_requests(wait) if wait else None
+
+
+def rate_limit(name, limit, window):
+    """Limit a (sync or async) view to `limit` requests per `window` seconds per client"""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                response = await sync_to_async(check)(request, name, limit, window)
+                return response or await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def _wrapped_view(request, *args, **kwargs):
+                return check(request, name, limit, window) or view_func(request, *args, **kwargs)
+        _wrapped_view.rate_limited = True
+        return _wrapped_view
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Apply RATE_LIMITS by URL name (views with their own @rate_limit are skipped)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # A coroutine in async mode; the handler awaits it
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        rule = get_rate_limits().get(url_name)
+        if rule is None or getattr(view_func, 'rate_limited', False):
+            return None
+        return check(request, url_name, *rule)
+
+
+def rate_limit_stats():
+    """Allowed/rejected counts in this process per limited endpoint, with configured limits"""
+    stats = {
+        name: {'limit': limit, 'window': window, 'allowed': 0, 'rejected': 0}
+        for name, (limit, window) in get_rate_limits().items()
+    }
+    for counter, value in metrics.get_counters('ratelimit.').items():
+        name, outcome = counter[len('ratelimit.'):].rsplit('.', 1)
+        stats.setdefault(name, {})[outcome] = value
+    return stats
+
+
+def install():
+    """Expose rate-limit counters on the metrics endpoint; called from MainConfig.ready()"""
+    metrics.register_collector('rate_limits', rate_limit_stats)
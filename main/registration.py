@@ -0,0 +1,150 @@
+"""
+Account registration shared by the sign-up form and the admin create views.
+
+All input checks run up front and every uniqueness condition (username,
+email, customer phone, barber phone) is answered by one UNION ALL query.
+Emails compare case-insensitively. The User and its profile are then
+written in a single transaction. Unique constraints on username,
+lower(email) (non-empty) and the phone number within each profile table
+back the check, so a concurrent sign-up that slips past it fails with
+IntegrityError instead of creating a duplicate. The rule that a customer
+and a barber can't share a phone number is only checked here, not by the
+database, so two concurrent sign-ups can still both claim one.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Lower
+
+from .models import Barber, Customer
+
+ROLE_PROFILES = {'customer': Customer, 'barber': Barber}
+
+CONFLICT_MESSAGES = {
+    'username': "Username already taken.",
+    'email': "Email already registered.",
+    'phone': "Phone number already registered.",
+}
+
+
+def validate_phone_number(phone_number):
+    if not phone_number:
+        raise ValidationError("Phone number required.")
+
+    clean_phone = re.sub(r'[\s\-]', '', phone_number)
+
+    if not re.match(r'^09[0-9]{9}$', clean_phone):
+        raise ValidationError("Phone must be 09XXXXXXXXX format.")
+
+    return clean_phone
+
+
+def users_with_email(users, email):
+    """Users whose email matches case-insensitively (LOWER(email) is indexed)"""
+    return users.alias(email_lower=Lower('email')).filter(email_lower=email.lower())
+
+
+def _kind(queryset, kind):
+    return queryset.order_by().annotate(kind=Value(kind, output_field=CharField())).values_list('kind', flat=True)
+
+
+def find_conflicts(username=None, email=None, phone=None, exclude_user=None):
+    """
+    Which of username/email/phone are already taken, in one query. A phone
+    number counts as taken by either profile type. `exclude_user` skips that
+    user's own rows (for edits).
+    """
+    users, customers, barbers = User.objects.all(), Customer.objects.all(), Barber.objects.all()
+    if exclude_user is not None:
+        users = users.exclude(pk=exclude_user.pk)
+        customers = customers.exclude(user_id=exclude_user.pk)
+        barbers = barbers.exclude(user_id=exclude_user.pk)
+
+    parts = []
+    if username:
+        parts.append(_kind(users.filter(username=username), 'username'))
+    if email:
+        parts.append(_kind(users_with_email(users, email), 'email'))
+    if phone:
+        parts.append(_kind(customers.filter(phone_number=phone), 'phone'))
+        parts.append(_kind(barbers.filter(phone_number=phone), 'phone'))
+    if not parts:
+        return set()
+    return set(parts[0].union(*parts[1:], all=True))
+
+
+def validate_registration(username, email, first_name, last_name, phone_number, password,
+                          confirm_password=None, role=None, require_role=False):
+    """Return (errors, clean_phone); errors is a list of user-facing messages"""
+    errors = []
+    clean_phone = None
+
+    required = [username, email, first_name, last_name, phone_number, password]
+    if confirm_password is not None:
+        required.append(confirm_password)
+    if require_role:
+        required.append(role)
+    if not all(required):
+        errors.append("All fields are required.")
+
+    if phone_number:
+        try:
+            clean_phone = validate_phone_number(phone_number)
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+    if confirm_password is not None and password != confirm_password:
+        errors.append("Passwords do not match.")
+
+    if email:
+        try:
+            EmailValidator(message="Enter a valid email address.")(email)
+        except ValidationError:
+            errors.append("Enter a valid email address.")
+
+    conflicts = find_conflicts(username, email, clean_phone)
+    errors.extend(CONFLICT_MESSAGES[kind] for kind in ('username', 'email', 'phone') if kind in conflicts)
+
+    if password:
+        try:
+            validate_password(password)
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+    return errors, clean_phone
+
+
+def register_user(username, email, first_name, last_name, phone_number, password, role,
+                  confirm_password=None, require_role=False):
+    """
+    Validate and create the User plus its Customer/Barber profile atomically.
+    Raises ValidationError with every problem found; returns the new user.
+    """
+    errors, clean_phone = validate_registration(
+        username, email, first_name, last_name, phone_number, password,
+        confirm_password=confirm_password, role=role, require_role=require_role,
+    )
+    if errors:
+        raise ValidationError(errors)
+
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=username,
+                email=email,
+                password=password,
+                first_name=first_name,
+                last_name=last_name,
+            )
+            profile_model = ROLE_PROFILES.get(role)
+            if profile_model is not None:
+                profile_model.objects.create(user=user, phone_number=clean_phone)
+    except IntegrityError:
+        # Lost a race with a concurrent sign-up; the unique constraints caught it
+        raise ValidationError("Username, email or phone number already registered.")
+    return user
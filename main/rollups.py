@@ -0,0 +1,231 @@
+"""
+Daily booking rollups for reporting.
+
+One DailyBookingRollup row per (date, barber, service_type, booking_source,
+status) holds the number of bookings, their summed price and minutes. Every
+Reservation save/delete moves its contribution from the old key to the new
+one (e.g. a status change from 'confirmed' to 'completed'), so reports read a
+few hundred rollup rows instead of scanning every reservation ever made.
+
+Writes that bypass model signals (queryset.update()) must call
+`rebuild(dates)` for the days they touched; `manage.py rebuild_rollups`
+recomputes everything from Reservation + ArchivedReservation. Archiving does
+not change the rollups (see `paused()`).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+from . import metrics
+from .partitioning import datetime_bounds
+
+KEY_FIELDS = ('barber_id', 'service_type_id', 'booking_source', 'status')
+_SNAPSHOT_FIELDS = KEY_FIELDS + ('appointment_datetime', 'price', 'duration')
+
+_paused = ContextVar('rollups_paused', default=False)
+
+
+@contextmanager
+def paused():
+    """Ignore Reservation signals inside the block (used when rows only move to the archive)"""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+# -------------------------------
+# INCREMENTAL MAINTENANCE
+# -------------------------------
+
+def _snapshot(values):
+    """(key, price, minutes) contributed by a reservation, from a dict of its field values"""
+    if any(values.get(name) is None for name in _SNAPSHOT_FIELDS):
+        return None
+    key = {'barber_id': values['barber_id'], 'service_type_id': values['service_type_id'],
+           'booking_source': values['booking_source'], 'status': values['status'],
+           'date': timezone.localdate(values['appointment_datetime'])}
+    return key, Decimal(str(values['price'])), values['duration']
+
+
+def _apply(snapshot, sign):
+    from .models import DailyBookingRollup
+
+    key, price, minutes = snapshot
+    changes = {
+        'booking_count': F('booking_count') + sign,
+        'revenue': F('revenue') + sign * price,
+        'minutes_booked': F('minutes_booked') + sign * minutes,
+    }
+    if DailyBookingRollup.objects.filter(**key).update(**changes):
+        return
+    if sign < 0:
+        # Nothing to subtract from: the row went with a cascading Barber/ServiceType
+        # delete (inserting one would point at the parent being deleted)
+        metrics.incr('rollups.missing_rows')
+        return
+    try:
+        with transaction.atomic():
+            DailyBookingRollup.objects.create(
+                **key, booking_count=sign, revenue=sign * price, minutes_booked=sign * minutes
+            )
+    except IntegrityError:
+        # Created concurrently between our update and insert
+        DailyBookingRollup.objects.filter(**key).update(**changes)
+
+
+def _loaded_values(instance):
+    """Snapshot fields present on the instance (deferred fields are missing from __dict__)"""
+    return {name: instance.__dict__[name] for name in _SNAPSHOT_FIELDS if name in instance.__dict__}
+
+
+def _remember(sender, instance, **kwargs):
+    instance._rollup_values = _loaded_values(instance) if instance.pk else {}
+
+
+def _before_save(sender, instance, raw=False, **kwargs):
+    # Instances loaded with .only()/.defer() only know some fields; read the stored row instead
+    if raw or not instance.pk or _snapshot(getattr(instance, '_rollup_values', {})) is not None:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(*_SNAPSHOT_FIELDS).first()
+    instance._rollup_values = stored or {}
+
+
+def _after_save(sender, instance, raw=False, **kwargs):
+    if raw or _paused.get():
+        return
+    old_values = getattr(instance, '_rollup_values', {})
+    new_values = {**old_values, **_loaded_values(instance)}
+    instance._rollup_values = new_values
+    old, new = _snapshot(old_values), _snapshot(new_values)
+    if old == new:
+        return
+    if old:
+        _apply(old, -1)
+    if new:
+        _apply(new, 1)
+    metrics.incr('rollups.incremental_updates')
+
+
+def _after_delete(sender, instance, **kwargs):
+    if _paused.get():
+        return
+    values = {**getattr(instance, '_rollup_values', {}), **_loaded_values(instance)}
+    snapshot = _snapshot(values)
+    if snapshot:
+        _apply(snapshot, -1)
+
+
+def install():
+    """Keep rollups in step with Reservation writes; called from MainConfig.ready()"""
+    from .models import ArchivedReservation, Reservation
+
+    post_init.connect(_remember, sender=Reservation, dispatch_uid='main.rollups.init')
+    pre_save.connect(_before_save, sender=Reservation, dispatch_uid='main.rollups.pre_save')
+    post_save.connect(_after_save, sender=Reservation, dispatch_uid='main.rollups.save')
+    post_delete.connect(_after_delete, sender=Reservation, dispatch_uid='main.rollups.delete')
+    post_delete.connect(_after_delete, sender=ArchivedReservation, dispatch_uid='main.rollups.archived_delete')
+
+
+# -------------------------------
+# REBUILD
+# -------------------------------
+
+def _aggregate(queryset):
+    return (
+        queryset.annotate(day=TruncDate('appointment_datetime'))
+        .values('day', *KEY_FIELDS)
+        .annotate(count=Count('id'), revenue=Sum('price'), minutes=Sum('duration'))
+        .order_by()
+    )
+
+
+def rebuild(dates=None):
+    """
+    Recompute rollups from raw rows, for the given dates (an iterable of
+    datetime.date) or for all history. Returns the number of rollup rows written.
+    """
+    from .models import ArchivedReservation, DailyBookingRollup, Reservation
+
+    if dates is not None:
+        dates = sorted(set(dates))
+        if not dates:
+            return 0
+
+    totals = {}
+    for model in (Reservation, ArchivedReservation):
+        queryset = model.objects.all()
+        if dates is not None:
+            start, end = datetime_bounds(dates[0], dates[-1])
+            queryset = queryset.filter(appointment_datetime__gte=start, appointment_datetime__lt=end)
+        for row in _aggregate(queryset):
+            if dates is not None and row['day'] not in dates:
+                continue
+            key = (row['day'],) + tuple(row[name] for name in KEY_FIELDS)
+            count, revenue, minutes = totals.get(key, (0, Decimal('0'), 0))
+            totals[key] = (count + row['count'], revenue + (row['revenue'] or 0), minutes + (row['minutes'] or 0))
+
+    rollups = [
+        DailyBookingRollup(
+            date=key[0], barber_id=key[1], service_type_id=key[2], booking_source=key[3], status=key[4],
+            booking_count=count, revenue=revenue, minutes_booked=minutes,
+        )
+        for key, (count, revenue, minutes) in totals.items()
+    ]
+    with transaction.atomic():
+        stale = DailyBookingRollup.objects.all()
+        if dates is not None:
+            stale = stale.filter(date__in=dates)
+        stale.delete()
+        DailyBookingRollup.objects.bulk_create(rollups, batch_size=1000)
+    metrics.incr('rollups.rebuilds')
+    return len(rollups)
+
+
+# -------------------------------
+# REPORTS
+# -------------------------------
+
+def report(weeks=8):
+    """Headline numbers and breakdowns for the admin dashboard, from rollups only"""
+    from .models import DailyBookingRollup
+
+    rollups = DailyBookingRollup.objects.all()
+    completed = rollups.filter(status='completed')
+
+    totals = rollups.aggregate(bookings=Sum('booking_count'))
+    revenue = completed.aggregate(revenue=Sum('revenue'), minutes=Sum('minutes_booked'), count=Sum('booking_count'))
+    no_shows = rollups.filter(status='no_show').aggregate(count=Sum('booking_count'))['count'] or 0
+    attended = revenue['count'] or 0
+
+    since = timezone.localdate() - timedelta(weeks=weeks)
+    weekly = {}
+    for row in completed.filter(date__gte=since).values('date', 'revenue'):
+        week = row['date'] - timedelta(days=row['date'].weekday())
+        weekly[week] = weekly.get(week, 0) + row['revenue']
+
+    return {
+        'total_bookings': totals['bookings'] or 0,
+        'total_revenue': revenue['revenue'] or Decimal('0'),
+        'minutes_booked': revenue['minutes'] or 0,
+        'no_show_rate': round(100 * no_shows / (no_shows + attended), 1) if no_shows + attended else 0,
+        'revenue_by_barber': list(
+            completed.values('barber_id', 'barber__user__first_name', 'barber__user__last_name')
+            .annotate(revenue=Sum('revenue'), bookings=Sum('booking_count'))
+            .order_by('-revenue')
+        ),
+        'revenue_by_service': list(
+            completed.values('service_type_id', 'service_type__name')
+            .annotate(revenue=Sum('revenue'), bookings=Sum('booking_count'))
+            .order_by('-revenue')
+        ),
+        'revenue_by_week': sorted(weekly.items(), reverse=True),
+    }
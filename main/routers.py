@@ -0,0 +1,131 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# Alias chosen for reads in the current request (None = primary).
+_read_alias = ContextVar('read_alias', default=None)
+
+PIN_COOKIE_NAME = 'trimly_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_replica_aliases():
+    """Configured read-replica aliases (see DB_REPLICA_URLS in settings)"""
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def is_pinned_to_primary(request):
+    """True while the user is inside the read-your-writes window after a write"""
+    pinned_until = request.COOKIES.get(PIN_COOKIE_NAME)
+    try:
+        return pinned_until is not None and float(pinned_until) > time.time()
+    except ValueError:
+        return False
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes (and migrations) to 'default'. Reads go to a replica only
+    inside views wrapped with @replica_reads; everything else - including the
+    whole booking write path - keeps reading from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {'default', *get_replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def replica_reads(view_func):
+    """
+    Decorator for read-only views: route their queries to a read replica.
+    Falls back to the primary for non-safe methods, when no replicas are
+    configured, or while the user is pinned after their own write.
+    """
+    def _replica_for(request):
+        replicas = get_replica_aliases()
+        if not replicas or request.method not in SAFE_METHODS or is_pinned_to_primary(request):
+            return None
+        return random.choice(replicas)
+
+    if iscoroutinefunction(view_func):
+        # The alias is a ContextVar, so the async ORM's worker thread sees it too
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            token = _read_alias.set(_replica_for(request))
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = _read_alias.set(_replica_for(request))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return _wrapped_view
+
+
+@contextmanager
+def primary_reads():
+    """Send reads inside the block to the primary, even within @replica_reads"""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaPinningMiddleware:
+    """
+    After any successful write request (POST, PUT, ...), pin the user to the
+    primary for REPLICA_PIN_SECONDS so they always read their own writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (get_replica_aliases()
+                and request.method not in SAFE_METHODS
+                and response.status_code < 500):
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                str(time.time() + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,261 @@
+"""
+Slow-query log and per-fingerprint query stats.
+
+install() adds an execute_wrapper to every database connection as it is
+opened. Every query is timed and counted under its fingerprint: the SQL
+with literals and IN-lists collapsed, so the same statement with different
+values groups together. Fingerprints are cached per SQL string, so the
+overhead is a clock read and a dict update. The staff metrics endpoint
+shows the top fingerprints by total time under "slow_queries". A query run
+hundreds of times per request (e.g. the per-slot exists() in
+Schedule.get_available_slots) stands out there even when each run is fast.
+
+Queries slower than SLOW_QUERY_MS are also logged on the
+'main.slowqueries' logger with their duration, fingerprint, the view
+handling the request (QueryContextMiddleware) and the first call site in
+our code. With SLOW_QUERY_EXPLAIN = 'plan', slow SELECTs are re-run under
+EXPLAIN and the plan is logged and kept with the fingerprint. With
+'analyze', a SLOW_QUERY_ANALYZE_RATE fraction of them are run under
+EXPLAIN ANALYZE instead. That executes the query again, so it is limited
+to plain SELECTs and sampled.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+TOP_FINGERPRINTS = 20
+MAX_SQL_LENGTH = 2000
+
+_current_view = ContextVar('slowqueries_view', default=None)
+_explaining = threading.local()
+_lock = threading.Lock()
+_stats = {}
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_SKIP_DIRS = (
+    os.sep + 'django' + os.sep, os.sep + 'asgiref' + os.sep, os.sep + 'site-packages' + os.sep,
+    os.path.abspath(__file__),
+)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES \((?:[^()]|\([^()]*\))*\)(?:\s*,\s*\((?:[^()]|\([^()]*\))*\))+', re.IGNORECASE)
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+_SPACE = re.compile(r'\s+')
+
+
+def threshold_ms():
+    return getattr(settings, 'SLOW_QUERY_MS', 200)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """(id, normalized SQL): literals become ?, IN-lists and multi-row VALUES collapse"""
+    normalized = _SAVEPOINT.sub('"?"', sql)
+    normalized = _STRING.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = normalized.replace('%s', '?')
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _VALUES_LIST.sub('VALUES (...)', normalized)
+    normalized = _SPACE.sub(' ', normalized).strip()
+    return f'{zlib.crc32(normalized.encode()):08x}', normalized
+
+
+def call_site():
+    """First frame in this project outside Django (file:line in function)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and not any(part in filename for part in _SKIP_DIRS):
+            return f'{filename[len(_PROJECT_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+# -------------------------------
+# EXPLAIN
+# -------------------------------
+
+def _explain_mode():
+    mode = getattr(settings, 'SLOW_QUERY_EXPLAIN', 'off')
+    if mode == 'analyze' and random.random() >= getattr(settings, 'SLOW_QUERY_ANALYZE_RATE', 0.05):
+        return 'plan'
+    return mode
+
+
+def _is_plain_select(sql):
+    head = sql.lstrip().upper()
+    return head.startswith('SELECT') and ' FOR UPDATE' not in head and ' FOR SHARE' not in head
+
+
+def explain(connection, sql, params, analyze=False):
+    """The query plan as text, or None if it can't be explained"""
+    try:
+        prefix = connection.ops.explain_query_prefix(analyze=True) if analyze else connection.ops.explain_query_prefix()
+    except (NotImplementedError, ValueError):
+        if not analyze:
+            return None
+        prefix = connection.ops.explain_query_prefix()
+    _explaining.active = True
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction
+        with transaction.atomic(using=connection.alias, savepoint=connection.in_atomic_block):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _explaining.active = False
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+# -------------------------------
+# RECORDING
+# -------------------------------
+
+def _record(key, normalized, seconds, slow, plan=None, view=None, site=None):
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {'sql': normalized[:MAX_SQL_LENGTH], 'count': 0, 'total_ms': 0.0,
+                                   'max_ms': 0.0, 'slow': 0}
+        ms = seconds * 1000
+        entry['count'] += 1
+        entry['total_ms'] += ms
+        entry['max_ms'] = max(entry['max_ms'], ms)
+        if slow:
+            entry['slow'] += 1
+            entry['last_view'] = view
+            entry['last_call_site'] = site
+            if plan:
+                entry['plan'] = plan
+
+
+def query_stats(limit=TOP_FINGERPRINTS):
+    """Top fingerprints by total time in this process"""
+    with _lock:
+        entries = [dict(entry, fingerprint=key) for key, entry in _stats.items()]
+    entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    for entry in entries:
+        entry['total_ms'] = round(entry['total_ms'], 2)
+        entry['max_ms'] = round(entry['max_ms'], 2)
+        entry['mean_ms'] = round(entry['total_ms'] / entry['count'], 3)
+    return {'threshold_ms': threshold_ms(), 'fingerprints': len(entries), 'top': entries[:limit]}
+
+
+def reset():
+    """Forget all fingerprint stats (used by tests)"""
+    with _lock:
+        _stats.clear()
+
+
+def _log_slow(connection, sql, params, many, key, normalized, seconds):
+    view, site = _current_view.get(), call_site()
+    plan = None
+    mode = _explain_mode()
+    if mode != 'off' and not many and _is_plain_select(sql):
+        plan = explain(connection, sql, params, analyze=mode == 'analyze')
+    metrics.incr('db.slow_queries')
+    logger.warning(
+        "Slow query (%.1f ms) %s", seconds * 1000, key,
+        extra={
+            'fingerprint': key, 'duration_ms': round(seconds * 1000, 2), 'alias': connection.alias,
+            'sql': sql[:MAX_SQL_LENGTH], 'view': view, 'call_site': site, 'plan': plan,
+        },
+    )
+    return view, site, plan
+
+
+def query_logger(execute, sql, params, many, context):
+    """execute_wrapper: time the query, record its fingerprint, log it if slow"""
+    if getattr(_explaining, 'active', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        key, normalized = fingerprint(sql)
+        limit = threshold_ms()
+        if limit is not None and seconds * 1000 >= limit:
+            view, site, plan = _log_slow(context['connection'], sql, params, many, key, normalized, seconds)
+            _record(key, normalized, seconds, True, plan, view, site)
+        else:
+            _record(key, normalized, seconds, False)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects of the same DatabaseWrapper
+    if query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_logger)
+
+
+def install():
+    """Instrument every database connection; called from MainConfig.ready()"""
+    connection_created.connect(_on_connection_created, dispatch_uid='main.slowqueries.connection_created')
+    metrics.register_collector('slow_queries', query_stats)
+
+
+# -------------------------------
+# VIEW CONTEXT
+# -------------------------------
+
+class QueryContextMiddleware:
+    """Remember which view is running, for slow-query log lines"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # process_view sets the view inside this request; restore the outer value after it
+        token = _current_view.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_view.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_view.set(None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_view.set(self.view_name(request, view_func))
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # process_view is this method in async mode, so don't call through it
+        _current_view.set(self.view_name(request, view_func))
+
+    @staticmethod
+    def view_name(request, view_func):
+        name = request.resolver_match.view_name if request.resolver_match else None
+        return name or f'{view_func.__module__}.{getattr(view_func, "__qualname__", "view")}'
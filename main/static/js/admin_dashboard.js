@@ -0,0 +1,132 @@
+function closeModal(modalId, event) {
+  // Check if the click is on the overlay background or a close button
+  if (!event || 
+      event.target.id === modalId || 
+      event.target.classList.contains('close-modal-btn') || 
+      event.target.closest('.close-modal-btn')) {
+    document.getElementById(modalId).style.display = 'none';
+    document.body.style.overflow = 'auto';
+  }
+}
+
+// --- Customer Modals ---
+function openCreateModal() {
+  document.getElementById('createCustomerModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openEditModal(userId, username, email, firstName, lastName, phone, fullName) { // <-- CORRECTED: added fullName
+  document.getElementById('editCustomerForm').action = `/admin-dashboard/customer/edit/${userId}/`;
+  document.getElementById('edit-username').value = username;
+  document.getElementById('edit-email').value = email;
+  document.getElementById('edit-first-name').value = firstName;
+  document.getElementById('edit-last-name').value = lastName;
+  document.getElementById('edit-phone').value = phone;
+
+  // CORRECTED: Find the reset button and set its click event
+  const resetBtn = document.getElementById('editCustomer_resetPasswordBtn');
+  resetBtn.onclick = () => openResetPasswordModal(userId, fullName);
+
+  document.getElementById('editCustomerModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openDeleteModal(userId, fullName) {
+  document.getElementById('deleteCustomerForm').action = `/admin-dashboard/customer/delete/${userId}/`;
+  document.getElementById('delete-customer-name').textContent = fullName;
+  document.getElementById('deleteCustomerModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+// --- Barber Modals ---
+function openCreateBarberModal() {
+  document.getElementById('createBarberModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openEditBarberModal(userId, username, email, firstName, lastName, phone, fullName) { // <-- CORRECTED: added fullName
+  document.getElementById('editBarberForm').action = `/admin-dashboard/barber/edit/${userId}/`;
+  document.getElementById('edit-barber-username').value = username;
+  document.getElementById('edit-barber-email').value = email;
+  document.getElementById('edit-barber-first-name').value = firstName;
+  document.getElementById('edit-barber-last-name').value = lastName;
+  document.getElementById('edit-barber-phone').value = phone;
+
+  // CORRECTED: Find the reset button and set its click event
+  const resetBtn = document.getElementById('editBarber_resetPasswordBtn');
+  resetBtn.onclick = () => openResetPasswordModal(userId, fullName);
+
+  document.getElementById('editBarberModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openDeleteBarberModal(userId, fullName) {
+  document.getElementById('deleteBarberForm').action = `/admin-dashboard/barber/delete/${userId}/`;
+  document.getElementById('delete-barber-name').textContent = fullName;
+  document.getElementById('deleteBarberModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+// --- Service Modals ---
+function openCreateServiceModal() {
+  document.getElementById('createServiceModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openEditServiceModal(serviceId, name, price, duration, description) {
+  document.getElementById('editServiceForm').action = `/admin-dashboard/service/edit/${serviceId}/`;
+  document.getElementById('edit-service-name').value = name;
+  document.getElementById('edit-service-price').value = price;
+  document.getElementById('edit-service-duration').value = duration;
+  document.getElementById('edit-service-desc').value = description;
+  document.getElementById('editServiceModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function openDeleteServiceModal(serviceId, name) {
+  document.getElementById('deleteServiceForm').action = `/admin-dashboard/service/delete/${serviceId}/`;
+  document.getElementById('delete-service-name').textContent = name;
+  document.getElementById('deleteServiceModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+// --- Password Reset Modal ---
+function openResetPasswordModal(userId, fullName) {
+  document.getElementById('resetPasswordForm').action = `/admin-dashboard/user/reset-password/${userId}/`;
+  document.getElementById('reset-user-name').textContent = fullName;
+
+  document.getElementById('resetPasswordModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+
+  // Close the modal that's "behind" it
+  closeModal('editCustomerModal');
+  closeModal('editBarberModal');
+}
+
+function openAdminBookingModal() {
+  document.getElementById('adminBookingModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+// --- Initialize Searchable Dropdown ---
+$(document).ready(function() {
+    $('#booking-customer').select2({
+        dropdownParent: $('#adminBookingModal'), // Essential for modals!
+        width: '100%',
+        placeholder: "-- Choose Customer --",
+        allowClear: true
+    });
+
+    // Optional: Also make Barber and Service searchable
+    $('#booking-barber').select2({
+        dropdownParent: $('#adminBookingModal'),
+        width: '100%',
+        placeholder: "-- Choose Barber --"
+    });
+
+    $('#booking-service').select2({
+        dropdownParent: $('#adminBookingModal'),
+        width: '100%',
+        placeholder: "-- Choose Service --"
+    });
+  });
@@ -0,0 +1,92 @@
+// Tab switching (client-side only for UX)
+function switchTab(tabName) {
+    const loginForm = document.getElementById('loginForm');
+    const registerForm = document.getElementById('registerForm');
+    const loginTab = document.querySelector('[data-tab="login"]');
+    const registerTab = document.querySelector('[data-tab="register"]');
+    const indicator = document.querySelector('.tab-indicator');
+
+    if (tabName === 'login') {
+        loginForm.classList.add('active');
+        registerForm.classList.remove('active');
+        loginTab.classList.add('active');
+        registerTab.classList.remove('active');
+        indicator.classList.remove('register');
+    } else {
+        registerForm.classList.add('active');
+        loginForm.classList.remove('active');
+        registerTab.classList.add('active');
+        loginTab.classList.remove('active');
+        indicator.classList.add('register');
+    }
+}
+
+// Toggle password visibility (UI enhancement only)
+function togglePassword(inputId, iconId) {
+    const passwordInput = document.getElementById(inputId);
+    const toggleIcon = document.getElementById(iconId);
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.classList.remove('fa-eye');
+        toggleIcon.classList.add('fa-eye-slash');
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.classList.remove('fa-eye-slash');
+        toggleIcon.classList.add('fa-eye');
+    }
+}
+
+// Password validation visual feedback
+const registerPasswordInput = document.getElementById('register-password');
+if (registerPasswordInput) {
+    registerPasswordInput.addEventListener('input', function() {
+        const password = this.value;
+
+        document.getElementById('length').classList.toggle('valid', password.length >= 8);
+        document.getElementById('uppercase').classList.toggle('valid', /[A-Z]/.test(password));
+        document.getElementById('lowercase').classList.toggle('valid', /[a-z]/.test(password));
+        document.getElementById('number').classList.toggle('valid', /[0-9]/.test(password));
+    });
+}
+
+// Password match validation
+const confirmPasswordInput = document.getElementById('confirm-password');
+if (confirmPasswordInput && registerPasswordInput) {
+    confirmPasswordInput.addEventListener('input', function() {
+        if (this.value !== registerPasswordInput.value) {
+            this.setCustomValidity('Passwords do not match');
+        } else {
+            this.setCustomValidity('');
+        }
+    });
+
+    registerPasswordInput.addEventListener('input', function() {
+        if (confirmPasswordInput.value && confirmPasswordInput.value !== this.value) {
+            confirmPasswordInput.setCustomValidity('Passwords do not match');
+        } else {
+            confirmPasswordInput.setCustomValidity('');
+        }
+    });
+}
+
+// Correct: use the variable name (loginIdentifier), not the ID string
+const loginIdentifier = document.getElementById('login-identifier');
+if (loginIdentifier) {
+    loginIdentifier.setAttribute('placeholder', 'Enter your email or username');
+}
+
+
+// Check if we should show register form based on URL or context
+window.addEventListener('DOMContentLoaded', function() {
+    const urlParams = new URLSearchParams(window.location.search);
+    const mode = urlParams.get('mode');
+
+    if (document.body.dataset.showRegister === 'true') {
+        switchTab('register');
+    }
+
+    if (mode === 'register' || mode === 'signup') {
+        switchTab('register');
+    }
+});
@@ -0,0 +1,91 @@
+// Availability Toggle Logic
+document.addEventListener('DOMContentLoaded', function () {
+  // URLs and CSRF token are rendered onto <body> by barber_dashboard.html
+  const config = document.body.dataset;
+  const toggle = document.getElementById('availability-switch');
+  const status = document.getElementById('availability-status');
+
+  toggle.addEventListener('change', function () {
+    const available = toggle.checked;
+    status.textContent = available ? 'Available' : 'Unavailable';
+
+    if (available) {
+      status.classList.add('available');
+    } else {
+      status.classList.remove('available');
+    }
+
+    fetch(config.toggleUrl, {
+      method: 'POST',
+      headers: {
+        'X-CSRFToken': config.csrfToken,
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ available: available }),
+    })
+    .then(response => response.json())
+    .then(data => {
+      if (!data.success) {
+        console.error('Failed to update availability');
+      }
+    })
+    .catch(error => {
+      console.error('Error updating availability:', error);
+    });
+  });
+
+  // Polling function for real-time updates
+  const statsWrapper = document.getElementById('stats-wrapper');
+  const todayScheduleWrapper = document.getElementById('today-schedule-wrapper');
+  const upcomingTableWrapper = document.getElementById('upcoming-table-wrapper');
+  const apiUrl = config.apiUrl;
+
+  async function fetchDashboardData() {
+    try {
+      const response = await fetch(apiUrl);
+      if (!response.ok) {
+        console.error('Failed to fetch dashboard data');
+        return;
+      }
+
+      const data = await response.json();
+
+      if (data.success) {
+        // Only update if content has changed (prevents flickering)
+        if (statsWrapper && data.html_stats && 
+            statsWrapper.innerHTML.trim() !== data.html_stats.trim()) {
+          statsWrapper.innerHTML = data.html_stats;
+        }
+        if (todayScheduleWrapper && data.html_today_schedule && 
+            todayScheduleWrapper.innerHTML.trim() !== data.html_today_schedule.trim()) {
+          todayScheduleWrapper.innerHTML = data.html_today_schedule;
+        }
+        if (upcomingTableWrapper && data.html_upcoming_table && 
+            upcomingTableWrapper.innerHTML.trim() !== data.html_upcoming_table.trim()) {
+          upcomingTableWrapper.innerHTML = data.html_upcoming_table;
+        }
+      }
+    } catch (error) {
+      console.error('Error fetching dashboard data:', error);
+    }
+  }
+
+  // Poll every 10 seconds
+  setInterval(fetchDashboardData, 10000);
+});
+
+// Helper function to manually refresh
+function refreshDashboard() {
+  location.reload();
+}
+
+// Copy the calendar (.ics) subscription link
+async function copyCalendarFeed(button) {
+  const url = button.dataset.feedUrl;
+  try {
+    await navigator.clipboard.writeText(url);
+    button.querySelector('i').className = 'fas fa-check';
+  } catch (error) {
+    window.prompt('Copy this link into your calendar app:', url);
+  }
+}
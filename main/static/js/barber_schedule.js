@@ -0,0 +1,20 @@
+function openDeleteModal(scheduleId, date, time) {
+    document.getElementById('deleteSlotInfo').textContent = `${date} at ${time}`;
+    document.getElementById('delete_schedule_id').value = scheduleId;
+    document.getElementById('deleteModal').style.display = 'flex';
+    document.body.style.overflow = 'hidden';
+}
+
+function closeDeleteModal(event) {
+    if (!event || event.target.classList.contains('modal-overlay') || event.target.classList.contains('close-modal-btn')) {
+        document.getElementById('deleteModal').style.display = 'none';
+        document.body.style.overflow = 'auto';
+    }
+}
+
+function confirmDelete() {
+    const btn = document.getElementById('confirmDeleteBtn');
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Deleting...';
+    btn.disabled = true;
+    document.getElementById('deleteSlotForm').submit();
+}
@@ -0,0 +1,720 @@
+// ==================== FLASH MESSAGES ====================
+document.addEventListener('DOMContentLoaded', function() {
+    const alerts = document.querySelectorAll('.messages-container .alert');
+    alerts.forEach(alert => {
+        setTimeout(() => {
+            alert.style.animation = 'fadeOut 0.3s ease forwards';
+            setTimeout(() => {
+                alert.remove();
+            }, 300);
+        }, 4000);
+    });
+});
+
+// ==================== BOOKING FLOW STATE ====================
+let bookingData = {
+    date: null,
+    time: null,
+    timeDisplay: null,
+    service: null,
+    serviceName: null,
+    servicePrice: null,
+    serviceDuration: null,
+    barber: null,
+    barberName: null
+};
+
+let currentDate = new Date();
+const minDate = new Date();
+minDate.setDate(minDate.getDate() - 1);  // Allow today and onwards
+const maxDate = new Date();
+maxDate.setMonth(maxDate.getMonth() + 3);
+
+// ==================== PANEL NAVIGATION ====================
+function openBookingFlow() {
+    document.getElementById('bookingFlow').style.display = 'block';
+    document.getElementById('bookingsContainer').style.display = 'none';
+    renderCalendar();
+}
+
+function closeBookingFlow() {
+    if (bookingData.time) {
+        releaseSlotHold();
+    }
+    document.getElementById('bookingFlow').style.display = 'none';
+    document.getElementById('bookingsContainer').style.display = 'block';
+    resetBookingData();
+}
+
+function goToPanel(panelNumber) {
+    document.querySelectorAll('.booking-panel').forEach(panel => {
+        panel.classList.remove('active');
+    });
+
+    document.getElementById('panel' + panelNumber).classList.add('active');
+
+    document.querySelectorAll('.progress-step').forEach(step => {
+        const stepNum = parseInt(step.dataset.step);
+        if (stepNum < panelNumber) {
+            step.classList.add('completed');
+            step.classList.remove('active');
+        } else if (stepNum === panelNumber) {
+            step.classList.add('active');
+            step.classList.remove('completed');
+        } else {
+            step.classList.remove('active', 'completed');
+        }
+    });
+
+    if (panelNumber === 2) {
+        renderCalendar();
+        checkAndFetchSlots();
+    }
+
+    if (panelNumber === 3) {
+        updateSummary();
+    }
+}
+
+function resetBookingData() {
+    bookingData = {
+        date: null, time: null, timeDisplay: null, service: null, serviceName: null,
+        servicePrice: null, serviceDuration: null, barber: null, barberName: null
+    };
+    document.querySelectorAll('.service-card, .barber-card').forEach(c => c.classList.remove('selected'));
+    document.getElementById('nextToPanel2').disabled = true;
+    document.getElementById('nextToPanel3').disabled = true;
+
+    goToPanel(1);
+}
+
+// ==================== PANEL 1: SERVICE & BARBER ====================
+function selectService(id, name, price, duration) {
+    bookingData.service = id;
+    bookingData.serviceName = name;
+    bookingData.servicePrice = price;
+    bookingData.serviceDuration = duration;
+    document.getElementById('final-service').value = id;
+
+    document.querySelectorAll('.service-card').forEach(card => card.classList.remove('selected'));
+    event.currentTarget.classList.add('selected');
+
+    checkAndFetchSlots();
+    checkPanel1Complete();
+}
+
+function selectBarber(id, name) {
+    bookingData.barber = id;
+    bookingData.barberName = name;
+    document.getElementById('final-barber').value = id;
+
+    document.querySelectorAll('.barber-card').forEach(card => card.classList.remove('selected'));
+    event.currentTarget.classList.add('selected');
+
+    checkAndFetchSlots();
+    checkPanel1Complete();
+}
+
+function checkPanel1Complete() {
+    const btn = document.getElementById('nextToPanel2');
+    btn.disabled = !(bookingData.service && bookingData.barber);
+}
+
+// ==================== PANEL 2: CALENDAR & TIME ====================
+function previousMonth() {
+    currentDate.setMonth(currentDate.getMonth() - 1);
+    renderCalendar();
+}
+
+function nextMonth() {
+    currentDate.setMonth(currentDate.getMonth() + 1);
+    renderCalendar();
+}
+
+function renderCalendar() {
+    const year = currentDate.getFullYear();
+    const month = currentDate.getMonth();
+
+    const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
+                       'July', 'August', 'September', 'October', 'November', 'December'];
+    document.getElementById('calendarMonth').textContent = `${monthNames[month]} ${year}`;
+
+    const firstDay = new Date(year, month, 1).getDay();
+    const daysInMonth = new Date(year, month + 1, 0).getDate();
+
+    const daysContainer = document.getElementById('calendarDays');
+    daysContainer.innerHTML = '';
+
+    for (let i = 0; i < firstDay; i++) {
+        daysContainer.appendChild(document.createElement('div')).className = 'calendar-day empty';
+    }
+
+    const today = new Date();
+    today.setHours(0, 0, 0, 0);
+
+    for (let day = 1; day <= daysInMonth; day++) {
+        const date = new Date(year, month, day);
+        date.setHours(0, 0, 0, 0);
+
+        const dayElement = document.createElement('div');
+        dayElement.className = 'calendar-day';
+        dayElement.textContent = day;
+
+        if (date.getTime() === today.getTime()) dayElement.classList.add('today');
+        if (bookingData.date && date.toDateString() === new Date(bookingData.date).toDateString()) {
+            dayElement.classList.add('selected');
+        }
+
+        if (date < minDate || date > maxDate) {
+            dayElement.classList.add('disabled');
+        } else {
+            dayElement.classList.add('available-day');
+            dayElement.onclick = () => selectDate(date);
+        }
+
+        daysContainer.appendChild(dayElement);
+    }
+}
+
+function selectDate(date) {
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+
+    bookingData.date = `${year}-${month}-${day}`;
+    document.getElementById('final-date').value = bookingData.date;
+
+    bookingData.time = null;
+    bookingData.timeDisplay = null;
+    checkPanel2Complete();
+
+    renderCalendar();
+    checkAndFetchSlots();
+}
+
+function checkAndFetchSlots() {
+    if (bookingData.barber && bookingData.date && bookingData.serviceDuration) {
+        fetchAvailableSlots(bookingData.barber, bookingData.date, bookingData.serviceDuration);
+    }
+}
+
+async function fetchAvailableSlots(barberId, dateStr, duration) {
+    const container = document.getElementById('timeSlotsContainer');
+    container.innerHTML = `<div class="time-slot-placeholder loading"><i class="fas fa-spinner fa-spin"></i> Loading...</div>`;
+
+    try {
+        const url = `/api/get-slots/${barberId}/${dateStr}/?duration=${duration}`;
+        const response = await fetch(url);
+
+        if (response.status === 429) {
+            container.innerHTML = '<div class="time-slot-placeholder error">Too many requests. Please wait a moment and pick the date again.</div>';
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+
+        if (data.success && data.slots.length > 0) {
+            displayTimeSlots(data.slots);
+        } else {
+            container.innerHTML = `<div class="time-slot-placeholder">No available slots for this day.
+                <button type="button" class="btn-load-more" onclick="joinWaitlist(this)">Notify me if a slot opens up</button>
+            </div>`;
+        }
+    } catch (error) {
+        console.error('Fetch error:', error);
+        container.innerHTML = '<div class="time-slot-placeholder error">Could not load times.</div>';
+    }
+}
+
+function displayTimeSlots(slots) {
+    const container = document.getElementById('timeSlotsContainer');
+    container.innerHTML = '';
+
+    slots.forEach(timeStr => {
+        const slotElement = document.createElement('div');
+        slotElement.className = 'time-slot';
+        slotElement.textContent = timeStr;
+        slotElement.onclick = () => selectTime(timeStr);
+        container.appendChild(slotElement);
+    });
+}
+
+function selectTime(timeDisplay) {
+    bookingData.timeDisplay = timeDisplay;
+
+    const parts = timeDisplay.match(/(\d+):(\d+) (AM|PM)/);
+    let hour = parseInt(parts[1]);
+    const minute = parseInt(parts[2]);
+    const ampm = parts[3];
+
+    if (ampm === 'PM' && hour !== 12) hour += 12;
+    if (ampm === 'AM' && hour === 12) hour = 0;
+
+    bookingData.time = `${String(hour).padStart(2, '0')}:${String(minute).padStart(2, '0')}`;
+    document.getElementById('final-time').value = bookingData.time;
+
+    document.querySelectorAll('.time-slot').forEach(slot => slot.classList.remove('selected'));
+    event.target.classList.add('selected');
+    checkPanel2Complete();
+    holdSelectedSlot();
+}
+
+// ==================== SLOT HOLDS ====================
+// Keep the chosen slot reserved for this session while the form is completed
+async function holdSelectedSlot() {
+    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]');
+    const body = new URLSearchParams({
+        barber_id: bookingData.barber,
+        service_id: bookingData.service,
+        date: bookingData.date,
+        time: bookingData.time,
+    });
+
+    try {
+        const response = await fetch('/api/slot-holds/', {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken.value },
+            body: body,
+        });
+
+        if (response.status === 409) {
+            // Someone else is checking out with this slot; offer the remaining ones
+            bookingData.time = null;
+            bookingData.timeDisplay = null;
+            document.getElementById('final-time').value = '';
+            checkPanel2Complete();
+            alert('Sorry, that time was just taken. Please pick another slot.');
+            checkAndFetchSlots();
+        }
+    } catch (error) {
+        // Not fatal: the booking itself re-checks the slot
+        console.error('Error holding slot:', error);
+    }
+}
+
+function releaseSlotHold() {
+    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]');
+    fetch('/api/slot-holds/release/', {
+        method: 'POST',
+        headers: { 'X-CSRFToken': csrfToken.value },
+        keepalive: true,
+    });
+}
+
+// ==================== WAITLIST ====================
+// Ask to be emailed when a booking with this barber on this day is cancelled
+async function joinWaitlist(button) {
+    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]');
+    const body = new URLSearchParams({
+        barber_id: bookingData.barber,
+        service_id: bookingData.service,
+        date_from: bookingData.date,
+    });
+    button.disabled = true;
+
+    try {
+        const response = await fetch('/api/waitlist/', {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken.value },
+            body: body,
+        });
+        const data = await response.json();
+        if (data.success) {
+            button.textContent = "You're on the waitlist. We'll email you if a slot opens up.";
+        } else {
+            button.disabled = false;
+            alert(data.error || 'Could not join the waitlist.');
+        }
+    } catch (error) {
+        console.error('Error joining waitlist:', error);
+        button.disabled = false;
+    }
+}
+
+function checkPanel2Complete() {
+    const btn = document.getElementById('nextToPanel3');
+    btn.disabled = !(bookingData.date && bookingData.time);
+}
+
+// ==================== PANEL 3: SUMMARY ====================
+function updateSummary() {
+    const dateObj = new Date(bookingData.date + 'T00:00:00');
+    const dateStr = dateObj.toLocaleDateString('en-US', { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' });
+
+    document.getElementById('summaryDateTime').textContent = `${dateStr} at ${bookingData.timeDisplay}`;
+    document.getElementById('summaryService').textContent = bookingData.serviceName;
+    document.getElementById('summaryServiceMeta').textContent = `${bookingData.serviceDuration} minutes`;
+    document.getElementById('summaryBarber').textContent = bookingData.barberName;
+    document.getElementById('summaryPrice').textContent = `₱${bookingData.servicePrice}`;
+}
+
+// ==================== VIEW DETAILS FUNCTIONALITY ====================
+let currentViewBooking = {
+    id: null,
+    service: null,
+    barber: null,
+    date: null,
+    time: null,
+    canEdit: false,
+    barberId: null,
+    duration: null
+};
+
+// FIXED: Updated function signature with barberId and serviceDuration
+function viewBookingDetails(id, service, barber, date, time, duration, price, status, statusDisplay, notes, canBeCancelled, barberId, serviceDuration) {
+    currentViewBooking = {
+        id: id,
+        service: service,
+        barber: barber,
+        date: date,
+        time: time,
+        canEdit: canBeCancelled,
+        barberId: barberId,
+        duration: serviceDuration
+    };
+
+    document.getElementById('detailId').textContent = '#' + id;
+    document.getElementById('detailService').textContent = service;
+    document.getElementById('detailBarber').textContent = barber;
+    document.getElementById('detailDate').textContent = date;
+    document.getElementById('detailTime').textContent = time;
+    document.getElementById('detailDuration').textContent = duration + ' minutes';
+    document.getElementById('detailPrice').textContent = '₱' + price;
+
+    const statusSpan = document.getElementById('detailStatus');
+    statusSpan.innerHTML = `<span class="booking-status status-${status}">${statusDisplay}</span>`;
+
+    const notesRow = document.getElementById('detailNotesRow');
+    if (notes && notes.trim()) {
+        document.getElementById('detailNotes').textContent = notes;
+        notesRow.style.display = 'flex';
+    } else {
+        notesRow.style.display = 'none';
+    }
+
+    const actionsContainer = document.getElementById('detailActions');
+    actionsContainer.innerHTML = '';
+
+    if (canBeCancelled === true || canBeCancelled === 'true' || canBeCancelled === 'True') {
+        const rescheduleBtn = document.createElement('button');
+        rescheduleBtn.type = 'button';
+        rescheduleBtn.className = 'btn-primary';
+        rescheduleBtn.innerHTML = '<i class="fas fa-calendar-alt"></i> Reschedule';
+        rescheduleBtn.onclick = function() {
+            closeViewDetails();
+            // FIXED: Pass barberId and duration
+            openRescheduleFlow(id, service, barber, date, time, barberId, serviceDuration);
+        };
+        actionsContainer.appendChild(rescheduleBtn);
+
+        const cancelBtn = document.createElement('button');
+        cancelBtn.type = 'button';
+        cancelBtn.className = 'btn-danger';
+        cancelBtn.innerHTML = '<i class="fas fa-times"></i> Cancel Booking';
+        cancelBtn.onclick = function() {
+            closeViewDetails();
+            openCancelModal(id, service, date, time);
+        };
+        actionsContainer.appendChild(cancelBtn);
+    }
+
+    document.getElementById('viewDetailsModal').style.display = 'flex';
+    document.body.style.overflow = 'hidden';
+}
+
+function closeViewDetails(event) {
+    if (!event || event.target.classList.contains('modal-overlay') || event.target.classList.contains('close-modal-btn')) {
+        document.getElementById('viewDetailsModal').style.display = 'none';
+        document.body.style.overflow = 'auto';
+        currentViewBooking = { id: null, service: null, barber: null, date: null, time: null, canEdit: false, barberId: null, duration: null };
+    }
+}
+
+// ==================== RESCHEDULE FUNCTIONALITY ====================
+let rescheduleCurrentDate = new Date();
+let rescheduleData = {
+    bookingId: null,
+    date: null,
+    time: null,
+    barberId: null,
+    duration: null
+};
+
+// FIXED: Cleaned up function with proper parameters
+function openRescheduleFlow(bookingId, service, barber, date, time, barberId, duration) {
+    rescheduleData.bookingId = bookingId;
+    rescheduleData.date = null;
+    rescheduleData.time = null;
+    rescheduleData.barberId = barberId;
+    rescheduleData.duration = duration;
+
+    document.getElementById('rescheduleCurrentService').textContent = service;
+    document.getElementById('rescheduleCurrentBarber').textContent = barber;
+    document.getElementById('rescheduleCurrentDate').textContent = date;
+    document.getElementById('rescheduleCurrentTime').textContent = time;
+
+    document.getElementById('rescheduleModal').style.display = 'flex';
+    document.body.style.overflow = 'hidden';
+
+    renderRescheduleCalendar();
+}
+
+function closeRescheduleModal(event) {
+    if (!event || event.target.classList.contains('modal-overlay') || event.target.classList.contains('close-modal-btn')) {
+        document.getElementById('rescheduleModal').style.display = 'none';
+        document.body.style.overflow = 'auto';
+        rescheduleData = { bookingId: null, date: null, time: null, barberId: null, duration: null };
+    }
+}
+
+function previousRescheduleMonth() {
+    rescheduleCurrentDate.setMonth(rescheduleCurrentDate.getMonth() - 1);
+    renderRescheduleCalendar();
+}
+
+function nextRescheduleMonth() {
+    rescheduleCurrentDate.setMonth(rescheduleCurrentDate.getMonth() + 1);
+    renderRescheduleCalendar();
+}
+
+function renderRescheduleCalendar() {
+    const year = rescheduleCurrentDate.getFullYear();
+    const month = rescheduleCurrentDate.getMonth();
+
+    const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
+                       'July', 'August', 'September', 'October', 'November', 'December'];
+    document.getElementById('rescheduleCalendarMonth').textContent = `${monthNames[month]} ${year}`;
+
+    const firstDay = new Date(year, month, 1).getDay();
+    const daysInMonth = new Date(year, month + 1, 0).getDate();
+
+    const daysContainer = document.getElementById('rescheduleCalendarDays');
+    daysContainer.innerHTML = '';
+
+    for (let i = 0; i < firstDay; i++) {
+        daysContainer.appendChild(document.createElement('div')).className = 'calendar-day empty';
+    }
+
+    const today = new Date();
+    today.setHours(0, 0, 0, 0);
+
+    for (let day = 1; day <= daysInMonth; day++) {
+        const date = new Date(year, month, day);
+        date.setHours(0, 0, 0, 0);
+
+        const dayElement = document.createElement('div');
+        dayElement.className = 'calendar-day';
+        dayElement.textContent = day;
+
+        if (date.getTime() === today.getTime()) dayElement.classList.add('today');
+        if (rescheduleData.date && date.toDateString() === new Date(rescheduleData.date).toDateString()) {
+            dayElement.classList.add('selected');
+        }
+
+        if (date < minDate || date > maxDate) {
+            dayElement.classList.add('disabled');
+        } else {
+            dayElement.classList.add('has-slots');
+            dayElement.onclick = () => selectRescheduleDate(date);
+        }
+
+        daysContainer.appendChild(dayElement);
+    }
+}
+
+function selectRescheduleDate(date) {
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+
+    rescheduleData.date = `${year}-${month}-${day}`;
+    document.getElementById('rescheduleNewDate').value = rescheduleData.date;
+    renderRescheduleCalendar();
+    checkAndFetchRescheduleSlots();
+    checkRescheduleComplete();
+}
+
+// FIXED: Simplified function that uses stored data
+function checkAndFetchRescheduleSlots() {
+    if (rescheduleData.barberId && rescheduleData.date && rescheduleData.duration) {
+        fetchRescheduleSlots(rescheduleData.barberId, rescheduleData.date, rescheduleData.duration);
+    }
+}
+
+async function fetchRescheduleSlots(barberId, dateStr, duration) {
+    const container = document.getElementById('rescheduleTimeSlotsContainer');
+    container.innerHTML = `<div class="time-slot-placeholder loading"><i class="fas fa-spinner fa-spin"></i> Loading...</div>`;
+
+    try {
+        const url = `/api/get-slots/${barberId}/${dateStr}/?duration=${duration}`;
+        const response = await fetch(url);
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+
+        if (data.success && data.slots.length > 0) {
+            displayRescheduleTimeSlots(data.slots);
+        } else {
+            container.innerHTML = '<div class="time-slot-placeholder">No available slots for this day.</div>';
+        }
+    } catch (error) {
+        console.error('Fetch error:', error);
+        container.innerHTML = '<div class="time-slot-placeholder error">Could not load times.</div>';
+    }
+}
+
+function displayRescheduleTimeSlots(slots) {
+    const container = document.getElementById('rescheduleTimeSlotsContainer');
+    container.innerHTML = '';
+    slots.forEach(timeStr => {
+        const slotElement = document.createElement('div');
+        slotElement.className = 'time-slot';
+        slotElement.textContent = timeStr;
+        slotElement.onclick = () => selectRescheduleTimeStr(timeStr);
+        container.appendChild(slotElement);
+    });
+}
+
+function selectRescheduleTimeStr(timeDisplay) {
+    rescheduleData.timeDisplay = timeDisplay;
+    const parts = timeDisplay.match(/(\d+):(\d+) (AM|PM)/);
+    let hour = parseInt(parts[1]);
+    const minute = parseInt(parts[2]);
+    const ampm = parts[3];
+    if (ampm === 'PM' && hour !== 12) hour += 12;
+    if (ampm === 'AM' && hour === 12) hour = 0;
+    rescheduleData.time = `${String(hour).padStart(2, '0')}:${String(minute).padStart(2, '0')}`;
+    document.getElementById('rescheduleNewTime').value = rescheduleData.time;
+    document.querySelectorAll('#rescheduleTimeSlotsContainer .time-slot').forEach(slot => slot.classList.remove('selected'));
+    event.target.classList.add('selected');
+    checkRescheduleComplete();
+}
+
+function checkRescheduleComplete() {
+    const btn = document.getElementById('rescheduleSubmitBtn');
+    btn.disabled = !(rescheduleData.date && rescheduleData.time);
+}
+
+function submitReschedule() {
+    const form = document.getElementById('rescheduleForm');
+    form.action = `/bookings/${rescheduleData.bookingId}/reschedule/`;
+    form.submit();
+}
+
+// ==================== CANCEL CONFIRMATION MODAL ====================
+let cancelData = {
+    bookingId: null,
+    serviceName: null,
+    dateTime: null,
+    formAction: null
+};
+
+function openCancelModal(bookingId, serviceName, date, time) {
+    cancelData.bookingId = bookingId;
+    cancelData.serviceName = serviceName;
+    cancelData.dateTime = `${date} at ${time}`;
+    cancelData.formAction = `/bookings/${bookingId}/cancel/`;
+
+    document.getElementById('cancelServiceName').textContent = serviceName;
+    document.getElementById('cancelDateTime').textContent = cancelData.dateTime;
+
+    document.getElementById('cancelModal').style.display = 'flex';
+    document.body.style.overflow = 'hidden';
+}
+
+function closeCancelModal(event) {
+    if (!event || event.target.classList.contains('modal-overlay') || event.target.classList.contains('close-modal-btn')) {
+        document.getElementById('cancelModal').style.display = 'none';
+        document.body.style.overflow = 'auto';
+
+        cancelData = {
+            bookingId: null,
+            serviceName: null,
+            dateTime: null,
+            formAction: null
+        };
+    }
+}
+
+function confirmCancel() {
+    const btn = document.getElementById('confirmCancelBtn');
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Cancelling...';
+    btn.disabled = true;
+
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = cancelData.formAction;
+
+    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]');
+    if (csrfToken) {
+        const csrfInput = document.createElement('input');
+        csrfInput.type = 'hidden';
+        csrfInput.name = 'csrfmiddlewaretoken';
+        csrfInput.value = csrfToken.value;
+        form.appendChild(csrfInput);
+    }
+
+    document.body.appendChild(form);
+    form.submit();
+}
+
+// ==================== PAST BOOKINGS COLLAPSE ====================
+function togglePastBookings() {
+    const content = document.getElementById('pastBookingsContent');
+    const btn = document.getElementById('collapseBtn');
+    const icon = btn.querySelector('i');
+
+    if (content.classList.contains('collapsed')) {
+        content.classList.remove('collapsed');
+        icon.classList.remove('fa-chevron-up');
+        icon.classList.add('fa-chevron-down');
+    } else {
+        content.style.maxHeight = '';
+        content.classList.add('collapsed');
+        icon.classList.remove('fa-chevron-down');
+        icon.classList.add('fa-chevron-up');
+    }
+}
+
+// ==================== PAST BOOKINGS "LOAD MORE" ====================
+async function loadMoreHistory() {
+    const btn = document.getElementById('loadMoreHistory');
+    const list = document.getElementById('pastBookingsList');
+    const content = document.getElementById('pastBookingsContent');
+    btn.disabled = true;
+
+    try {
+        const url = `${btn.dataset.url}?cursor=${encodeURIComponent(btn.dataset.cursor)}`;
+        const response = await fetch(url);
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+        list.insertAdjacentHTML('beforeend', data.html);
+        // Let the collapsible section grow past its default max-height
+        content.style.maxHeight = `${content.scrollHeight}px`;
+
+        if (data.next_cursor) {
+            btn.dataset.cursor = data.next_cursor;
+            btn.disabled = false;
+        } else {
+            btn.remove();
+        }
+    } catch (error) {
+        console.error('Error loading booking history:', error);
+        btn.disabled = false;
+    }
+}
+
+// Initialize
+document.addEventListener('DOMContentLoaded', function() {
+    // No initial calendar render needed, panel is hidden
+});
@@ -0,0 +1,22 @@
+// Clear -> Glass navbar after hero
+const navbar = document.querySelector('[data-glass]');
+const hero = document.getElementById('hero');
+const obs = new IntersectionObserver(([e]) => {
+  navbar.classList.toggle('navbar-glass', !e.isIntersecting);
+}, { rootMargin: "-64px 0px 0px 0px", threshold: 0.01 });
+obs.observe(hero);
+
+// Scroll-to-top
+const scrollBtn = document.getElementById('scrollToTopBtn');
+const showAt = 250;
+const onScroll = () => {
+  if (window.scrollY > showAt) scrollBtn.classList.add('scrolltop--show');
+  else scrollBtn.classList.remove('scrolltop--show');
+};
+window.addEventListener('scroll', onScroll, { passive: true });
+const scrollToTop = () => window.scrollTo({ top: 0, behavior: 'smooth' });
+scrollBtn.addEventListener('click', scrollToTop);
+scrollBtn.addEventListener('keydown', (e) => {
+  if (e.key === 'Enter' || e.key === ' ') { e.preventDefault(); scrollToTop(); }
+});
+onScroll();
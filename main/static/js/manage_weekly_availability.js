@@ -0,0 +1,24 @@
+function toggleDay(checkbox, dayIndex) {
+  const isChecked = checkbox.checked;
+  const startInput = document.getElementById(`start_time_${dayIndex}`);
+  const endInput = document.getElementById(`end_time_${dayIndex}`);
+  const label = document.getElementById(`label_${dayIndex}`);
+
+  startInput.disabled = !isChecked;
+  endInput.disabled = !isChecked;
+
+  if (isChecked) {
+    label.textContent = 'Available';
+    label.classList.add('available');
+    // Set default times if empty
+    if (!startInput.value) {
+      startInput.value = '09:00';
+    }
+    if (!endInput.value) {
+      endInput.value = '17:00';
+    }
+  } else {
+    label.textContent = 'Day Off';
+    label.classList.remove('available');
+  }
+}
@@ -0,0 +1,88 @@
+import posixpath
+import re
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..assets import BUILD_DIR, BUILD_DIRNAME, FONTS, FONTS_DIR, PAGE_BUNDLES, bundle_path
+
+register = template.Library()
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def _static_or_raw(path):
+    try:
+        return static(path)
+    except ValueError:
+        # Not in the collectstatic manifest (e.g. a missing image); keep the path
+        return settings.STATIC_URL + path
+
+
+def _absolutize_urls(css):
+    """Inlined CSS resolves url()s against the page, so point them at STATIC_URL"""
+    def _absolute(match):
+        quote, url = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', url, re.I):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(BUILD_DIRNAME, url))
+        return f'url({quote}{_static_or_raw(resolved)}{quote})'
+    return _CSS_URL.sub(_absolute, css)
+
+
+def _read_build_file(filename):
+    path = BUILD_DIR / filename
+    if not path.exists():
+        return None
+    return path.read_text(encoding='utf-8')
+
+
+_read_build_file_cached = lru_cache(maxsize=None)(_read_build_file)
+
+
+def _build_file(filename):
+    # Re-read on every request in development so `build_assets` shows up immediately
+    return _read_build_file(filename) if settings.DEBUG else _read_build_file_cached(filename)
+
+
+@register.simple_tag
+def page_css(page):
+    """Inline critical CSS and load the page bundle without blocking first paint"""
+    critical = _build_file(f'{page}.critical.css')
+    if critical is None:
+        return format_html_join(
+            '\n', '<link rel="stylesheet" href="{}">',
+            ((static(name),) for name in PAGE_BUNDLES[page]['css'])
+        )
+
+    bundle_url = static(bundle_path(page, 'css'))
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(_absolutize_urls(critical)), bundle_url, bundle_url,
+    )
+
+
+@register.simple_tag
+def page_js(page):
+    """Script tag(s) for the page bundle, or the source files if not built"""
+    if _build_file(f'{page}.js') is None:
+        return format_html_join(
+            '\n', '<script src="{}"></script>',
+            ((static(name),) for name in PAGE_BUNDLES[page]['js'])
+        )
+    return format_html('<script src="{}"></script>', static(bundle_path(page, 'js')))
+
+
+@register.simple_tag
+def font_preloads():
+    """Preload hints for the vendored WOFF2 files (skipped if not vendored yet)"""
+    return format_html_join(
+        '\n', '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>',
+        ((static(f"fonts/{font['file']}"),) for font in FONTS if (FONTS_DIR / font['file']).exists())
+    )
@@ -1,3 +1,1536 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.contrib.sessions.backends.db import SessionStore
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied, ValidationError
+from django.db import IntegrityError, connection, router, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from trimly.settings import _apply_connection_settings, _database_from_url
+
+from .models import ArchivedReservation, Barber, DailyBookingRollup, Customer, Reservation, Schedule, ServiceType, SlotHold, WaitlistEntry, WeeklyAvailability
+from . import analytics, archive, assets, calendar_feed, holds, logs, metrics, pagecache, partitioning, profiling, querycache, ratelimit, registration, rollups, slowqueries, throttle, views, waitlist
+from .querycache import cached_queryset
+from .profiles import ROLE_BARBER, ROLE_CUSTOMER, ProfileBackend, RequestProfile, get_role
+from .routers import PIN_COOKIE_NAME, ReplicaPinningMiddleware, replica_reads
+
+# STORAGES as trimly.settings configures them with DEBUG off (collectstatic tests)
+PRODUCTION_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+# -------------------------------
+# QUERY PLAN (EXPLAIN) HARNESS
+# -------------------------------
+
+class QueryPlanTestCase(TestCase):
+    """
+    Base class for asserting that hot queries are answered from an index.
+    On PostgreSQL sequential scans are disabled for the check so that the
+    planner's choice on tiny test tables doesn't hide a missing index.
+    """
+
+    def get_plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndexScan(self, queryset, table):
+        plan = self.get_plan(queryset)
+        if connection.vendor == 'sqlite':
+            full_scan = f'SCAN {table}' in plan and f'SCAN {table} USING' not in plan
+            self.assertIn(f'SEARCH {table} USING', plan, plan)
+        elif connection.vendor == 'postgresql':
+            full_scan = 'Seq Scan' in plan
+            self.assertIn('Index', plan, plan)
+        else:
+            self.skipTest(f'No plan parser for {connection.vendor}')
+        self.assertFalse(full_scan, plan)
+
+
+class HotQueryIndexTests(QueryPlanTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        customer_user = User.objects.create_user('customer', 'customer@test.com', 'pass12345')
+        barber_user = User.objects.create_user('barber', 'barber@test.com', 'pass12345')
+        cls.customer = Customer.objects.create(user=customer_user, phone_number='09123456789')
+        cls.barber = Barber.objects.create(user=barber_user, phone_number='09987654321')
+        cls.now = timezone.now()
+
+    def test_customer_upcoming_bookings(self):
+        qs = Reservation.objects.filter(
+            customer=self.customer,
+            appointment_datetime__gte=self.now,
+            status__in=['pending', 'confirmed'],
+        )
+        self.assertUsesIndexScan(qs, 'main_reservation')
+
+    def test_customer_past_bookings(self):
+        for qs in views._past_booking_querysets(self.customer, self.now):
+            self.assertUsesIndexScan(qs.order_by('-appointment_datetime'), 'main_reservation')
+
+    def test_barber_active_slot_check(self):
+        qs = Reservation.objects.filter(
+            barber=self.barber,
+            status__in=['pending', 'confirmed', 'in_progress'],
+            appointment_datetime__gte=self.now,
+            appointment_datetime__lt=self.now + timedelta(days=1),
+        )
+        self.assertUsesIndexScan(qs, 'main_reservation')
+
+    def test_waitlist_match_lookup(self):
+        day = self.now.date()
+        for barber in (self.barber, None):
+            qs = WaitlistEntry.objects.filter(
+                barber=barber, status='waiting',
+                date_from__gte=day - timedelta(days=waitlist.MAX_WINDOW_DAYS - 1), date_from__lte=day,
+            )
+            self.assertUsesIndexScan(qs, 'main_waitlistentry')
+
+    def test_barber_status_stats(self):
+        qs = Reservation.objects.filter(barber=self.barber, status='completed')
+        self.assertUsesIndexScan(qs, 'main_reservation')
+
+    def test_schedule_overrides(self):
+        qs = Schedule.objects.filter(barber=self.barber, date=self.now.date(), is_available=True)
+        self.assertUsesIndexScan(qs, 'main_schedule')
+
+    def test_login_email_lookup(self):
+        qs = registration.users_with_email(User.objects.all(), 'Customer@test.com')
+        self.assertUsesIndexScan(qs, 'auth_user')
+
+    def test_phone_number_lookups(self):
+        self.assertUsesIndexScan(Customer.objects.filter(phone_number='09123456789'), 'main_customer')
+        self.assertUsesIndexScan(Barber.objects.filter(phone_number='09123456789'), 'main_barber')
+
+
+# -------------------------------
+# READ REPLICA ROUTING
+# -------------------------------
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        @replica_reads
+        def read_view(request):
+            return HttpResponse(router.db_for_read(Reservation))
+        self.read_view = read_view
+
+    def test_sqlite_urls_parse_to_separate_files(self):
+        primary = _database_from_url('sqlite:///primary.sqlite3')
+        replica = _database_from_url('sqlite:///replica.sqlite3')
+        self.assertEqual(primary['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(primary['NAME'], 'primary.sqlite3')
+        self.assertEqual(replica['NAME'], 'replica.sqlite3')
+
+    def test_reads_default_to_primary_outside_marked_views(self):
+        self.assertEqual(router.db_for_read(Reservation), 'default')
+        self.assertEqual(router.db_for_write(Reservation), 'default')
+
+    def test_marked_view_reads_from_replica(self):
+        response = self.read_view(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica_1')
+        # The alias doesn't leak out of the request
+        self.assertEqual(router.db_for_read(Reservation), 'default')
+
+    def test_write_requests_stay_on_primary(self):
+        response = self.read_view(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_pinned_after_own_write(self):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.post('/bookings/create/'))
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = response.cookies[PIN_COOKIE_NAME].value
+        self.assertEqual(self.read_view(request).content, b'default')
+
+        request.COOKIES[PIN_COOKIE_NAME] = str(time.time() - 1)
+        self.assertEqual(self.read_view(request).content, b'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.read_view(self.factory.get('/')).content, b'default')
+
+
+# -------------------------------
+# CONNECTION REUSE / METRICS
+# -------------------------------
+
+class ConnectionSettingsTests(TestCase):
+
+    def test_health_checks_enabled_on_every_path(self):
+        config = _apply_connection_settings({'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 600})
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(_database_from_url('postgresql://u:p@db.example.com:5432/trimly')['CONN_HEALTH_CHECKS'])
+
+    def test_asgi_mode_disables_persistent_connections(self):
+        with mock.patch('trimly.settings.ASGI_MODE', True):
+            config = _apply_connection_settings({'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 600})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+    def test_db_pool_without_psycopg_pool_fails_loudly(self):
+        import importlib
+        import trimly.settings
+
+        with mock.patch.dict(os.environ, {'DB_POOL': 'true'}), \
+                mock.patch('importlib.util.find_spec', return_value=None):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg[binary,pool]'):
+                importlib.reload(trimly.settings)
+        importlib.reload(trimly.settings)
+
+    def test_metrics_endpoint_reports_database_stats(self):
+        staff = User.objects.create_user('staff', 'staff@test.com', 'pass12345', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('admin_metrics'))
+        self.assertEqual(response.status_code, 200)
+        database = response.json()['metrics']['database']['default']
+        self.assertIn('health_checks', database)
+        self.assertIn('connections_opened', database)
+
+
+# -------------------------------
+# QUERY CACHE
+# -------------------------------
+
+class QueryCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+
+    def test_landing_page_warm_cache_skips_db(self):
+        self.client.get(reverse('landing'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('landing'))
+        self.assertContains(response, 'Haircut')
+
+    def test_landing_page_serves_precompressed_variants(self):
+        self.client.get(reverse('landing'))
+        response = self.client.get(reverse('landing'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Haircut', gzip.decompress(response.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        if pagecache.brotli:
+            response = self.client.get(reverse('landing'), HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_landing_page_not_shared_with_logged_in_users(self):
+        self.client.get(reverse('landing'))
+        user = User.objects.create_user('customer', 'customer@test.com', 'pass12345')
+        self.client.force_login(user)
+        response = self.client.get(reverse('landing'))
+        self.assertContains(response, 'Dashboard')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_deploy_invalidates_cached_page(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            manifest = Path(static_root) / 'staticfiles.json'
+            manifest.write_text('{"paths": {"build/landing.css": "build/landing.1111.css"}}')
+            before = pagecache._asset_version()
+            manifest.write_text('{"paths": {"build/landing.css": "build/landing.2222.css"}}')
+            self.assertNotEqual(pagecache._asset_version(), before)
+
+        self.client.get(reverse('landing'))
+        metrics.reset_counters()
+        with mock.patch.object(pagecache, 'asset_version', return_value='next-deploy'):
+            self.client.get(reverse('landing'))
+        self.assertEqual(metrics.get_counters('pagecache.'), {'pagecache.landing.miss': 1})
+
+    def test_asset_version_follows_collectstatic_manifest(self):
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, STORAGES=PRODUCTION_STORAGES):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            manifest = Path(static_root) / 'staticfiles.json'
+            self.assertTrue(manifest.is_file())
+            version = pagecache._asset_version()
+            with mock.patch.object(pagecache, 'BUILD_DIR', Path(static_root) / 'missing'):
+                # Taken from the manifest, not from the build directory
+                self.assertEqual(pagecache._asset_version(), version)
+            manifest.write_text(manifest.read_text().replace('"paths": {', '"paths": {"new.css": "new.0.css", ', 1))
+            self.assertNotEqual(pagecache._asset_version(), version)
+
+    def test_pending_messages_bypass_page_cache(self):
+        self.client.get(reverse('landing'))
+        self.client.post(reverse('login'), {'username': 'nobody', 'password': 'wrong'})
+        metrics.reset_counters()
+        self.client.get(reverse('landing'))
+        self.assertEqual(metrics.get_counters('pagecache.'), {})
+
+    def test_write_invalidates_cached_queryset(self):
+        self.client.get(reverse('landing'))
+        self.service.name = 'Fade'
+        self.service.save()
+        response = self.client.get(reverse('landing'))
+        self.assertContains(response, 'Fade')
+        self.assertNotContains(response, 'Haircut')
+
+    def test_lost_version_never_revives_old_entries(self):
+        build = lambda: list(ServiceType.objects.values_list('name', flat=True))
+        version_key = querycache._version_key(ServiceType)
+        cache.delete(version_key)
+        self.assertEqual(cached_queryset('names:test', build, depends_on=[ServiceType]), ['Haircut'])
+        ServiceType.objects.update(name='Fade')  # bypasses the signals, like a lost invalidation
+        cache.delete(version_key)  # evicted / Redis restarted
+        self.assertEqual(cached_queryset('names:test', build, depends_on=[ServiceType]), ['Fade'])
+
+    def test_cache_miss_reads_from_primary(self):
+        from .routers import _read_alias
+
+        # Inside @replica_reads; an unknown alias fails any query that is routed to it
+        token = _read_alias.set('lagging_replica')
+        try:
+            rows = cached_queryset('services:all', lambda: ServiceType.objects.all(), depends_on=[ServiceType])
+        finally:
+            _read_alias.reset(token)
+        self.assertEqual(rows, [self.service])
+
+    def test_cached_queryset_is_lazy_on_hit(self):
+        build = lambda: WeeklyAvailability.objects.all()
+        cached_queryset('weekly:test', build, depends_on=[WeeklyAvailability])
+        with self.assertNumQueries(0):
+            cached_queryset('weekly:test', build, depends_on=[WeeklyAvailability])
+
+    def test_bookable_barbers_ignore_login_timestamp(self):
+        user = User.objects.create_user('barber', 'barber@test.com', 'pass12345', first_name='Mike')
+        Barber.objects.create(user=user, is_approved=True)
+        customer = User.objects.create_user('customer', 'customer@test.com', 'pass12345')
+        Customer.objects.create(user=customer)
+        self.client.force_login(customer)
+
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertContains(response, 'Mike')
+        self.client.login(username='customer', password='pass12345')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('customer_dashboard'))
+        for query in ctx.captured_queries:
+            self.assertNotIn('FROM "main_servicetype"', query['sql'])
+            self.assertNotIn('FROM "main_barber"', query['sql'])
+
+
+# -------------------------------
+# CATALOG
+# -------------------------------
+
+class CatalogTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        ServiceType.objects.create(name='Retired Service', price=99, duration=30, is_active=False)
+        user = User.objects.create_user('barber', 'barber@test.com', 'pass12345', first_name='Mike', last_name='Smith')
+        self.barber = Barber.objects.create(user=user, is_approved=True, average_rating='4.50', total_ratings=2)
+
+    def test_catalog_api_snapshot(self):
+        data = self.client.get(reverse('catalog_api')).json()
+        self.assertEqual([s['name'] for s in data['services']], ['Haircut'])
+        self.assertEqual(data['barbers'][0]['name'], 'Mike Smith')
+        self.assertEqual(data['barbers'][0]['average_rating'], '4.50')
+
+    def test_rebuild_reads_from_primary(self):
+        from .catalog import get_catalog
+        from .routers import _read_alias
+
+        token = _read_alias.set('lagging_replica')
+        try:
+            catalog = get_catalog()
+        finally:
+            _read_alias.reset(token)
+        self.assertEqual([barber['name'] for barber in catalog['barbers']], ['Mike Smith'])
+
+    def test_catalog_api_conditional_get(self):
+        response = self.client.get(reverse('catalog_api'))
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('catalog_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.barber.is_available_for_booking = False
+        self.barber.save()
+        response = self.client.get(reverse('catalog_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['barbers'], [])
+
+
+# -------------------------------
+# STATIC ASSET PIPELINE
+# -------------------------------
+
+
+class AssetPipelineTests(SimpleTestCase):
+
+    CSS = """
+    /* comment */
+    :root { --brand: brown; }
+    .navbar-left > a { color: red; }
+    .booking-panel { display: none; }
+    @keyframes fadeIn { from { opacity: 0; } to { opacity: 1; } }
+    @media (max-width: 768px) {
+      .navbar { height: 56px; }
+      .booking-panel { display: block; }
+    }
+    .hero-dark { background-image: url("./images/hero.jpg"); }
+    """
+
+    def test_minify_css(self):
+        css = assets.minify_css(self.CSS)
+        self.assertNotIn('comment', css)
+        self.assertIn('.navbar-left>a{color:red}', css)
+
+    def test_extract_critical_css(self):
+        css = assets.minify_css(self.CSS)
+        critical = assets.extract_critical_css(css, assets.CRITICAL_SELECTORS)
+        self.assertIn(':root{--brand:brown}', critical)
+        self.assertIn('@media (max-width:768px){.navbar{height:56px}}', critical)
+        self.assertNotIn('booking-panel', critical)
+        self.assertNotIn('@keyframes', critical)
+
+    def test_rebase_css_urls(self):
+        css = assets.rebase_css_urls(assets.minify_css(self.CSS), 'landing.css', 'build/landing.css')
+        self.assertIn('url("../images/hero.jpg")', css)
+
+    def test_minify_js_keeps_statements_on_separate_lines(self):
+        js = assets.minify_js("// header\n  let a = 1\n\n  let url = 'https://x'  // trailing\n")
+        self.assertEqual(js, "let a = 1\nlet url = 'https://x'  // trailing\n")
+
+    def test_build_page(self):
+        with tempfile.TemporaryDirectory() as build_dir:
+            sizes = assets.build_page('landing', assets.PAGE_BUNDLES['landing'], build_dir=Path(build_dir))
+            self.assertEqual(set(sizes), {'landing.css', 'landing.critical.css', 'landing.js'})
+            self.assertLess(sizes['landing.critical.css'], sizes['landing.css'])
+
+    def test_page_templates_have_no_template_syntax_in_js(self):
+        for config in assets.PAGE_BUNDLES.values():
+            for name in config['js']:
+                source = (assets.STATIC_DIR / name).read_text(encoding='utf-8')
+                self.assertNotIn('{%', source, name)
+                self.assertNotIn('{{', source, name)
+
+    def test_font_preloads_only_for_vendored_files(self):
+        from .templatetags.assets import font_preloads
+        html = font_preloads()
+        for font in assets.FONTS:
+            vendored = (assets.FONTS_DIR / font['file']).exists()
+            self.assertEqual(font['file'] in html, vendored)
+
+    def test_production_static_storage_is_hashed_and_compressed(self):
+        import importlib
+        import trimly.settings
+
+        try:
+            with mock.patch.dict(os.environ, {'DJANGO_DEBUG': 'false'}):
+                importlib.reload(trimly.settings)
+                self.assertEqual(
+                    trimly.settings.STORAGES['staticfiles']['BACKEND'],
+                    'whitenoise.storage.CompressedManifestStaticFilesStorage',
+                )
+            with mock.patch.dict(os.environ, {'DJANGO_DEBUG': 'true'}):
+                importlib.reload(trimly.settings)
+                self.assertEqual(
+                    trimly.settings.STORAGES['staticfiles']['BACKEND'],
+                    'django.contrib.staticfiles.storage.StaticFilesStorage',
+                )
+        finally:
+            importlib.reload(trimly.settings)
+
+    def test_collectstatic_fingerprints_fonts(self):
+        from django.core.management import call_command
+        from .templatetags.assets import font_preloads
+
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, STORAGES=PRODUCTION_STORAGES):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            html = font_preloads()
+            for font in assets.FONTS:
+                hashed = re.search(rf'fonts/{font["file"][:-len(".woff2")]}\.[0-9a-f]{{12}}\.woff2', html)
+                self.assertIsNotNone(hashed, html)
+                self.assertTrue((Path(static_root) / hashed.group(0)).is_file())
+
+    def test_google_fonts_css_latin_subset(self):
+        from .management.commands.vendor_fonts import latin_woff2_url
+        css = (
+            "/* cyrillic */\n@font-face { font-family: 'Inter'; src: url(https://fonts.gstatic.com/a.woff2) format('woff2'); }\n"
+            "/* latin */\n@font-face { font-family: 'Inter'; src: url(https://fonts.gstatic.com/b.woff2) format('woff2'); }\n"
+        )
+        self.assertEqual(latin_woff2_url(css), 'https://fonts.gstatic.com/b.woff2')
+
+
+# -------------------------------
+# ARCHIVE
+# -------------------------------
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        barber_user = User.objects.create_user('barber', 'barber@test.com', 'pass12345')
+        self.barber = Barber.objects.create(user=barber_user, is_approved=True)
+        customer_user = User.objects.create_user('customer', 'customer@test.com', 'pass12345')
+        self.customer = Customer.objects.create(user=customer_user)
+
+    def make_booking(self, days_ago, status, **kwargs):
+        return Reservation.objects.create(
+            customer=self.customer, barber=self.barber, service_type=self.service,
+            appointment_datetime=timezone.now() - timedelta(days=days_ago), status=status, **kwargs
+        )
+
+    def test_archives_only_old_finished_bookings(self):
+        old = self.make_booking(400, 'completed', rating=4)
+        self.make_booking(400, 'cancelled')
+        recent = self.make_booking(5, 'completed')
+        stale_pending = self.make_booking(400, 'pending')
+
+        moved = archive.archive_reservations(days=180, batch_size=1)
+
+        self.assertEqual(moved, 2)
+        self.assertEqual(set(Reservation.objects.values_list('id', flat=True)), {recent.id, stale_pending.id})
+        archived = ArchivedReservation.objects.get(id=old.id)
+        self.assertEqual((archived.rating, archived.price, archived.customer_id), (4, old.price, self.customer.id))
+
+    def test_history_and_reports_span_both_tables(self):
+        self.make_booking(400, 'completed', rating=5)
+        self.make_booking(5, 'completed', rating=3)
+        archive.archive_reservations(days=180)
+
+        self.client.force_login(self.customer.user)
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertEqual(len(response.context['past_bookings']), 2)
+        self.assertEqual(self.customer.get_total_appointments(), 2)
+        self.assertEqual(rollups.report()['total_revenue'], 300)
+
+        self.barber.update_rating()
+        self.assertEqual((float(self.barber.average_rating), self.barber.total_ratings), (4.0, 2))
+
+
+# -------------------------------
+# PARTITIONING
+# -------------------------------
+
+class PartitioningTests(TestCase):
+
+    def test_month_helpers(self):
+        self.assertEqual(partitioning.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        months = list(partitioning.month_range(date(2025, 12, 15), date(2026, 2, 1)))
+        self.assertEqual(months, [date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual(partitioning.partition_name(date(2026, 2, 1)), 'main_reservation_p202602')
+
+    def test_datetime_bounds_are_aware_and_half_open(self):
+        start, end = partitioning.datetime_bounds(date(2026, 3, 2), date(2026, 3, 8))
+        self.assertTrue(timezone.is_aware(start))
+        self.assertEqual(end - start, timedelta(days=7))
+
+    def test_sqlite_stays_unpartitioned(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('SQLite-only behaviour')
+        self.assertFalse(partitioning.is_partitioned())
+        self.assertEqual(partitioning.ensure_partitions(), [])
+
+    def test_barber_dashboard_counts_use_date_ranges(self):
+        from .views import _get_barber_dashboard_data
+        service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        customer = Customer.objects.create(user=User.objects.create_user('customer', 'c@test.com', 'pass12345'))
+        start, _ = partitioning.datetime_bounds(timezone.localdate())
+        for hours, status in ((9, 'confirmed'), (10, 'no_show'), (24 + 9, 'pending')):
+            Reservation.objects.create(customer=customer, barber=barber, service_type=service,
+                                       appointment_datetime=start + timedelta(hours=hours), status=status)
+
+        data = _get_barber_dashboard_data(barber)
+        self.assertEqual(len(data['today_appointments']), 2)
+        self.assertEqual(data['stats_today_count'], 1)
+        self.assertEqual(len(data['upcoming_appointments']), 1)
+
+
+
+# -------------------------------
+# ROLLUPS
+# -------------------------------
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        self.barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        self.customer = Customer.objects.create(user=User.objects.create_user('customer', 'c@test.com', 'pass12345'))
+
+    def book(self, **kwargs):
+        return Reservation.objects.create(
+            customer=self.customer, barber=self.barber, service_type=self.service,
+            appointment_datetime=timezone.now() - timedelta(days=1), **kwargs
+        )
+
+    def snapshot(self):
+        return {
+            (row.status, row.booking_count, row.revenue, row.minutes_booked)
+            for row in DailyBookingRollup.objects.filter(booking_count__gt=0)
+        }
+
+    def test_status_changes_move_rollup_counts(self):
+        booking = self.book(status='confirmed')
+        self.book(status='confirmed')
+        self.assertEqual(self.snapshot(), {('confirmed', 2, 300, 60)})
+
+        booking.status = 'completed'
+        booking.save()
+        self.assertEqual(self.snapshot(), {('confirmed', 1, 150, 30), ('completed', 1, 150, 30)})
+
+        booking.delete()
+        self.assertEqual(self.snapshot(), {('confirmed', 1, 150, 30)})
+
+    def test_deferred_instance_save_reads_stored_row(self):
+        booking = self.book(status='confirmed')
+        deferred = Reservation.objects.only('id', 'status').get(pk=booking.pk)
+        deferred.status = 'no_show'
+        deferred.save(update_fields=['status'])
+        self.assertEqual(self.snapshot(), {('no_show', 1, 150, 30)})
+
+    def test_rebuild_matches_incremental_and_survives_archiving(self):
+        self.book(status='completed')
+        self.book(status='no_show')
+        old = self.book(status='completed')
+        Reservation.objects.filter(pk=old.pk).update(appointment_datetime=timezone.now() - timedelta(days=400))
+        rollups.rebuild()
+        incremental = self.snapshot()
+
+        archive.archive_reservations(days=180)
+        self.assertEqual(self.snapshot(), incremental)
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+        report = rollups.report()
+        self.assertEqual((report['total_bookings'], report['total_revenue'], report['no_show_rate']), (3, 300, 33.3))
+
+    def test_cascading_deletes_leave_no_dangling_rollups(self):
+        self.book(status='confirmed')
+        other = ServiceType.objects.create(name='Shave', price=80, duration=15)
+        Reservation.objects.create(customer=self.customer, barber=self.barber, service_type=other,
+                                   appointment_datetime=timezone.now() - timedelta(days=1), status='completed')
+
+        other.delete()
+        self.barber.user.delete()
+
+        # FK checks are deferred to commit on SQLite/PostgreSQL; run them now
+        connection.check_constraints()
+        self.assertFalse(DailyBookingRollup.objects.exists())
+        self.assertFalse(Reservation.objects.exists())
+
+
+# -------------------------------
+# ANALYTICS
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class UtilizationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        self.barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        self.customer = Customer.objects.create(user=User.objects.create_user('customer', 'c@test.com', 'pass12345'))
+        self.monday = date(2026, 3, 2)
+        WeeklyAvailability.objects.create(barber=self.barber, day_of_week=0, start_time='09:00', end_time='12:00')
+
+    def test_spread_over_hours(self):
+        minutes = analytics.spread_over_hours([9 * 60 + 30], [10 * 60 + 15])[0]
+        self.assertEqual((minutes[9], minutes[10], minutes.sum()), (30, 15, 45))
+
+    def test_utilization_matrix(self):
+        start, _ = partitioning.datetime_bounds(self.monday)
+        for minutes, status in ((9 * 60, 'completed'), (9 * 60 + 30, 'confirmed'), (10 * 60, 'cancelled')):
+            Reservation.objects.create(customer=self.customer, barber=self.barber, service_type=self.service,
+                                       appointment_datetime=start + timedelta(minutes=minutes), status=status)
+        # Second Monday: 10:00-11:00 blocked
+        Schedule.objects.create(barber=self.barber, date=self.monday + timedelta(days=7),
+                                start_time='10:00', end_time='11:00', is_available=False)
+
+        data = analytics.utilization_matrix(self.monday, self.monday + timedelta(days=13))
+        row = data['barbers'][0]
+        self.assertEqual(row['available_minutes'][0][9:12], [120, 60, 120])
+        self.assertEqual(row['booked_minutes'][0][9], 60)
+        self.assertEqual(row['utilization'][0][9], 0.5)
+        self.assertIsNone(row['utilization'][1][9])
+
+    def test_archived_bookings_count(self):
+        monday = timezone.localdate() - timedelta(days=400)
+        monday -= timedelta(days=monday.weekday())
+        start, _ = partitioning.datetime_bounds(monday)
+        for status in ('completed', 'no_show'):
+            Reservation.objects.create(customer=self.customer, barber=self.barber, service_type=self.service,
+                                       appointment_datetime=start + timedelta(hours=9), status=status)
+        self.assertEqual(archive.archive_reservations(days=180), 2)
+
+        row = analytics.utilization_matrix(monday, monday + timedelta(days=6))['barbers'][0]
+        self.assertEqual(row['booked_minutes'][0][9], 60)
+        self.assertEqual(row['utilization'][0][9], 1.0)
+
+    def test_endpoint_is_staff_only_and_validates_range(self):
+        url = reverse('admin_utilization_api')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_superuser('admin', 'a@test.com', 'pass12345'))
+        self.assertEqual(self.client.get(url, {'start': '2026-03-10', 'end': '2026-03-01'}).status_code, 400)
+        response = self.client.get(url, {'start': '2026-03-02', 'end': '2026-03-08'})
+        self.assertEqual(len(response.json()['barbers'][0]['utilization']), 7)
+
+
+# -------------------------------
+# PROFILES / ROLES
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class ProfileResolutionTests(TestCase):
+
+    def setUp(self):
+        self.barber_user = User.objects.create_user('barber', 'b@test.com', 'pass12345')
+        Barber.objects.create(user=self.barber_user, is_approved=True)
+        self.customer_user = User.objects.create_user('customer', 'c@test.com', 'pass12345')
+        Customer.objects.create(user=self.customer_user)
+
+    def test_user_and_profiles_load_in_one_query(self):
+        backend = ProfileBackend()
+        with self.assertNumQueries(1):
+            user = backend.get_user(self.customer_user.pk)
+            self.assertEqual(get_role(user), ROLE_CUSTOMER)
+            self.assertIsNotNone(user.customer_profile)
+        with self.assertNumQueries(1):
+            user = backend.authenticate(None, username='barber', password='pass12345')
+            self.assertEqual(get_role(user), ROLE_BARBER)
+            self.assertTrue(user.barber_profile.is_approved)
+        with self.assertRaises(PermissionDenied):
+            backend.authenticate(None, username='barber', password='wrong')
+
+    def test_failed_login_is_not_retried_by_model_backend(self):
+        from django.contrib.auth import authenticate
+        from django.contrib.auth.backends import ModelBackend
+
+        with mock.patch.object(ModelBackend, 'authenticate') as fallback:
+            self.assertIsNone(authenticate(None, username='barber', password='wrong'))
+            self.assertIsNone(authenticate(None, username='nobody', password='wrong'))
+        fallback.assert_not_called()
+
+    def test_sessions_from_model_backend_still_load(self):
+        self.client.force_login(self.customer_user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.profile.customer.user_id, self.customer_user.id)
+
+    def test_customer_views_without_profile(self):
+        self.client.force_login(self.barber_user)
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertRedirects(response, reverse('auth'), fetch_redirect_response=False)
+        response = self.client.post(reverse('cancel_booking', args=[1]))
+        self.assertRedirects(response, reverse('customer_dashboard'), fetch_redirect_response=False)
+
+    def test_login_dispatches_by_role(self):
+        response = self.client.post(reverse('login'), {'username': 'barber', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('barber_dashboard'), fetch_redirect_response=False)
+        self.client.logout()
+        response = self.client.post(reverse('login'), {'username': 'c@test.com', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('customer_dashboard'), fetch_redirect_response=False)
+
+    def test_request_role(self):
+        self.client.force_login(self.barber_user)
+        response = self.client.get(reverse('barber_dashboard'))
+        self.assertEqual(response.wsgi_request.role, ROLE_BARBER)
+        self.assertEqual(response.wsgi_request.profile.barber.user_id, self.barber_user.id)
+        self.assertIsNone(response.wsgi_request.profile.customer)
+
+
+# -------------------------------
+# SESSIONS
+# -------------------------------
+
+class SessionPurgeTests(TestCase):
+
+    def test_purges_only_expired_sessions_in_batches(self):
+        from django.contrib.sessions.models import Session
+        from django.core.management import call_command
+
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+
+        call_command('purge_sessions', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+# -------------------------------
+# REGISTRATION
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class RegistrationTests(TestCase):
+
+    def setUp(self):
+        self.existing = User.objects.create_user('taken', 'taken@test.com', 'pass12345')
+        Barber.objects.create(user=self.existing, phone_number='09123456789')
+
+    def post(self, **overrides):
+        data = {
+            'username': 'newuser', 'email': 'new@test.com', 'first_name': 'New', 'last_name': 'User',
+            'phone_number': '0999 111 2222', 'password': 'Str0ng!pass', 'confirm-password': 'Str0ng!pass',
+            'role': 'customer',
+        }
+        data.update(overrides)
+        return self.client.post(reverse('register'), data)
+
+    def test_all_uniqueness_checks_in_one_query(self):
+        with self.assertNumQueries(1):
+            conflicts = registration.find_conflicts('taken', 'taken@test.com', '09123456789')
+        self.assertEqual(conflicts, {'username', 'email', 'phone'})
+        self.assertEqual(registration.find_conflicts('free', 'free@test.com', '09000000000'), set())
+
+    def test_registration_creates_user_and_profile(self):
+        response = self.post()
+        self.assertRedirects(response, reverse('customer_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(User.objects.get(username='newuser').customer_profile.phone_number, '09991112222')
+
+    def test_conflicts_are_reported_together(self):
+        response = self.post(username='taken', email='taken@test.com', phone_number='09123456789')
+        errors = [str(message) for message in response.context['messages']]
+        self.assertEqual(errors, list(registration.CONFLICT_MESSAGES.values()))
+
+    def test_profile_failure_rolls_back_user(self):
+        # Simulates losing the race: the check passes but the phone constraint fires on insert
+        with mock.patch.object(registration, 'find_conflicts', return_value=set()):
+            with self.assertRaises(ValidationError):
+                registration.register_user('racer', 'racer@test.com', 'R', 'R', '09123456789', 'Str0ng!pass', 'barber')
+        self.assertFalse(User.objects.filter(username='racer').exists())
+
+    def test_admin_edit_applies_the_same_phone_rule(self):
+        customer = Customer.objects.create(user=User.objects.create_user('cust', 'c@test.com', 'pass12345'),
+                                           phone_number='09000000000')
+        self.client.force_login(User.objects.create_superuser('admin', 'a@test.com', 'pass12345'))
+        url = reverse('admin_edit_customer', args=[customer.user_id])
+        data = {'email': 'c@test.com', 'first_name': 'C', 'last_name': 'C', 'phone_number': '09123456789'}
+
+        self.client.post(url, data)
+        customer.refresh_from_db()
+        self.assertEqual(customer.phone_number, '09000000000')
+
+        self.client.post(url, dict(data, phone_number='09000000000', first_name='Kept'))
+        self.assertEqual(User.objects.get(pk=customer.user_id).first_name, 'Kept')
+
+    def test_emails_are_unique_regardless_of_case(self):
+        self.assertEqual(registration.find_conflicts(email='Taken@Test.com'), {'email'})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('shouty', 'TAKEN@test.com', 'pass12345')
+        # Accounts without an email don't collide
+        User.objects.create_user('noemail1', '', 'pass12345')
+        User.objects.create_user('noemail2', '', 'pass12345')
+
+    def test_admin_edit_constraint_failure_changes_nothing(self):
+        customer = Customer.objects.create(user=User.objects.create_user('cust', 'c@test.com', 'pass12345'),
+                                           phone_number='09000000000')
+        Customer.objects.create(user=User.objects.create_user('other', 'o@test.com', 'pass12345'),
+                                phone_number='09111111111')
+        self.client.force_login(User.objects.create_superuser('admin', 'a@test.com', 'pass12345'))
+        data = {'email': 'new@test.com', 'first_name': 'C', 'last_name': 'C', 'phone_number': '09111111111'}
+        # The check passes (as if the other edit landed just after it) and the phone constraint fires
+        with mock.patch.object(views, '_edit_conflict_error', return_value=None):
+            response = self.client.post(reverse('admin_edit_customer', args=[customer.user_id]), data)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], ["Email or phone number already in use."])
+        self.assertEqual(User.objects.get(pk=customer.user_id).email, 'c@test.com')
+
+
+# -------------------------------
+# ASYNC (ASGI) VIEWS
+# -------------------------------
+
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('barber', 'b@test.com', 'pass12345')
+        self.barber = Barber.objects.create(user=self.user, is_approved=True)
+        customer = Customer.objects.create(user=User.objects.create_user('cust', 'c@test.com', 'pass12345'))
+        service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        self.day = timezone.localdate() + timedelta(days=1)
+        WeeklyAvailability.objects.create(barber=self.barber, day_of_week=self.day.weekday(),
+                                          is_available=True, start_time='09:00', end_time='12:00')
+        Schedule.objects.create(barber=self.barber, date=self.day, start_time='11:00', end_time='12:00',
+                                is_available=False)
+        Reservation.objects.create(customer=customer, barber=self.barber, service_type=service, price=150,
+                                   appointment_datetime=timezone.make_aware(datetime(*self.day.timetuple()[:3], 9, 30)))
+
+    def request(self, factory, path='/'):
+        request = factory.get(path)
+        request.user = self.user
+        request.profile = RequestProfile(request)
+        request.session = SessionStore()
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        return request
+
+    async def test_async_slots_match_sync(self):
+        sync_response = await sync_to_async(views.get_available_slots_api)(
+            self.request(RequestFactory()), self.barber.id, self.day.isoformat())
+        async_response = await views.get_available_slots_api_async(
+            self.request(AsyncRequestFactory()), self.barber.id, self.day.isoformat())
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+        self.assertEqual(json.loads(async_response.content)['slots'], ['09:00 AM', '10:00 AM', '10:30 AM'])
+
+    async def test_async_dashboard_api_matches_sync(self):
+        sync_response = await sync_to_async(views.barber_dashboard_api)(self.request(RequestFactory()))
+        async_response = await views.barber_dashboard_api_async(self.request(AsyncRequestFactory()))
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(
+            json.loads(async_response.content)['html_stats'], json.loads(sync_response.content)['html_stats'])
+
+    async def test_async_user_loads_profiles(self):
+        # An unloaded relation would raise SynchronousOnlyOperation here
+        user = await ProfileBackend().aget_user(self.user.pk)
+        self.assertEqual(get_role(user), ROLE_BARBER)
+
+
+# -------------------------------
+# THROTTLING
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'], THROTTLE_LIMITS={
+    'login': {'ip': (10, 600), 'account': (3, 600)},
+    'password_reset': {'ip': (2, 600), 'account': (2, 600)},
+})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset_counters()
+        self.user = User.objects.create_user('member', 'member@test.com', 'pass12345')
+
+    def login(self, password='wrong', username='member', ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_bucket_refills_over_time(self):
+        self.assertEqual(throttle.take('k', 2, 10, now=0), 0)
+        self.assertEqual(throttle.take('k', 2, 10, now=0), 0)
+        self.assertEqual(throttle.take('k', 2, 10, now=0), 5)
+        self.assertEqual(throttle.take('k', 2, 10, now=5), 0)
+
+    def test_account_limit_rejects_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 302)
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode, \
+                self.assertNumQueries(0):
+            response = self.login(password='pass12345', ip='10.0.0.2')
+        encode.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        counters = metrics.get_counters()
+        self.assertEqual(counters['throttle.login.allowed'], 3)
+        self.assertEqual(counters['throttle.login.rejected'], 1)
+
+    def test_ip_limit_spans_accounts(self):
+        for i in range(10):
+            self.login(username=f'guess{i}')
+        self.assertEqual(self.login(username='other').status_code, 429)
+        self.assertEqual(self.login(username='other', ip='10.0.0.9').status_code, 302)
+
+    def test_successful_login_resets_account_bucket(self):
+        self.login()
+        self.login()
+        self.login(password='pass12345')
+        self.client.logout()
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 302)
+
+    def test_password_reset_is_throttled(self):
+        url = reverse('password_reset')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'email': 'member@test.com'}).status_code, 302)
+        response = self.client.post(url, {'email': 'member@test.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('email', response.context['form'].fields)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_email_and_username_share_account_bucket(self):
+        for username in ('member', 'member@test.com', 'member'):
+            self.assertEqual(self.login(username=username).status_code, 302)
+        self.assertEqual(self.login(username='member@test.com', ip='10.0.0.2').status_code, 429)
+
+    def test_over_limit_email_login_skips_user_lookup(self):
+        for _ in range(3):
+            self.login(username='member@test.com')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.login(username='member@test.com').status_code, 429)
+        for i in range(7):
+            self.login(username=f'guess{i}@test.com')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.login(username='new@test.com').status_code, 429)
+
+    @override_settings(THROTTLE_TRUSTED_PROXIES=0)
+    def test_forwarded_header_without_trusted_proxies_warns(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        with mock.patch.object(throttle, '_warned', False), self.assertLogs('main.throttle', 'WARNING'):
+            self.assertEqual(throttle.client_ip(request), '10.0.0.1')
+        with override_settings(THROTTLE_TRUSTED_PROXIES=1):
+            self.assertEqual(throttle.client_ip(request), '203.0.113.7')
+
+
+# -------------------------------
+# CUSTOMER HISTORY
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class CustomerHistoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        self.customer = Customer.objects.create(user=User.objects.create_user('cust', 'c@test.com', 'pass12345'))
+        now = timezone.now()
+
+        def book(when, status):
+            return Reservation.objects.create(customer=self.customer, barber=barber, service_type=service,
+                                              appointment_datetime=when, status=status).id
+
+        # 12 past visits (5 of them archived later), a cancelled future booking and an upcoming one
+        self.expected = [book(now + timedelta(days=3), 'cancelled')]
+        self.expected += [book(now - timedelta(days=30 * i), 'completed') for i in range(1, 13)]
+        book(now + timedelta(days=5), 'confirmed')
+        archive.archive_reservations(days=200)
+        self.client.force_login(self.customer.user)
+
+    def test_dashboard_shows_first_page_with_cursor(self):
+        response = self.client.get(reverse('customer_dashboard'))
+        self.assertEqual([b.id for b in response.context['past_bookings']], self.expected[:10])
+        self.assertIsNotNone(response.context['history_cursor'])
+
+    def test_cursor_pages_through_live_and_archived_rows(self):
+        seen, cursor = [], ''
+        while True:
+            data = self.client.get(reverse('customer_history_api'), {'cursor': cursor, 'limit': 4}).json()
+            seen += [int(pk) for pk in re.findall(r'data-booking-id="(\d+)"', data['html'])]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, self.expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('customer_history_api'), {'cursor': 'yesterday|1'})
+        self.assertEqual(response.status_code, 400)
+
+
+# -------------------------------
+# CALENDAR FEED
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        customer = Customer.objects.create(
+            user=User.objects.create_user('cust', 'c@test.com', 'pass12345', first_name='Ana', last_name='Cruz'))
+        self.service = ServiceType.objects.create(name='Fade, Beard', price=150, duration=30)
+        self.booking = Reservation.objects.create(
+            customer=customer, barber=self.barber, service_type=self.service, status='confirmed',
+            appointment_datetime=timezone.now() + timedelta(days=1), duration=45,
+        )
+        self.url = reverse('barber_calendar_feed', args=[calendar_feed.get_token(self.barber)])
+
+    def test_feed_contents(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn(f'UID:reservation-{self.booking.id}@trimly\r\n', body)
+        self.assertIn('SUMMARY:Fade\\, Beard - Ana Cruz\r\n', body)
+        self.assertIn('STATUS:CONFIRMED\r\n', body)
+
+    def test_unchanged_feed_is_a_304_without_queries(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertNotIn('BEGIN:VEVENT', third.content.decode())
+
+    def test_feed_body_is_one_query(self):
+        barber_id = calendar_feed.barber_id_for_token(self.barber.calendar_token)
+        with self.assertNumQueries(1):
+            calendar_feed.get_feed(barber_id)
+
+    def test_reset_token_revokes_old_link(self):
+        self.client.get(self.url)
+        calendar_feed.reset_token(self.barber)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        new_url = reverse('barber_calendar_feed', args=[self.barber.calendar_token])
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+    def test_token_is_created_once_on_the_primary(self):
+        from .routers import _read_alias
+
+        other = Barber.objects.create(user=User.objects.create_user('other', 'o@test.com', 'pass12345'))
+        stale = Barber.objects.get(pk=other.pk)
+        token = _read_alias.set('lagging_replica')
+        try:
+            first = calendar_feed.get_token(other)
+            # A copy loaded before the token existed gets the same one back
+            self.assertEqual(calendar_feed.get_token(stale), first)
+        finally:
+            _read_alias.reset(token)
+        self.assertEqual(Barber.objects.get(pk=other.pk).calendar_token, first)
+
+    def test_long_lines_are_folded(self):
+        folded = calendar_feed._fold('DESCRIPTION:' + 'é' * 80)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), 'DESCRIPTION:' + 'é' * 80)
+
+
+# -------------------------------
+# SLOT HOLDS
+# -------------------------------
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class SlotHoldTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.barber = Barber.objects.create(
+            user=User.objects.create_user('barber', 'b@test.com', 'pass12345'), is_approved=True)
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        self.day = timezone.localdate() + timedelta(days=1)
+        WeeklyAvailability.objects.create(barber=self.barber, day_of_week=self.day.weekday(),
+                                          is_available=True, start_time='09:00', end_time='10:00')
+        self.alice, self.bob = self.client_for('alice'), self.client_for('bob')
+
+    def client_for(self, username):
+        user = User.objects.create_user(username, f'{username}@test.com', 'pass12345')
+        Customer.objects.create(user=user)
+        client = self.client_class()
+        client.force_login(user)
+        return client
+
+    def hold(self, client, time):
+        return client.post(reverse('hold_slot_api'), {
+            'barber_id': self.barber.id, 'service_id': self.service.id,
+            'date': self.day.isoformat(), 'time': time,
+        })
+
+    def slots(self, client):
+        url = reverse('get_available_slots_api', args=[self.barber.id, self.day.isoformat()])
+        return client.get(url, {'duration': 30}).json()['slots']
+
+    def test_held_slot_is_hidden_from_others_only(self):
+        self.assertEqual(self.hold(self.alice, '09:00').status_code, 201)
+        self.assertEqual(self.slots(self.bob), ['09:30 AM'])
+        self.assertEqual(self.slots(self.alice), ['09:00 AM', '09:30 AM'])
+        self.assertEqual(self.hold(self.bob, '09:00').status_code, 409)
+
+    def test_new_hold_replaces_previous_one(self):
+        self.hold(self.alice, '09:00')
+        self.hold(self.alice, '09:30')
+        self.assertEqual(SlotHold.objects.count(), 1)
+        self.assertEqual(self.slots(self.bob), ['09:00 AM'])
+
+    def test_expired_holds_are_ignored_and_purged(self):
+        self.hold(self.alice, '09:00')
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.slots(self.bob), ['09:00 AM', '09:30 AM'])
+        self.assertEqual(holds.purge_expired(), 1)
+
+    def test_booking_releases_the_hold(self):
+        self.hold(self.alice, '09:00')
+        self.alice.post(reverse('create_booking'), {
+            'service_id': self.service.id, 'barber_id': self.barber.id,
+            'appointment_date': self.day.isoformat(), 'appointment_time': '09:00',
+        })
+        self.assertTrue(Reservation.objects.filter(barber=self.barber).exists())
+        self.assertFalse(SlotHold.objects.exists())
+
+
+# -------------------------------
+# CANCELLATION WAITLIST
+# -------------------------------
+
+@override_settings(WAITLIST_ASYNC=False)
+class WaitlistTests(TestCase):
+
+    def setUp(self):
+        self.barber = Barber.objects.create(
+            user=User.objects.create_user('barber', 'b@test.com', 'pass12345'), is_approved=True)
+        self.service = ServiceType.objects.create(name='Haircut', price=150, duration=30)
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.alice, self.bob, self.carol = (self.customer(name) for name in ('alice', 'bob', 'carol'))
+        self.booking = Reservation.objects.create(
+            customer=self.alice, barber=self.barber, service_type=self.service, price=150, duration=30,
+            appointment_datetime=timezone.make_aware(datetime(*self.day.timetuple()[:3], 9)), status='confirmed',
+        )
+
+    def customer(self, username):
+        return Customer.objects.create(user=User.objects.create_user(username, f'{username}@test.com', 'pass12345'))
+
+    def join(self, customer, barber_id, date_from, date_to=None):
+        client = self.client_class()
+        client.force_login(customer.user)
+        return client.post(reverse('join_waitlist_api'), {
+            'barber_id': barber_id, 'service_id': self.service.id,
+            'date_from': date_from.isoformat(), 'date_to': (date_to or date_from).isoformat(),
+        })
+
+    def cancel(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel(reason='Sick')
+
+    def test_cancellation_offers_slot_to_oldest_match(self):
+        self.assertEqual(self.join(self.bob, self.barber.id, self.day).status_code, 201)
+        self.join(self.carol, 'any', self.day - timedelta(days=1), self.day + timedelta(days=2))
+        self.cancel()
+        bob, carol = WaitlistEntry.objects.order_by('id')
+        self.assertEqual(bob.status, 'offered')
+        self.assertEqual(bob.offered_start, self.booking.appointment_datetime)
+        self.assertEqual(carol.status, 'waiting')
+        self.assertEqual([m.to for m in mail.outbox], [['bob@test.com']])
+
+    def test_rejection_offers_to_any_barber_entry(self):
+        self.join(self.carol, '', self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.status = 'rejected'
+            self.booking.save()
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual((entry.status, entry.offered_barber), ('offered', self.barber))
+
+    def test_incompatible_entries_are_not_offered(self):
+        self.join(self.bob, self.barber.id, self.day + timedelta(days=1))
+        self.join(self.alice, self.barber.id, self.day)  # the customer who cancelled
+        long_service = ServiceType.objects.create(name='Full grooming', price=400, duration=90)
+        WaitlistEntry.objects.create(customer=self.carol, service_type=long_service,
+                                     date_from=self.day, date_to=self.day)
+        self.cancel()
+        self.assertFalse(WaitlistEntry.objects.exclude(status='waiting').exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_only_freeing_transitions_trigger_matching(self):
+        self.join(self.bob, self.barber.id, self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.status = 'completed'
+            self.booking.save()
+            self.booking.status = 'cancelled'
+            self.booking.save()
+        self.assertEqual(WaitlistEntry.objects.get().status, 'waiting')
+
+    def test_slot_taken_again_is_not_offered(self):
+        self.join(self.bob, self.barber.id, self.day)
+        self.cancel()  # offered to bob
+        self.join(self.carol, self.barber.id, self.day)
+        Reservation.objects.create(
+            customer=self.bob, barber=self.barber, service_type=self.service, price=150, duration=30,
+            appointment_datetime=self.booking.appointment_datetime,
+        )
+        self.assertIsNone(waitlist.offer_slot(self.barber.id, self.booking.appointment_datetime, 30))
+        self.assertEqual(WaitlistEntry.objects.get(customer=self.carol).status, 'waiting')
+
+    def test_join_validates_window(self):
+        self.assertEqual(self.join(self.bob, 'any', self.day - timedelta(days=2)).status_code, 400)
+        response = self.join(self.bob, 'any', self.day, self.day + timedelta(days=waitlist.MAX_WINDOW_DAYS))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_withdrawn_entry_is_skipped(self):
+        entry_id = self.join(self.bob, self.barber.id, self.day).json()['entry_id']
+        client = self.client_class()
+        client.force_login(self.bob.user)
+        self.assertEqual(client.post(reverse('leave_waitlist_api', args=[entry_id])).status_code, 200)
+        self.cancel()
+        self.assertEqual(WaitlistEntry.objects.get().status, 'withdrawn')
+
+
+# -------------------------------
+# API RATE LIMITS
+# -------------------------------
+
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset_counters()
+
+    def test_sliding_window_weights_previous_window(self):
+        for _ in range(3):
+            self.assertEqual(ratelimit.hit('api', 'ip:1', 3, 60, now=120), 0)
+        # 50s left in this window, then 30s until its 4 hits weigh 2
+        self.assertEqual(ratelimit.hit('api', 'ip:1', 3, 60, now=130), 80)
+        # Halfway through the next window the 4 earlier hits weigh 2
+        self.assertEqual(ratelimit.hit('api', 'ip:1', 3, 60, now=210), 0)
+        self.assertEqual(ratelimit.hit('api', 'ip:1', 3, 60, now=210), 30)
+        self.assertEqual(ratelimit.hit('api', 'ip:2', 3, 60, now=210), 0)
+
+    def test_client_key_prefers_user_over_ip(self):
+        factory = RequestFactory()
+        first, second = factory.get('/', REMOTE_ADDR='10.0.0.1'), factory.get('/', REMOTE_ADDR='10.0.0.2')
+        self.assertNotEqual(ratelimit.client_key(first), ratelimit.client_key(second))
+        first.user = User.objects.create_user('someone', 's@test.com', 'pass12345')
+        self.assertEqual(ratelimit.client_key(first), f'user:{first.user.pk}')
+
+    @override_settings(RATE_LIMITS={'get_available_slots_api': (2, 60)})
+    def test_middleware_limits_slot_api_by_url_name(self):
+        barber = Barber.objects.create(user=User.objects.create_user('barber', 'b@test.com', 'pass12345'))
+        user = User.objects.create_user('customer', 'c@test.com', 'pass12345')
+        Customer.objects.create(user=user)
+        self.client.force_login(user)
+        url = reverse('get_available_slots_api', args=[barber.id, timezone.localdate().isoformat()])
+        statuses = [self.client.get(url).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.get(url)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(ratelimit.rate_limit_stats()['get_available_slots_api'],
+                         {'limit': 2, 'window': 60, 'allowed': 2, 'rejected': 2})
+
+    def test_decorator_limits_sync_and_async_views(self):
+        @ratelimit.rate_limit('sync_view', 1, 60)
+        def sync_view(request):
+            return HttpResponse('ok')
+
+        @ratelimit.rate_limit('async_view', 1, 60)
+        async def async_view(request):
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        self.assertEqual([sync_view(request).status_code for _ in range(2)], [200, 429])
+
+        async def call_twice():
+            return [(await async_view(AsyncRequestFactory().get('/'))).status_code for _ in range(2)]
+        self.assertEqual(async_to_sync(call_twice)(), [200, 429])
+        self.assertTrue(sync_view.rate_limited)
+        self.assertIn('rate_limits', metrics.snapshot())
+
+
+# -------------------------------
+# STRUCTURED LOGGING
+# -------------------------------
+
+class LoggingTests(SimpleTestCase):
+
+    def record(self, level=logging.INFO, name='main.views', msg='hello %s', args=('world',), **extra):
+        record = logging.makeLogRecord({'name': name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                                        'msg': msg, 'args': args, **extra})
+        logs.RequestIdFilter().filter(record)
+        return record
+
+    def test_json_formatter_includes_extras_and_exception(self):
+        try:
+            raise RuntimeError('boom')
+        except RuntimeError:
+            record = self.record(exc_info=sys.exc_info(), barber_id=7)
+        data = json.loads(logs.JsonFormatter().format(record))
+        self.assertEqual((data['level'], data['logger'], data['message']), ('INFO', 'main.views', 'hello world'))
+        self.assertEqual(data['barber_id'], 7)
+        self.assertIn('RuntimeError: boom', data['exception'])
+        self.assertNotIn('request_id', data)
+
+    def test_queue_handler_writes_from_listener_thread(self):
+        stream = io.StringIO()
+        handler = logs.QueueHandler(stream=stream)
+        handler.addFilter(logs.RequestIdFilter())
+        logger = logging.getLogger('main.tests.queue')
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(logger.removeHandler, handler)
+        middleware = logs.RequestIdMiddleware(lambda request: logger.warning('inside') or HttpResponse())
+        response = middleware(RequestFactory().get('/', HTTP_X_REQUEST_ID='abc-123'))
+        handler.flush_and_stop()
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+        data = json.loads(stream.getvalue())
+        self.assertEqual((data['message'], data['request_id']), ('inside', 'abc-123'))
+        self.assertIsNone(logs.get_request_id())
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        metrics.reset_counters()
+        handler = logs.QueueHandler(maxsize=1)
+        handler._pid = os.getpid()  # no listener draining the queue
+        handler.handle(self.record())
+        handler.handle(self.record())
+        self.assertEqual(metrics.get_counters('logs.'), {'logs.dropped': 1})
+
+    def test_invalid_request_id_is_replaced(self):
+        middleware = logs.RequestIdMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/', HTTP_X_REQUEST_ID='bad id\n')
+        response = middleware(request)
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+        # Records logged by Django after the middleware returned carry the request
+        self.assertEqual(self.record(request=request).request_id, response['X-Request-ID'])
+
+    def test_debug_sampling_is_per_request(self):
+        sampler = logs.SampleFilter({'main': 0.5, 'main.views': 0})
+        self.assertFalse(sampler.filter(self.record(logging.DEBUG)))
+        self.assertTrue(sampler.filter(self.record(logging.INFO)))
+        self.assertTrue(sampler.filter(self.record(logging.DEBUG, name='django.db')))
+        for request_id in ('a', 'b', 'c', 'd'):
+            token = logs._request_id.set(request_id)
+            decisions = {sampler.filter(self.record(logging.DEBUG, name='main.emails')) for _ in range(5)}
+            logs._request_id.reset(token)
+            self.assertEqual(len(decisions), 1)
+
+
+# -------------------------------
+# VIEW PROFILING
+# -------------------------------
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        settings_override = override_settings(PROFILE_DIR=Path(profile_dir.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = User.objects.create_user('staff', 'staff@test.com', 'pass12345', is_staff=True)
+
+    def test_staff_request_is_profiled_with_breakdown(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin_dashboard'), {'profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        [profile] = profiling.list_profiles()
+        self.assertEqual(response['X-Profile-Id'], profile['id'])
+        self.assertEqual((profile['url_name'], profile['trigger'], profile['user']), ('admin_dashboard', 'request', 'staff'))
+        self.assertGreater(profile['sql_queries'], 0)
+        self.assertGreater(profile['templates_ms'], 0)
+        self.assertAlmostEqual(profile['sql_ms'] + profile['templates_ms'] + profile['python_ms'],
+                               profile['total_ms'], delta=0.1)
+        self.assertIsNotNone(profiling.profile_path(profile['id'], '.prof'))
+
+    def test_non_staff_cannot_trigger_profiles(self):
+        user = User.objects.create_user('customer', 'c@test.com', 'pass12345')
+        Customer.objects.create(user=user)
+        self.client.force_login(user)
+        response = self.client.get(reverse('customer_dashboard'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    @override_settings(PROFILE_SAMPLE_RATES={'landing': 1}, PROFILE_KEEP=1)
+    def test_sampled_url_names_are_profiled_and_pruned(self):
+        for _ in range(2):
+            response = self.client.get(reverse('landing'))
+        self.assertNotIn('X-Profile-Id', response)
+        [profile] = profiling.list_profiles()
+        self.assertEqual((profile['trigger'], profile['user']), ('sample', None))
+        self.assertEqual(len(list(profiling.profile_dir().iterdir())), 2)
+
+    def test_listing_detail_and_download(self):
+        self.client.force_login(self.staff)
+        profile_id = self.client.get(reverse('admin_metrics'), {'profile': '1'})['X-Profile-Id']
+        self.assertContains(self.client.get(reverse('admin_profiles')), profile_id)
+        detail = self.client.get(reverse('admin_profile_detail', args=[profile_id]), {'sort': 'tottime'})
+        self.assertContains(detail, 'admin_metrics_view')
+        download = self.client.get(reverse('admin_profile_download', args=[profile_id]))
+        self.assertEqual(download.status_code, 200)
+        download.close()
+        self.assertEqual(self.client.get(reverse('admin_profile_detail', args=['..%2Fsecret'])).status_code, 404)
+
+
+# -------------------------------
+# SLOW-QUERY LOG
+# -------------------------------
+
+class SlowQueryTests(TestCase):
+
+    def setUp(self):
+        slowqueries.reset()
+
+    def test_fingerprint_ignores_values_and_in_list_length(self):
+        one = slowqueries.fingerprint('SELECT * FROM t WHERE a = %s AND b IN (%s, %s, %s) LIMIT 21')
+        two = slowqueries.fingerprint("SELECT *  FROM t WHERE a = 'x' AND b IN (%s) LIMIT 5")
+        self.assertEqual(one, two)
+        self.assertEqual(one[1], 'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?')
+        self.assertEqual(slowqueries.fingerprint('SAVEPOINT "s1398_x5"'), slowqueries.fingerprint('SAVEPOINT "s77_x12"'))
+
+    def test_every_connection_is_instrumented_and_aggregated(self):
+        self.assertIn(slowqueries.query_logger, connection.execute_wrappers)
+        Reservation.objects.filter(id__in=[1, 2]).exists()
+        Reservation.objects.filter(id__in=[3]).exists()
+        top = slowqueries.query_stats()['top']
+        entry = next(entry for entry in top if 'main_reservation' in entry['sql'])
+        self.assertEqual((entry['count'], entry['slow']), (2, 0))
+        self.assertIn('slow_queries', metrics.snapshot())
+
+    @override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN='plan')
+    def test_slow_queries_are_logged_with_view_call_site_and_plan(self):
+        user = User.objects.create_user('customer', 'c@test.com', 'pass12345')
+        Customer.objects.create(user=user)
+        with self.assertLogs('main.slowqueries', 'WARNING') as captured:
+            self.client.force_login(user)
+            self.client.get(reverse('customer_dashboard'))
+        in_view = [r for r in captured.records if r.view == 'customer_dashboard' and 'main_reservation' in r.sql]
+        self.assertTrue(in_view)
+        self.assertTrue(in_view[0].call_site.startswith(os.path.join('main', '')))
+        self.assertTrue(in_view[0].plan)
+        stats = {entry['fingerprint']: entry for entry in slowqueries.query_stats(limit=100)['top']}
+        self.assertEqual(stats[in_view[0].fingerprint]['plan'], in_view[0].plan)
+
+    @override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN='analyze', SLOW_QUERY_ANALYZE_RATE=1)
+    def test_writes_are_never_explained(self):
+        with self.assertLogs('main.slowqueries', 'WARNING') as captured:
+            ServiceType.objects.create(name='Shave', price=100, duration=20)
+            ServiceType.objects.update(price=120)
+        self.assertTrue(captured.records)
+        self.assertTrue(all(record.plan is None for record in captured.records))
+
+    def test_async_middleware_records_view(self):
+        seen = []
+
+        async def view(request):
+            return HttpResponse()
+
+        async def get_response(request):
+            await middleware.process_view(request, view, (), {})
+            seen.append(slowqueries._current_view.get())
+            return HttpResponse()
+
+        middleware = slowqueries.QueryContextMiddleware(get_response)
+        async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+        self.assertTrue(seen[0].endswith('test_async_middleware_records_view.<locals>.view'))
+        # async_to_sync copies the context back: the view must not outlive the request
+        self.assertIsNone(slowqueries._current_view.get())
+
+    def test_sync_middleware_restores_outer_view(self):
+        def get_response(request):
+            middleware.process_view(request, get_response, (), {})
+            return HttpResponse()
+
+        middleware = slowqueries.QueryContextMiddleware(get_response)
+        token = slowqueries._current_view.set('outer')
+        try:
+            middleware(RequestFactory().get('/'))
+            self.assertEqual(slowqueries._current_view.get(), 'outer')
+        finally:
+            slowqueries._current_view.reset(token)
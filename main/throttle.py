@@ -0,0 +1,141 @@
+"""
+Token-bucket throttling for credential endpoints.
+
+Each scope (e.g. 'login') has one bucket per client IP and one per account
+identifier, stored in the 'default' cache (Redis when REDIS_URL is set,
+locmem otherwise). A bucket holds up to `capacity` tokens and refills at
+`capacity / period` tokens per second; an attempt costs one token. The check
+runs before the user lookup and any password hashing, so a burst of bad
+logins costs a cache round-trip each instead of a query and a PBKDF2 hash.
+Account buckets are keyed by the identifier as typed (case-insensitive); a
+login by email also charges the resolved username's bucket (check_account),
+so switching between email and username earns no extra attempts.
+
+Behind a reverse proxy (Render, nginx) REMOTE_ADDR is the proxy; set
+THROTTLE_TRUSTED_PROXIES or every client shares one IP bucket.
+
+Bucket updates are read-modify-write without a lock, so under heavy
+concurrency a client may occasionally get an extra attempt through; that is
+an acceptable trade for not serialising logins.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import render
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    # scope: {bucket: (capacity, period in seconds)}
+    'login': {'ip': (20, 60), 'account': (5, 300)},
+    'password_reset': {'ip': (5, 300), 'account': (3, 3600)},
+}
+
+
+def get_limits(scope):
+    return getattr(settings, 'THROTTLE_LIMITS', {}).get(scope, DEFAULT_LIMITS[scope])
+
+
+def client_ip(request):
+    """
+    Client address; with THROTTLE_TRUSTED_PROXIES = N, the N-th entry from the
+    right of X-Forwarded-For (the address our own proxy saw)
+    """
+    proxies = getattr(settings, 'THROTTLE_TRUSTED_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    elif forwarded:
+        _warn_untrusted_forwarded()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+_warned = False
+
+
+def _warn_untrusted_forwarded():
+    global _warned
+    if not _warned:
+        _warned = True
+        logger.warning(
+            "X-Forwarded-For is set but THROTTLE_TRUSTED_PROXIES is 0: per-IP throttles and rate "
+            "limits key on the proxy's address, so all clients share one bucket"
+        )
+
+
+def _bucket_key(scope, kind, identifier):
+    digest = hashlib.sha256(identifier.lower().encode()).hexdigest()[:32]
+    return f'throttle:{scope}:{kind}:{digest}'
+
+
+def take(key, capacity, period, now=None):
+    """Consume one token; returns 0 if allowed, else seconds until a token is available"""
+    now = time.time() if now is None else now
+    rate = capacity / period
+    tokens, stamp = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens < 1:
+        cache.set(key, (tokens, now), period)
+        return max(1, int((1 - tokens) / rate + 0.999))
+    cache.set(key, (tokens - 1, now), period)
+    return 0
+
+
+def check(scope, request, account=None):
+    """
+    Charge an attempt to the IP bucket and (if given) the account bucket.
+    Returns 0 when allowed, otherwise the Retry-After in seconds.
+    """
+    limits = get_limits(scope)
+    wait = take(_bucket_key(scope, 'ip', client_ip(request)), *limits['ip'])
+    if not wait and account:
+        wait = take(_bucket_key(scope, 'account', account), *limits['account'])
+    metrics.incr(f'throttle.{scope}.{"rejected" if wait else "allowed"}')
+    return wait
+
+
+def check_account(scope, account):
+    """Charge one more account bucket for an attempt already allowed by check()"""
+    wait = take(_bucket_key(scope, 'account', account), *get_limits(scope)['account'])
+    if wait:
+        metrics.incr(f'throttle.{scope}.rejected')
+    return wait
+
+
+def reset(scope, account):
+    """Forget an account's failed attempts (after a successful login)"""
+    cache.delete(_bucket_key(scope, 'account', account))
+
+
+def throttled_response(request, template, wait, context=None):
+    messages.error(request, f"Too many attempts. Please try again in {wait} seconds.")
+    response = render(request, template, context or {}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def throttle_post(scope, template, account_field=None, context=None):
+    """
+    Throttle POSTs to a view (e.g. Django's PasswordResetView) before it runs;
+    `context` returns the template context for the 429 page (e.g. an unbound form)
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method == 'POST':
+                account = request.POST.get(account_field, '').strip() if account_field else None
+                wait = check(scope, request, account)
+                if wait:
+                    return throttled_response(request, template, wait, context() if context else None)
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -1,3 +1,4 @@
+import logging
 import re
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import User
@@ -5,41 +6,79 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from .models import Barber, Customer, Reservation, ServiceType, Schedule, WeeklyAvailability
 from django.contrib import messages
-from django.db import IntegrityError
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.validators import EmailValidator
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
 import json
 from django.utils import timezone
 from django.urls import reverse
 from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
 from django.db.models import Q, F, ExpressionWrapper, DateTimeField, DurationField
 from django.template.loader import render_to_string
 import pytz
 # Email sending utility
 from .emails import send_appointment_confirmation_email, send_appointment_cancellation_email
+from .routers import replica_reads
+from . import analytics, archive, calendar_feed, holds, metrics, profiling, rollups, throttle, waitlist
+from .querycache import cached_queryset
+from .catalog import get_catalog, get_catalog_version
+from .pagecache import anonymous_page_cache
+from .partitioning import datetime_bounds
+from .registration import find_conflicts, register_user, users_with_email, validate_phone_number
+from .profiles import PROFILE_BACKEND, ROLE_BARBER, ROLE_CUSTOMER, ROLE_STAFF, get_barber, get_role
 
 #----ADMIN IMPORTS---------
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Q, Sum, Count, Avg
 from .models import Reservation, Barber, Customer, ServiceType
 from django.core.paginator import Paginator
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST, condition
 
+logger = logging.getLogger(__name__)
+
+
+
+# Cached read-mostly querysets (invalidated automatically on write, see querycache.py)
+def _weekly_rules(barber):
+    """Barber's WeeklyAvailability rows keyed by day_of_week"""
+    rules = cached_queryset(
+        f'weekly:{barber.id}',
+        lambda: WeeklyAvailability.objects.filter(barber=barber),
+        depends_on=[WeeklyAvailability],
+    )
+    return {rule.day_of_week: rule for rule in rules}
 
 
 # Landing page
+@replica_reads
+@anonymous_page_cache('landing', depends_on=[ServiceType])
 def landing_view(request):
     """Renders the landing page"""
-    services = ServiceType.objects.all()
+    services = get_catalog()['services']
     context = {"user": request.user, "services": services}
     if request.user.is_authenticated:
         context["is_logged_in"] = True
     return render(request, "landing.html", context)
 
 
+# Catalog API
+@replica_reads
+@condition(etag_func=lambda request: get_catalog_version())
+def catalog_api(request):
+    """Active services and bookable barbers (cached snapshot, ETag = catalog version)"""
+    catalog = get_catalog()
+    return JsonResponse({
+        "success": True,
+        "version": catalog['version'],
+        "services": catalog['services'],
+        "barbers": catalog['barbers'],
+    })
+
+
 # Auth page
 def auth_view(request):
     """Render the merged auth page"""
@@ -80,48 +119,13 @@ def registration_view(request):
         confirm_password = request.POST.get("confirm-password", "")
         role = request.POST.get("role", "")
 
-        errors = []
-
-        if not all([username, email, first_name, last_name, phone_number, password, confirm_password, role]):
-            errors.append("All fields are required.")
-
-        if phone_number:
-            try:
-                clean_phone = validate_phone_number(phone_number)
-            except ValidationError as e:
-                errors.extend(e.messages)
-
-        if password != confirm_password:
-            errors.append("Passwords do not match.")
-
-        if email:
-            try:
-                EmailValidator(message="Enter a valid email address.")(email)
-            except ValidationError:
-                errors.append("Enter a valid email address.")
-
-        if User.objects.filter(username=username).exists():
-            errors.append("Username already taken.")
-        if User.objects.filter(email=email).exists():
-            errors.append("Email already registered.")
-
-        if phone_number:
-            try:
-                clean_phone = validate_phone_number(phone_number)
-                if (Customer.objects.filter(phone_number=clean_phone).exists() or
-                    Barber.objects.filter(phone_number=clean_phone).exists()):
-                    errors.append("Phone number already registered.")
-            except ValidationError:
-                pass
-
-        if password:
-            try:
-                validate_password(password)
-            except ValidationError as e:
-                errors.extend(e.messages)
-
-        if errors:
-            for error in errors:
+        try:
+            user = register_user(
+                username, email, first_name, last_name, phone_number, password, role,
+                confirm_password=confirm_password, require_role=True,
+            )
+        except ValidationError as e:
+            for error in e.messages:
                 messages.error(request, error)
             context = {
                 "show_register": True,
@@ -134,80 +138,70 @@ def registration_view(request):
             }
             return render(request, "auth.html", context)
 
-        try:
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
+        if role == "barber":
+            # Barber was created with default is_approved=False
+            messages.info(request, "Your account is pending admin approval. Please wait to be approved.")
+            # Show waiting page instead of logging in
+            return redirect("waiting_approval")
 
-            clean_phone = validate_phone_number(phone_number)
-
-            if role == "barber":
-                # Create barber with default is_approved=False
-                Barber.objects.create(user=user, phone_number=clean_phone)
-                messages.info(request, "Your account is pending admin approval. Please wait to be approved.")
-                # Show waiting page instead of logging in
-                return redirect("waiting_approval")
-
-            elif role == "customer":
-                Customer.objects.create(user=user, phone_number=clean_phone)
-                login(request, user)
-                messages.success(request, "Registration successful! Welcome!")
-                return redirect("customer_dashboard")
-            else:
-                login(request, user)
-                return redirect("landing")
-
-        except IntegrityError:
-            messages.error(request, "Registration unsuccessful! Please try again.")
-            context = {
-                "show_register": True,
-                "username": username,
-                "email": email,
-                "first_name": first_name,
-                "last_name": last_name,
-                "phone_number": phone_number,
-                "role": role,
-            }
-            return render(request, "auth.html", context)
+        elif role == "customer":
+            login(request, user, backend=PROFILE_BACKEND)
+            messages.success(request, "Registration successful! Welcome!")
+            return redirect("customer_dashboard")
+        else:
+            login(request, user, backend=PROFILE_BACKEND)
+            return redirect("landing")
 
     return render(request, "auth.html", {"show_register": True})
 
 
 # Login
+LOGIN_REDIRECTS = {
+    ROLE_BARBER: "barber_dashboard",
+    ROLE_CUSTOMER: "customer_dashboard",
+    ROLE_STAFF: "admin_dashboard",
+}
+
+
 def login_view(request):
     if request.method == "POST":
         email_or_username = request.POST.get("username", "").strip()
         password = request.POST.get("password", "").strip()
-        
+
+        # Before the user lookup and the password hash
+        wait = throttle.check('login', request, email_or_username)
+        if wait:
+            return throttle.throttled_response(request, "auth.html", wait)
+
         username = email_or_username
         if "@" in email_or_username:
             try:
-                user_obj = User.objects.get(email=email_or_username)
+                user_obj = users_with_email(User.objects.all(), email_or_username).get()
                 username = user_obj.username
             except User.DoesNotExist:
                 pass
 
+        # An email login also counts against the username's bucket
+        if username != email_or_username:
+            wait = throttle.check_account('login', username)
+            if wait:
+                return throttle.throttled_response(request, "auth.html", wait)
+
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
+            # Profiles were loaded with the user (ProfileBackend), so this dispatch is query-free
+            role = get_role(user)
+
             # If user is a barber, check approval
-            if hasattr(user, "barber_profile") and not user.barber_profile.is_approved:
+            if role == ROLE_BARBER and not user.barber_profile.is_approved:
                 messages.info(request, "Your account is pending admin approval.")
                 return render(request, "waiting_for_approval.html", {"user": user})
 
+            throttle.reset('login', email_or_username)
+            throttle.reset('login', username)
             login(request, user)
-            if hasattr(user, "barber_profile"):
-                return redirect("barber_dashboard")
-            elif hasattr(user, "customer_profile"):
-                return redirect("customer_dashboard")
-            elif user.is_staff or user.is_superuser:
-                return redirect("admin_dashboard")
-            else:
-                return redirect("landing")
+            return redirect(LOGIN_REDIRECTS.get(role, "landing"))
         
         messages.error(request, 'Invalid Credentials. Please try again.')
         return redirect('auth')
@@ -217,21 +211,39 @@ def login_view(request):
 
 
 # Helper: Get available slots (bugFix/time-slots: barber time-slots not reflecting on customer dashboard)
-def _get_barber_slots_for_date(barber, date_obj, duration_minutes):
+SLOT_BLOCKING_STATUSES = ['pending', 'confirmed', 'in_progress']
+
+
+def _slot_querysets(barber, date_obj, session_key=None):
     """
-    Get available time slots for a barber on a specific date.
-    Uses WeeklyAvailability (rules) + Schedule (exceptions).
+    Schedule rows, blocking reservations and other sessions' slot holds for
+    the day (shared by the sync and async paths)
+    """
+    day_start, day_end = datetime_bounds(date_obj)
+    schedules = Schedule.objects.filter(barber=barber, date=date_obj).order_by('id')
+    booked = Reservation.objects.filter(
+        barber=barber,
+        status__in=SLOT_BLOCKING_STATUSES,
+        appointment_datetime__gte=day_start,
+        appointment_datetime__lt=day_end
+    )
+    held = holds.active_holds(barber, day_start, day_end, exclude_session=session_key)
+    return schedules, booked, held
+
+
+def _compute_slots(date_obj, duration_minutes, rule, schedules, booked, held=()):
+    """
+    Free start times for the day from already-loaded rows: `rule` is the
+    WeeklyAvailability for the weekday (or None), `schedules` the day's
+    Schedule rows (exceptions), `booked` the blocking reservations and
+    `held` the SlotHolds of other sessions.
     """
     start_time = None
     end_time = None
     slot_duration = 30
 
     # Check for positive override first
-    positive_override = Schedule.objects.filter(
-        barber=barber,
-        date=date_obj,
-        is_available=True
-    ).first()
+    positive_override = next((s for s in schedules if s.is_available), None)
     
     if positive_override:
         start_time = positive_override.start_time
@@ -239,14 +251,7 @@ def _get_barber_slots_for_date(barber, date_obj, duration_minutes):
         slot_duration = positive_override.slot_duration
     else:
         # Fall back to weekly availability
-        day_of_week = date_obj.weekday()
-        rule = WeeklyAvailability.objects.filter(
-            barber=barber,
-            day_of_week=day_of_week,
-            is_available=True
-        ).first()
-        
-        if not rule:
+        if not rule or not rule.is_available:
             return []
         
         start_time = rule.start_time
@@ -269,25 +274,16 @@ def _get_barber_slots_for_date(barber, date_obj, duration_minutes):
     if not potential_slots:
         return []
 
-    # Get blockers - FIXED timezone handling
-    # Use timezone.make_aware instead of localize
-    day_start = timezone.make_aware(datetime.combine(date_obj, datetime.min.time()))
-    day_end = timezone.make_aware(datetime.combine(date_obj, datetime.max.time()))
-
-    # Booked reservations
-    booked = Reservation.objects.filter(
-        barber=barber,
-        status__in=['pending', 'confirmed', 'in_progress'],
-        appointment_datetime__gte=day_start,
-        appointment_datetime__lt=day_end
-    )
-    
     # Negative overrides
-    blockers = Schedule.objects.filter(
-        barber=barber,
-        date=date_obj,
-        is_available=False
-    )
+    blockers = [s for s in schedules if not s.is_available]
+
+    # Reservations and holds, as local [start, end) times
+    local_tz = timezone.get_current_timezone()
+    busy = [
+        (res.appointment_datetime, res.appointment_datetime + timedelta(minutes=res.duration))
+        for res in booked
+    ] + [(hold.start, hold.end) for hold in held]
+    busy = [(start.astimezone(local_tz).time(), end.astimezone(local_tz).time()) for start, end in busy]
 
     # Filter slots
     available_slots = []
@@ -296,11 +292,8 @@ def _get_barber_slots_for_date(barber, date_obj, duration_minutes):
         slot_end = slot_start + timedelta(minutes=duration_minutes)
         is_clear = True
         
-        # Check reservations
-        for res in booked:
-            res_start = res.appointment_datetime.astimezone(timezone.get_current_timezone()).time()
-            res_end = (res.appointment_datetime + timedelta(minutes=res.duration)).astimezone(timezone.get_current_timezone()).time()
-            
+        # Check reservations and holds
+        for res_start, res_end in busy:
             if (slot_time < res_end) and (slot_end.time() > res_start):
                 is_clear = False
                 break
@@ -320,8 +313,38 @@ def _get_barber_slots_for_date(barber, date_obj, duration_minutes):
     return available_slots
 
 
+def _get_barber_slots_for_date(barber, date_obj, duration_minutes, session_key=None):
+    """
+    Get available time slots for a barber on a specific date.
+    Uses WeeklyAvailability (rules) + Schedule (exceptions); slots held by
+    sessions other than `session_key` are unavailable.
+    """
+    schedules, booked, held = _slot_querysets(barber, date_obj, session_key)
+    rule = _weekly_rules(barber).get(date_obj.weekday())
+    return _compute_slots(date_obj, duration_minutes, rule, list(schedules), list(booked), list(held))
+
+
+async def _aget_barber_slots_for_date(barber, date_obj, duration_minutes, session_key=None):
+    """
+    Async version. The async ORM runs each query on the one thread-sensitive
+    sync_to_async executor, so the lookups still run one after another; the
+    event loop is free while they do.
+    """
+    schedules, booked, held = _slot_querysets(barber, date_obj, session_key)
+    rules = await sync_to_async(_weekly_rules)(barber)
+    return _compute_slots(
+        date_obj, duration_minutes, rules.get(date_obj.weekday()),
+        await _alist(schedules), await _alist(booked), await _alist(held),
+    )
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
 
 # API: Get slots
+@replica_reads
 @login_required(login_url='auth')
 def get_available_slots_api(request, barber_id, date_str):
     """API to fetch available time slots"""
@@ -330,23 +353,11 @@ def get_available_slots_api(request, barber_id, date_str):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         duration = int(request.GET.get('duration', 30))
 
-        # DEBUG: Print to console
-        print(f"🔍 DEBUG: Barber ID {barber_id}, Date {date_str}, Duration {duration}")
-        print(f"🔍 Day of week: {date_obj.weekday()} (0=Mon, 1=Tue, ...)")
-        
-        # Check if barber has weekly availability
-        day_of_week = date_obj.weekday()
-        rule = WeeklyAvailability.objects.filter(
-            barber=barber,
-            day_of_week=day_of_week
-        ).first()
-        
-        print(f"🔍 WeeklyAvailability rule: {rule}")
-        if rule:
-            print(f"🔍 Available: {rule.is_available}, Hours: {rule.start_time} - {rule.end_time}")
-
-        slots = _get_barber_slots_for_date(barber, date_obj, duration)
-        print(f"🔍 Generated slots: {slots}")
+        slots = _get_barber_slots_for_date(barber, date_obj, duration, request.session.session_key)
+        logger.debug(
+            "Slots computed",
+            extra={'barber_id': barber.id, 'date': date_str, 'duration': duration, 'slot_count': len(slots)},
+        )
         
         formatted = [t.strftime('%I:%M %p') for t in slots]
         
@@ -355,107 +366,244 @@ def get_available_slots_api(request, barber_id, date_str):
     except ValueError:
         return JsonResponse({"success": False, "error": "Invalid date"}, status=400)
     except Exception as e:
-        print(f"❌ ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Slot lookup failed", extra={'barber_id': barber_id, 'date': date_str})
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+@replica_reads
+@login_required(login_url='auth')
+async def get_available_slots_api_async(request, barber_id, date_str):
+    """ASGI-native version of get_available_slots_api (see SERVER_MODE in settings)"""
+    try:
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        duration = int(request.GET.get('duration', 30))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid date"}, status=400)
+
+    try:
+        barber = await Barber.objects.aget(id=barber_id)
+    except Barber.DoesNotExist:
+        raise Http404("No Barber matches the given query.")
+
+    # session_key comes from the cookie, so reading it doesn't load the session
+    slots = await _aget_barber_slots_for_date(barber, date_obj, duration, request.session.session_key)
+    return JsonResponse({"success": True, "slots": [t.strftime('%I:%M %p') for t in slots]})
+
+
+# API: Hold a slot while the booking form is completed
+@login_required(login_url='auth')
+@require_POST
+def hold_slot_api(request):
+    """Reserve barber/date/time for this session for SLOT_HOLD_SECONDS (see holds.py)"""
+    if request.profile.customer is None:
+        return JsonResponse({"success": False, "error": "Customers only"}, status=403)
+    try:
+        barber = Barber.objects.get(id=int(request.POST['barber_id']), is_active=True)
+        service = ServiceType.objects.get(id=int(request.POST['service_id']), is_active=True)
+        date_obj = datetime.strptime(request.POST['date'], '%Y-%m-%d').date()
+        time_obj = datetime.strptime(request.POST['time'], '%H:%M').time()
+    except (KeyError, ValueError, Barber.DoesNotExist, ServiceType.DoesNotExist):
+        return JsonResponse({"success": False, "error": "Invalid slot"}, status=400)
+
+    start = timezone.make_aware(datetime.combine(date_obj, time_obj))
+    if start <= timezone.now():
+        return JsonResponse({"success": False, "error": "Cannot hold a past slot"}, status=400)
+
+    if not request.session.session_key:
+        request.session.create()
+    session_key = request.session.session_key
+    hold = holds.place_hold(
+        barber, session_key, start, start + timedelta(minutes=service.duration),
+        lambda: time_obj in _get_barber_slots_for_date(barber, date_obj, service.duration, session_key),
+    )
+    if hold is None:
+        return JsonResponse({"success": False, "error": "Time slot not available."}, status=409)
+    return JsonResponse({
+        "success": True,
+        "expires_at": hold.expires_at.isoformat(),
+        "expires_in": holds.hold_seconds(),
+    }, status=201)
+
+
+@login_required(login_url='auth')
+@require_POST
+def release_slot_api(request):
+    """Give up this session's hold (booking form closed)"""
+    holds.release(request.session.session_key)
+    return JsonResponse({"success": True})
+
+
+# API: Join the cancellation waitlist
+@login_required(login_url='auth')
+@require_POST
+def join_waitlist_api(request):
+    """Be emailed when a matching slot is cancelled (see waitlist.py); barber_id 'any' or empty for any barber"""
+    customer = request.profile.customer
+    if customer is None:
+        return JsonResponse({"success": False, "error": "Customers only"}, status=403)
+    try:
+        barber_id = request.POST.get('barber_id', '')
+        barber = None if barber_id in ('', 'any') else Barber.objects.get(id=int(barber_id), is_active=True)
+        service = ServiceType.objects.get(id=int(request.POST['service_id']), is_active=True)
+        date_from = datetime.strptime(request.POST['date_from'], '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.POST.get('date_to') or request.POST['date_from'], '%Y-%m-%d').date()
+    except (KeyError, ValueError, Barber.DoesNotExist, ServiceType.DoesNotExist):
+        return JsonResponse({"success": False, "error": "Invalid waitlist request"}, status=400)
+
+    try:
+        entry = waitlist.join(customer, service, date_from, date_to, barber)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    return JsonResponse({"success": True, "entry_id": entry.id}, status=201)
+
+
+@login_required(login_url='auth')
+@require_POST
+def leave_waitlist_api(request, entry_id):
+    customer = request.profile.customer
+    if customer is None or not waitlist.withdraw(customer, entry_id):
+        return JsonResponse({"success": False, "error": "Waitlist entry not found"}, status=404)
+    return JsonResponse({"success": True})
+
+
+
+# Past bookings: old dates OR finished/rejected statuses
+HISTORY_PAGE_SIZE = 10
+HISTORY_STATUSES = ['cancelled', 'rejected', 'completed', 'no_show']
+
+
+def _past_booking_querysets(customer, now):
+    """
+    The customer's past bookings as two disjoint range queries instead of one
+    OR: everything dated before now (customer, appointment_datetime index), and
+    finished bookings dated later, e.g. cancelled ahead of time (customer,
+    status, appointment_datetime index). archive.customer_history merges them.
+    """
+    mine = Reservation.objects.filter(customer=customer)
+    return [
+        mine.filter(appointment_datetime__lt=now),
+        mine.filter(appointment_datetime__gte=now, status__in=HISTORY_STATUSES),
+    ]
+
 
 # Customer dashboard
+@replica_reads
 @login_required(login_url='auth')
 def customer_dashboard(request):
-    try:
-        customer = request.user.customer_profile
-        now = timezone.now()
-        
-        # FIXED: Include only active upcoming bookings
-        upcoming_bookings = Reservation.objects.filter(
-            customer=customer,
-            appointment_datetime__gte=now,
-            status__in=['pending', 'confirmed']  # Removed 'rescheduled'
-        ).select_related('barber__user', 'service_type').order_by('appointment_datetime')
-        
-        # FIXED: Past bookings include old dates OR finished/rejected statuses
-        past_bookings = Reservation.objects.filter(
-            customer=customer
-        ).filter(
-            Q(appointment_datetime__lt=now) |  # Past dates
-            Q(status__in=['cancelled', 'rejected', 'completed', 'no_show'])  # Or finished statuses
-        ).exclude(
-            # Don't show future appointments that are still pending/confirmed
-            appointment_datetime__gte=now,
-            status__in=['pending', 'confirmed']
-        ).select_related('barber__user', 'service_type').order_by('-appointment_datetime')[:10]
-        
-        services = ServiceType.objects.filter(is_active=True).order_by('name')
-        barbers = Barber.objects.filter(is_active=True, is_available_for_booking=True, is_approved=True ).select_related('user')
-        
-        selected_booking = None
-        reschedule_booking = None
-        rating_booking = None
-        
-        view_id = request.GET.get('view')
-        if view_id:
-            try:
-                selected_booking = Reservation.objects.select_related(
-                    'barber__user', 'service_type'
-                ).get(id=view_id, customer=customer)
-            except Reservation.DoesNotExist:
-                messages.error(request, "Booking not found.")
-        
-        reschedule_id = request.GET.get('reschedule')
-        if reschedule_id:
-            try:
-                reschedule_booking = Reservation.objects.select_related(
-                    'barber__user', 'service_type'
-                ).get(id=reschedule_id, customer=customer)
-                
-                if not reschedule_booking.can_be_cancelled():
-                    messages.error(request, "Cannot reschedule within 24 hours.")
-                    return redirect('customer_dashboard')
-            except Reservation.DoesNotExist:
-                messages.error(request, "Booking not found.")
-                return redirect('customer_dashboard')
-        
-        rate_id = request.GET.get('rate')
-        if rate_id:
-            try:
-                rating_booking = Reservation.objects.select_related(
-                    'barber__user', 'service_type'
-                ).get(id=rate_id, customer=customer)
-                
-                if rating_booking.status != 'completed':
-                    messages.error(request, "Can only rate completed appointments.")
-                    rating_booking = None
-                elif rating_booking.rating is not None:
-                    messages.error(request, "Already rated.")
-                    rating_booking = None
-            except Reservation.DoesNotExist:
-                messages.error(request, "Booking not found.")
-                return redirect('customer_dashboard')
-        
-        show_booking_form = request.GET.get('action') == 'book'
-        
-        context = {
-            'customer': customer,
-            'upcoming_bookings': upcoming_bookings,
-            'past_bookings': past_bookings,
-            'services': services,
-            'barbers': barbers,
-            'now': now,
-            'today': timezone.now().date(),
-            'selected_booking': selected_booking,
-            'reschedule_booking': reschedule_booking,
-            'rating_booking': rating_booking,
-            'show_booking_form': show_booking_form,
-        }
-        
-        return render(request, "customer_dashboard.html", context)
-    except Customer.DoesNotExist:
+    customer = request.profile.customer
+    if customer is None:
         messages.error(request, "Customer profile not found.")
         return redirect("auth")
 
+    now = timezone.now()
+    
+    # FIXED: Include only active upcoming bookings
+    upcoming_bookings = Reservation.objects.filter(
+        customer=customer,
+        appointment_datetime__gte=now,
+        status__in=['pending', 'confirmed']  # Removed 'rescheduled'
+    ).select_related('barber__user', 'service_type').order_by('appointment_datetime')
+    
+    # First page of the history; the rest is loaded on demand (customer_history_api)
+    history = archive.customer_history(customer, _past_booking_querysets(customer, now),
+                                       limit=HISTORY_PAGE_SIZE + 1)
+    past_bookings = history[:HISTORY_PAGE_SIZE]
+    history_cursor = archive.history_cursor(past_bookings[-1]) if len(history) > HISTORY_PAGE_SIZE else None
+    
+    catalog = get_catalog()
+    services = catalog['services']
+    barbers = catalog['barbers']
+    
+    selected_booking = None
+    reschedule_booking = None
+    rating_booking = None
+    
+    view_id = request.GET.get('view')
+    if view_id:
+        try:
+            selected_booking = Reservation.objects.select_related(
+                'barber__user', 'service_type'
+            ).get(id=view_id, customer=customer)
+        except Reservation.DoesNotExist:
+            messages.error(request, "Booking not found.")
+    
+    reschedule_id = request.GET.get('reschedule')
+    if reschedule_id:
+        try:
+            reschedule_booking = Reservation.objects.select_related(
+                'barber__user', 'service_type'
+            ).get(id=reschedule_id, customer=customer)
+            
+            if not reschedule_booking.can_be_cancelled():
+                messages.error(request, "Cannot reschedule within 24 hours.")
+                return redirect('customer_dashboard')
+        except Reservation.DoesNotExist:
+            messages.error(request, "Booking not found.")
+            return redirect('customer_dashboard')
+    
+    rate_id = request.GET.get('rate')
+    if rate_id:
+        try:
+            rating_booking = Reservation.objects.select_related(
+                'barber__user', 'service_type'
+            ).get(id=rate_id, customer=customer)
+            
+            if rating_booking.status != 'completed':
+                messages.error(request, "Can only rate completed appointments.")
+                rating_booking = None
+            elif rating_booking.rating is not None:
+                messages.error(request, "Already rated.")
+                rating_booking = None
+        except Reservation.DoesNotExist:
+            messages.error(request, "Booking not found.")
+            return redirect('customer_dashboard')
+    
+    show_booking_form = request.GET.get('action') == 'book'
+    
+    context = {
+        'customer': customer,
+        'upcoming_bookings': upcoming_bookings,
+        'past_bookings': past_bookings,
+        'history_cursor': history_cursor,
+        'services': services,
+        'barbers': barbers,
+        'now': now,
+        'today': timezone.now().date(),
+        'selected_booking': selected_booking,
+        'reschedule_booking': reschedule_booking,
+        'rating_booking': rating_booking,
+        'show_booking_form': show_booking_form,
+    }
+    
+    return render(request, "customer_dashboard.html", context)
+
+
+# Customer history API ("load more")
+@replica_reads
+@login_required(login_url='auth')
+def customer_history_api(request):
+    """Next page of past bookings after ?cursor=, as rendered rows plus the following cursor"""
+    customer = request.profile.customer
+    if customer is None:
+        return JsonResponse({"success": False, "error": "Not found"}, status=404)
+
+    try:
+        before = archive.parse_history_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        limit = min(max(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), 1), 50)
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid cursor"}, status=400)
+
+    history = archive.customer_history(
+        customer, _past_booking_querysets(customer, timezone.now()), limit=limit + 1, before=before
+    )
+    bookings = history[:limit]
+    return JsonResponse({
+        "success": True,
+        "count": len(bookings),
+        "html": render_to_string("_customer_history_items.html", {"past_bookings": bookings}, request=request),
+        "next_cursor": archive.history_cursor(bookings[-1]) if len(history) > limit else None,
+    })
+
 
 # Create booking (WITH EMAIL CONFIRMATION INTEGRATED)
 @login_required(login_url='auth') 
@@ -466,9 +614,12 @@ def create_booking_view(request):
     
     book_form_url = f"{reverse('customer_dashboard')}?action=book"
     
+    customer = request.profile.customer
+    if customer is None:
+        messages.error(request, 'Customer profile not found.')
+        return redirect('auth')
+
     try:
-        customer = request.user.customer_profile
-        
         service_id = request.POST.get('service_id')
         barber_id = request.POST.get('barber_id')
         appointment_date_str = request.POST.get('appointment_date')
@@ -498,7 +649,8 @@ def create_booking_view(request):
             return redirect(book_form_url)
         
         # Validate slot
-        available_slots = _get_barber_slots_for_date(barber, appointment_date, service.duration)
+        available_slots = _get_barber_slots_for_date(barber, appointment_date, service.duration,
+                                                     request.session.session_key)
         
         if appointment_time not in available_slots:
             messages.error(request, 'Time slot not available.')
@@ -516,6 +668,7 @@ def create_booking_view(request):
             status='pending',
             booking_source='online'
         )
+        holds.release(request.session.session_key)
         
         # ✅ SEND CONFIRMATION EMAIL
         try:
@@ -534,17 +687,14 @@ def create_booking_view(request):
                     f'Booking confirmed! {service.name} with {barber.get_full_name()} '
                     f'on {appointment_datetime.strftime("%B %d, %Y at %I:%M %p")}. '
                     f'(Email notification failed)')
-        except Exception as e:
-            print(f"Email error: {e}")
+        except Exception:
+            logger.warning("Confirmation email failed for reservation %s", reservation.id, exc_info=True)
             messages.success(request, 
                 f'Booking confirmed! {service.name} with {barber.get_full_name()} '
                 f'on {appointment_datetime.strftime("%B %d, %Y at %I:%M %p")}.')
         
         return redirect('customer_dashboard')
     
-    except Customer.DoesNotExist:
-        messages.error(request, 'Customer profile not found.')
-        return redirect('auth')
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
         return redirect(book_form_url)
@@ -559,12 +709,14 @@ def toggle_availability(request):
         try:
             data = json.loads(request.body)
             available = data.get('available', False)
-            barber = Barber.objects.get(user=request.user)
+            barber = request.profile.barber
+            if barber is None:
+                return JsonResponse({"success": False, "error": "Barber not found"}, status=404)
             barber.is_available_for_booking = available
             barber.save()
             return JsonResponse({"success": True, "available": available})
-        except Barber.DoesNotExist:
-            return JsonResponse({"success": False, "error": "Barber not found"}, status=404)
+        except json.JSONDecodeError:
+            return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
     return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
 
 
@@ -574,8 +726,12 @@ def cancel_booking_view(request, booking_id):
     if request.method != 'POST':
         return redirect('customer_dashboard')
     
+    customer = request.profile.customer
+    if customer is None:
+        messages.error(request, 'Customer profile not found.')
+        return redirect('customer_dashboard')
+
     try:
-        customer = request.user.customer_profile
         booking = get_object_or_404(Reservation, id=booking_id, customer=customer)
         
         if not booking.can_be_cancelled():
@@ -605,14 +761,12 @@ def cancel_booking_view(request, booking_id):
                     messages.success(request, 
                         f'Booking cancelled for {service_name}. '
                         f'(Email notification failed)')
-            except Exception as e:
-                print(f"Cancellation email error: {e}")
+            except Exception:
+                logger.warning("Cancellation email failed for reservation %s", booking.id, exc_info=True)
                 messages.success(request, f'Booking cancelled for {service_name}.')
         else:
             messages.error(request, 'Unable to cancel.')
     
-    except Customer.DoesNotExist:
-        messages.error(request, 'Customer profile not found.')
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
     
@@ -625,8 +779,12 @@ def reschedule_booking_view(request, booking_id):
     if request.method != 'POST':
         return redirect('customer_dashboard')
     
+    customer = request.profile.customer
+    if customer is None:
+        messages.error(request, 'Customer profile not found.')
+        return redirect('customer_dashboard')
+
     try:
-        customer = request.user.customer_profile
         booking = get_object_or_404(
             Reservation.objects.select_related('barber__user', 'service_type'),
             id=booking_id,
@@ -654,7 +812,8 @@ def reschedule_booking_view(request, booking_id):
                 return redirect(f"{reverse('customer_dashboard')}?reschedule={booking_id}")
             
             # Validate slot
-            available_slots = _get_barber_slots_for_date(booking.barber, new_date, booking.duration)
+            available_slots = _get_barber_slots_for_date(booking.barber, new_date, booking.duration,
+                                                         request.session.session_key)
             if new_time not in available_slots:
                 messages.error(request, 'Time slot not available.')
                 return redirect(f"{reverse('customer_dashboard')}?reschedule={booking_id}")
@@ -664,6 +823,7 @@ def reschedule_booking_view(request, booking_id):
             # FIXED: Keep status as confirmed/pending instead of 'rescheduled'
             # Status stays the same - no change needed
             booking.save()
+            holds.release(request.session.session_key)
             
             messages.success(request,
                 f'Rescheduled from {old_datetime.strftime("%B %d at %I:%M %p")} '
@@ -671,8 +831,6 @@ def reschedule_booking_view(request, booking_id):
         except ValueError:
             messages.error(request, 'Invalid date/time.')
             return redirect(f"{reverse('customer_dashboard')}?reschedule={booking_id}")
-    except Customer.DoesNotExist:
-        messages.error(request, 'Customer profile not found.')
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
     
@@ -685,8 +843,12 @@ def submit_rating_view(request, booking_id):
     if request.method != 'POST':
         return redirect('customer_dashboard')
 
+    customer = request.profile.customer
+    if customer is None:
+        messages.error(request, 'Customer profile not found.')
+        return redirect('customer_dashboard')
+
     try:
-        customer = request.user.customer_profile
         booking = get_object_or_404(
             Reservation.objects.select_related('barber'),
             id=booking_id,
@@ -715,99 +877,167 @@ def submit_rating_view(request, booking_id):
         messages.success(request, "Rating submitted!")
         return redirect('customer_dashboard')
 
-    except Customer.DoesNotExist:
-        messages.error(request, 'Customer profile not found.')
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
     
     return redirect('customer_dashboard')
 
 
-def _get_barber_dashboard_data(barber):
-    """Get barber dashboard data"""
+def _barber_dashboard_querysets(barber):
+    """Today's, upcoming and this week's bookings (shared by the sync and async paths)"""
     now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
+    # Every date filter below is a constant range on appointment_datetime so
+    # PostgreSQL can prune month partitions (see partitioning.py)
+    today_start, today_end = datetime_bounds(timezone.localdate(now))
     
     all_reservations = Reservation.objects.filter(
         barber=barber
     ).select_related('customer__user', 'service_type').order_by('appointment_datetime')
     
     # Today's appointments
-    today_appointments = all_reservations.filter(
+    today = all_reservations.filter(
         appointment_datetime__gte=today_start,
         appointment_datetime__lt=today_end,
         status__in=['pending', 'confirmed', 'in_progress', 'completed', 'no_show']
     ).order_by('appointment_datetime')
     
     # FIXED: Upcoming appointments - only show pending and confirmed
-    upcoming_appointments = all_reservations.filter(
+    upcoming = all_reservations.filter(
         appointment_datetime__gte=today_end,
         status__in=['pending', 'confirmed']  # Removed 'rescheduled'
     ).order_by('appointment_datetime')
     
-    # Stats
-    stats_today_count = all_reservations.filter(
-        appointment_datetime__gte=today_start,
-        appointment_datetime__lt=today_end,
-        status__in=['pending', 'confirmed', 'in_progress', 'completed']
-    ).count()
-    
-    week_start = today_start - timedelta(days=now.weekday())
-    week_end = week_start + timedelta(days=7)
-    stats_week_count = all_reservations.filter(
+    monday = today_start.date() - timedelta(days=today_start.weekday())
+    week_start, week_end = datetime_bounds(monday, monday + timedelta(days=6))
+    week = all_reservations.filter(
         appointment_datetime__gte=week_start,
         appointment_datetime__lt=week_end,
         status__in=['pending', 'confirmed', 'in_progress', 'completed']
-    ).count()
-    
-    stats_completed_count = all_reservations.filter(status='completed').count()
-    
+    )
+    return today, upcoming, week
+
+
+def _barber_dashboard_context(barber, today_appointments, upcoming_appointments, stats_week_count, stats_completed_count):
     return {
         'barber': barber,
         'today_appointments': today_appointments,
         'upcoming_appointments': upcoming_appointments,
-        'stats_today_count': stats_today_count,
+        # Today's count comes from the rows already loaded
+        'stats_today_count': sum(1 for booking in today_appointments if booking.status != 'no_show'),
         'stats_week_count': stats_week_count,
         'stats_completed_count': stats_completed_count,
     }
 
 
+def _get_barber_dashboard_data(barber):
+    """Get barber dashboard data"""
+    today, upcoming, week = _barber_dashboard_querysets(barber)
+    return _barber_dashboard_context(
+        barber, list(today), upcoming, week.count(), archive.completed_count(barber)
+    )
+
+
+async def _aget_barber_dashboard_data(barber):
+    """Async version (the queries run one after another, see _aget_barber_slots_for_date)"""
+    today, upcoming, week = _barber_dashboard_querysets(barber)
+    return _barber_dashboard_context(
+        barber, await _alist(today), await _alist(upcoming), await week.acount(),
+        await archive.acompleted_count(barber),
+    )
+
+
 
 # Barber dashboard
+@replica_reads
 @login_required(login_url='auth')
 def barber_dashboard(request):
-    try:
-        barber = get_object_or_404(Barber, user=request.user)
-    except Barber.DoesNotExist:
+    barber = request.profile.barber
+    if barber is None:
         messages.error(request, "Barber profile not found.")
         return redirect("auth")
 
     context = _get_barber_dashboard_data(barber)
+    context['calendar_feed_url'] = request.build_absolute_uri(
+        reverse('barber_calendar_feed', args=[calendar_feed.get_token(barber)])
+    )
     return render(request, "barber_dashboard.html", context)
 
 
+# Barber calendar feed (.ics), authenticated by the secret token in the URL
+def _feed_barber_id(request, token):
+    if not hasattr(request, '_feed_barber_id'):
+        request._feed_barber_id = calendar_feed.barber_id_for_token(token)
+    return request._feed_barber_id
+
+
+def _feed_etag(request, token):
+    barber_id = _feed_barber_id(request, token)
+    return calendar_feed.etag(barber_id) if barber_id else None
+
+
+def _feed_last_modified(request, token):
+    barber_id = _feed_barber_id(request, token)
+    return calendar_feed.last_modified(barber_id) if barber_id else None
+
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def barber_calendar_feed(request, token):
+    """Upcoming appointments as iCalendar; polls without changes get a 304"""
+    barber_id = _feed_barber_id(request, token)
+    if barber_id is None:
+        raise Http404("Unknown calendar feed.")
+    response = HttpResponse(calendar_feed.get_feed(barber_id), content_type="text/calendar; charset=utf-8")
+    response['Content-Disposition'] = 'inline; filename="trimly.ics"'
+    return response
+
+
+@login_required(login_url='auth')
+@require_POST
+def reset_calendar_feed(request):
+    """Issue a new feed link (the old one stops working)"""
+    barber = request.profile.barber
+    if barber is None:
+        return redirect('auth')
+    calendar_feed.reset_token(barber)
+    messages.success(request, "Calendar link reset. Subscribe again with the new link.", extra_tags="booking")
+    return redirect('barber_dashboard')
+
+
 # Barber dashboard API
+@replica_reads
 @login_required
 def barber_dashboard_api(request):
     """API for dashboard updates"""
-    try:
-        barber = get_object_or_404(Barber, user=request.user)
-    except Barber.DoesNotExist:
+    barber = request.profile.barber
+    if barber is None:
         return JsonResponse({"success": False, "error": "Not found"}, status=404)
 
     context = _get_barber_dashboard_data(barber)
-    
-    html_stats = render_to_string("_barber_stats.html", context, request=request)
-    html_today_schedule = render_to_string("_barber_today_schedule.html", context, request=request)
-    html_upcoming_table = render_to_string("_barber_upcoming_table.html", context, request=request)
+    return JsonResponse({"success": True, **_render_barber_dashboard_fragments(request, context)})
 
-    return JsonResponse({
-        "success": True,
-        "html_stats": html_stats,
-        "html_today_schedule": html_today_schedule,
-        "html_upcoming_table": html_upcoming_table,
-    })
+
+def _render_barber_dashboard_fragments(request, context):
+    return {
+        "html_stats": render_to_string("_barber_stats.html", context, request=request),
+        "html_today_schedule": render_to_string("_barber_today_schedule.html", context, request=request),
+        "html_upcoming_table": render_to_string("_barber_upcoming_table.html", context, request=request),
+    }
+
+
+@replica_reads
+@login_required
+async def barber_dashboard_api_async(request):
+    """ASGI-native version of barber_dashboard_api (see SERVER_MODE in settings)"""
+    barber = get_barber(await request.auser())
+    if barber is None:
+        return JsonResponse({"success": False, "error": "Not found"}, status=404)
+
+    context = await _aget_barber_dashboard_data(barber)
+    # Templates may touch lazy request attributes (user, messages), so render off the event loop
+    fragments = await sync_to_async(_render_barber_dashboard_fragments)(request, context)
+    return JsonResponse({"success": True, **fragments})
 
 
 # Update booking status
@@ -817,9 +1047,8 @@ def update_booking_status(request, booking_id):
     if request.method != 'POST':
         return redirect('barber_dashboard')
 
-    try:
-        barber = request.user.barber_profile
-    except Barber.DoesNotExist:
+    barber = request.profile.barber
+    if barber is None:
         messages.error(request, "Not authorized.")
         return redirect('auth')
 
@@ -860,8 +1089,12 @@ def barber_reject_booking(request, booking_id):
     if request.method != 'POST':
         return redirect('barber_dashboard')
     
+    barber = request.profile.barber
+    if barber is None:
+        messages.error(request, 'Not authorized.')
+        return redirect('barber_dashboard')
+
     try:
-        barber = request.user.barber_profile
         booking = get_object_or_404(Reservation, id=booking_id)
         
         if booking.barber != barber:
@@ -878,8 +1111,6 @@ def barber_reject_booking(request, booking_id):
         
         messages.success(request, f'Booking #{booking.id} has been rejected.')
         
-    except Barber.DoesNotExist:
-        messages.error(request, 'Not authorized.')
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
     
@@ -889,9 +1120,8 @@ def barber_reject_booking(request, booking_id):
 @login_required(login_url='auth')
 def barber_schedule_view(request):
     """Manage date overrides"""
-    try:
-        barber = request.user.barber_profile
-    except Barber.DoesNotExist:
+    barber = request.profile.barber
+    if barber is None:
         messages.error(request, "Barber profile not found.")
         return redirect('auth')
 
@@ -952,9 +1182,8 @@ def barber_schedule_view(request):
                 if schedule.is_available:
                     bookings = Reservation.objects.filter(
                         barber=barber,
-                        appointment_datetime__date=schedule.date,
-                        appointment_datetime__time__gte=schedule.start_time,
-                        appointment_datetime__time__lt=schedule.end_time,
+                        appointment_datetime__gte=timezone.make_aware(datetime.combine(schedule.date, schedule.start_time)),
+                        appointment_datetime__lt=timezone.make_aware(datetime.combine(schedule.date, schedule.end_time)),
                         status__in=['pending', 'confirmed']
                     ).exists()
 
@@ -988,9 +1217,8 @@ def barber_schedule_view(request):
 @login_required(login_url='auth')
 def manage_weekly_availability(request):
     """Manage weekly template"""
-    try:
-        barber = request.user.barber_profile
-    except Barber.DoesNotExist:
+    barber = request.profile.barber
+    if barber is None:
         messages.error(request, "Barber profile not found.")
         return redirect('auth')
 
@@ -1064,38 +1292,22 @@ def logout_view(request):
     return redirect("auth")
 
 
-# Phone validator
-def validate_phone_number(phone_number):
-    if not phone_number:
-        raise ValidationError("Phone number required.")
-    
-    clean_phone = re.sub(r'[\s\-]', '', phone_number)
-    
-    if not re.match(r'^09[0-9]{9}$', clean_phone):
-        raise ValidationError("Phone must be 09XXXXXXXXX format.")
-    
-    return clean_phone
-
-
-
-
-
 #-------------------------
 #--ADMIN FUNCTIONALITIES--
 #-------------------------
 
+@replica_reads
 @login_required(login_url='auth')
 @staff_member_required(login_url='landing')
 def admin_dashboard_view(request):
     
     # --- Get Main Stats ---
-    total_bookings = Reservation.objects.count()
+    # Booking totals and reports come from the daily rollups (live + archived), not raw rows
+    reports = rollups.report()
+    total_bookings = reports['total_bookings']
     total_customers = Customer.objects.count()
     total_barbers = Barber.objects.count()
-    total_revenue_data = Reservation.objects.filter(status='completed').aggregate(
-        total_revenue=Sum('price')
-    )
-    total_revenue = total_revenue_data.get('total_revenue') or 0.00
+    total_revenue = reports['total_revenue']
     
     # --- Get Barbers (for management & filters) ---
     all_barbers = Barber.objects.all().select_related('user').order_by('user__first_name')
@@ -1122,15 +1334,15 @@ def admin_dashboard_view(request):
     
     
     # Only try to convert dates if the strings are not empty
+    # Aware datetime bounds (not bare dates) keep the range prunable on partitioned storage
     try:
         if filter_start_date:
             start_date_obj = datetime.strptime(filter_start_date, '%Y-%m-%d').date()
-            bookings_list = bookings_list.filter(appointment_datetime__gte=start_date_obj)
+            bookings_list = bookings_list.filter(appointment_datetime__gte=datetime_bounds(start_date_obj)[0])
             
         if filter_end_date:
             end_date_obj = datetime.strptime(filter_end_date, '%Y-%m-%d').date()
-            end_date_inclusive = end_date_obj + timedelta(days=1) 
-            bookings_list = bookings_list.filter(appointment_datetime__lt=end_date_inclusive)
+            bookings_list = bookings_list.filter(appointment_datetime__lt=datetime_bounds(end_date_obj)[1])
     except ValueError:
         messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
     
@@ -1186,9 +1398,60 @@ def admin_dashboard_view(request):
         'all_customers': all_customers,
 
         'filter_params': filter_params,
+        'reports': reports,
     }
     return render(request, "admin_dashboard.html", context)
 
+@staff_member_required(login_url='landing')
+def admin_metrics_view(request):
+    """JSON snapshot of in-process counters and collectors (DB pool, ...)"""
+    return JsonResponse({"success": True, "metrics": metrics.snapshot()})
+
+@staff_member_required(login_url='landing')
+def admin_utilization_api(request):
+    """Barber x weekday x hour utilization for ?start=YYYY-MM-DD&end=YYYY-MM-DD[&barber=<id>]"""
+    today = timezone.localdate()
+    try:
+        end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else today
+        start_date = (
+            datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start')
+            else end_date - timedelta(days=27)
+        )
+        barber_ids = [int(request.GET['barber'])] if request.GET.get('barber') else None
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid date or barber"}, status=400)
+
+    if end_date < start_date or (end_date - start_date).days >= analytics.MAX_RANGE_DAYS:
+        return JsonResponse(
+            {"success": False, "error": f"Range must be 1-{analytics.MAX_RANGE_DAYS} days"}, status=400
+        )
+
+    return JsonResponse({"success": True, **analytics.utilization_matrix(start_date, end_date, barber_ids)})
+
+@staff_member_required(login_url='landing')
+def admin_profiles_view(request):
+    """Saved view profiles (see profiling.py), newest first"""
+    return render(request, "admin_profiles.html", {"profiles": profiling.list_profiles()})
+
+@staff_member_required(login_url='landing')
+def admin_profile_detail_view(request, profile_id):
+    sort = request.GET.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'calls'):
+        sort = 'cumulative'
+    found = profiling.report(profile_id, sort=sort)
+    if found is None:
+        raise Http404("No such profile")
+    profile, stats_text = found
+    return render(request, "admin_profile_detail.html", {"profile": profile, "stats_text": stats_text, "sort": sort})
+
+@staff_member_required(login_url='landing')
+def admin_profile_download(request, profile_id):
+    """The raw .prof file (pstats format), e.g. for snakeviz"""
+    path = profiling.profile_path(profile_id, '.prof')
+    if path is None:
+        raise Http404("No such profile")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
 # -------------------------------
 # ADMIN DASHBOARD - CRUD VIEWS
 # -------------------------------
@@ -1208,36 +1471,7 @@ def admin_create_customer_view(request):
         password = request.POST.get("password")
 
         try:
-            # Validations
-            if not all([username, email, first_name, last_name, phone_number, password]):
-                messages.error(request, "All fields are required.")
-                return redirect('admin_dashboard')
-
-            if User.objects.filter(username=username).exists():
-                messages.error(request, "Username already taken.")
-                return redirect('admin_dashboard')
-            
-            if User.objects.filter(email=email).exists():
-                messages.error(request, "Email already in use.")
-                return redirect('admin_dashboard')
-
-            clean_phone = validate_phone_number(phone_number)
-            if Customer.objects.filter(phone_number=clean_phone).exists():
-                messages.error(request, "Phone number already in use.")
-                return redirect('admin_dashboard')
-
-            validate_password(password) # Check password strength
-
-            # Create User
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
-            # Create Customer Profile
-            Customer.objects.create(user=user, phone_number=clean_phone)
+            register_user(username, email, first_name, last_name, phone_number, password, role="customer")
             messages.success(request, f"Customer '{username}' created successfully.")
 
         except ValidationError as e:
@@ -1248,6 +1482,16 @@ def admin_create_customer_view(request):
     return redirect('admin_dashboard')
 
 
+def _edit_conflict_error(user, email, clean_phone):
+    """Message for an admin edit that would reuse another account's email or phone, else None"""
+    conflicts = find_conflicts(email=email, phone=clean_phone, exclude_user=user)
+    if 'email' in conflicts:
+        return "Email already in use."
+    if 'phone' in conflicts:
+        return "Phone number already in use."
+    return None
+
+
 @staff_member_required(login_url='landing')
 def admin_edit_customer_view(request, user_id):
     if request.method == "POST":
@@ -1265,29 +1509,28 @@ def admin_edit_customer_view(request, user_id):
                 messages.error(request, "All fields are required.")
                 return redirect('admin_dashboard')
 
-            # Check if email is being changed to one that already exists
-            if email != user.email and User.objects.filter(email=email).exists():
-                messages.error(request, "Email already in use.")
-                return redirect('admin_dashboard')
-            
+            # Same rule as registration: a phone number may belong to only one customer or barber
             clean_phone = validate_phone_number(phone_number)
-            # Check if phone is being changed to one that already exists
-            if clean_phone != customer.phone_number and Customer.objects.filter(phone_number=clean_phone).exists():
-                messages.error(request, "Phone number already in use.")
+            error = _edit_conflict_error(user, email, clean_phone)
+            if error:
+                messages.error(request, error)
                 return redirect('admin_dashboard')
 
-            # Update User
-            user.email = email
-            user.first_name = first_name
-            user.last_name = last_name
-            user.save()
-            
-            # Update Customer Profile
-            customer.phone_number = clean_phone
-            customer.save()
+            # User and profile together: a constraint failure on either leaves both unchanged
+            with transaction.atomic():
+                user.email = email
+                user.first_name = first_name
+                user.last_name = last_name
+                user.save()
+
+                customer.phone_number = clean_phone
+                customer.save()
             
             messages.success(request, f"Customer '{user.username}' updated successfully.")
 
+        except IntegrityError:
+            # A concurrent edit or sign-up took the email or phone after the check
+            messages.error(request, "Email or phone number already in use.")
         except ValidationError as e:
             messages.error(request, f"Validation Error: {'. '.join(e.messages)}")
         except Exception as e:
@@ -1329,36 +1572,7 @@ def admin_create_barber_view(request):
         password = request.POST.get("password")
 
         try:
-            # Validations
-            if not all([username, email, first_name, last_name, phone_number, password]):
-                messages.error(request, "All fields are required.")
-                return redirect('admin_dashboard')
-
-            if User.objects.filter(username=username).exists():
-                messages.error(request, "Username already taken.")
-                return redirect('admin_dashboard')
-            
-            if User.objects.filter(email=email).exists():
-                messages.error(request, "Email already in use.")
-                return redirect('admin_dashboard')
-
-            clean_phone = validate_phone_number(phone_number)
-            if Barber.objects.filter(phone_number=clean_phone).exists():
-                messages.error(request, "Phone number already in use.")
-                return redirect('admin_dashboard')
-
-            validate_password(password) # Check password strength
-
-            # Create User
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
-            # Create Barber Profile
-            Barber.objects.create(user=user, phone_number=clean_phone)
+            register_user(username, email, first_name, last_name, phone_number, password, role="barber")
             messages.success(request, f"Barber '{username}' created successfully.")
 
         except ValidationError as e:
@@ -1386,27 +1600,28 @@ def admin_edit_barber_view(request, user_id):
                 messages.error(request, "All fields are required.")
                 return redirect('admin_dashboard')
 
-            if email != user.email and User.objects.filter(email=email).exists():
-                messages.error(request, "Email already in use.")
-                return redirect('admin_dashboard')
-            
+            # Same rule as registration: a phone number may belong to only one customer or barber
             clean_phone = validate_phone_number(phone_number)
-            if clean_phone != barber.phone_number and Barber.objects.filter(phone_number=clean_phone).exists():
-                messages.error(request, "Phone number already in use.")
+            error = _edit_conflict_error(user, email, clean_phone)
+            if error:
+                messages.error(request, error)
                 return redirect('admin_dashboard')
 
-            # Update User
-            user.email = email
-            user.first_name = first_name
-            user.last_name = last_name
-            user.save()
-            
-            # Update Barber Profile
-            barber.phone_number = clean_phone
-            barber.save()
+            # User and profile together: a constraint failure on either leaves both unchanged
+            with transaction.atomic():
+                user.email = email
+                user.first_name = first_name
+                user.last_name = last_name
+                user.save()
+
+                barber.phone_number = clean_phone
+                barber.save()
             
             messages.success(request, f"Barber '{user.username}' updated successfully.")
 
+        except IntegrityError:
+            # A concurrent edit or sign-up took the email or phone after the check
+            messages.error(request, "Email or phone number already in use.")
         except ValidationError as e:
             messages.error(request, f"Validation Error: {'. '.join(e.messages)}")
         except Exception as e:
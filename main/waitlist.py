@@ -0,0 +1,172 @@
+"""
+Cancellation waitlist.
+
+Customers register interest in a service with one barber (or any barber)
+over a window of at most MAX_WINDOW_DAYS days. When a future booking moves
+from an active status to cancelled or rejected (Reservation.cancel(), the
+cancel/status/reject views, the admin), a post_save hook schedules a match
+for after the transaction commits. The match runs on a background worker
+thread so the request that cancelled doesn't wait on it or on the email.
+
+Matching never scans the list: entries are indexed on (barber, status,
+date_from), and because windows are capped, every entry covering day D has
+date_from in the MAX_WINDOW_DAYS days ending on D. A freed slot therefore
+reads two short index ranges (that barber, and "any barber"), each with a
+LIMIT. The oldest compatible entry is claimed with a conditional UPDATE, so
+two workers can't offer the same entry twice, and the customer is emailed.
+An offer is a heads-up, not a reservation: the slot is booked through the
+normal form by whoever gets there first.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+
+from . import holds, metrics
+from .models import Reservation, WaitlistEntry
+from .partitioning import datetime_bounds
+
+logger = logging.getLogger(__name__)
+
+MAX_WINDOW_DAYS = 14
+ACTIVE_STATUSES = ['pending', 'confirmed', 'in_progress']
+FREED_STATUSES = ['cancelled', 'rejected']
+CANDIDATES_PER_BRANCH = 20
+
+_executor = None
+
+
+# -------------------------------
+# ENTRIES
+# -------------------------------
+
+def join(customer, service, date_from, date_to, barber=None):
+    """
+    Add a waiting entry (or return the customer's identical one).
+    Raises ValueError for a past or over-long window.
+    """
+    if date_from < timezone.localdate() or date_to < date_from:
+        raise ValueError("Choose a date range that starts today or later.")
+    if (date_to - date_from).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"The waitlist window can be at most {MAX_WINDOW_DAYS} days.")
+    entry, created = WaitlistEntry.objects.get_or_create(
+        customer=customer, barber=barber, service_type=service,
+        date_from=date_from, date_to=date_to, status='waiting',
+    )
+    if created:
+        metrics.incr('waitlist.joined')
+    return entry
+
+
+def withdraw(customer, entry_id):
+    """Take the customer's waiting entry off the list; returns whether one was found"""
+    return bool(
+        WaitlistEntry.objects.filter(pk=entry_id, customer=customer, status='waiting').update(status='withdrawn')
+    )
+
+
+def candidates(barber_id, start, duration, exclude_customer_id=None):
+    """
+    Waiting entries that fit a free slot, oldest first: the barber's own and
+    any-barber entries covering the slot's day whose service fits in
+    `duration` minutes. Each branch is one bounded range on the
+    (barber, status, date_from) index.
+    """
+    day = timezone.localtime(start).date()
+    base = WaitlistEntry.objects.filter(
+        status='waiting',
+        date_from__gte=day - timedelta(days=MAX_WINDOW_DAYS - 1),
+        date_from__lte=day,
+        date_to__gte=day,
+        service_type__duration__lte=duration,
+    ).exclude(customer_id=exclude_customer_id).select_related('service_type').order_by('created_at', 'id')
+    entries = (
+        list(base.filter(barber_id=barber_id)[:CANDIDATES_PER_BRANCH])
+        + list(base.filter(barber__isnull=True)[:CANDIDATES_PER_BRANCH])
+    )
+    return sorted(entries, key=lambda entry: (entry.created_at, entry.id))
+
+
+def slot_is_free(barber_id, start, end):
+    """No active booking or checkout hold overlaps [start, end) any more"""
+    day_start, _ = datetime_bounds(timezone.localtime(start).date())
+    booked = Reservation.objects.filter(
+        barber_id=barber_id,
+        status__in=ACTIVE_STATUSES,
+        appointment_datetime__gte=day_start,
+        appointment_datetime__lt=end,
+    )
+    if any(starts + timedelta(minutes=minutes) > start
+           for starts, minutes in booked.values_list('appointment_datetime', 'duration')):
+        return False
+    return not holds.active_holds(barber_id, start, end).exists()
+
+
+def offer_slot(barber_id, start, duration, exclude_customer_id=None):
+    """Offer a freed slot to the first compatible entry; returns the entry or None"""
+    from .emails import send_waitlist_offer_email
+
+    for entry in candidates(barber_id, start, duration, exclude_customer_id):
+        end = start + timedelta(minutes=entry.service_type.duration)
+        if not slot_is_free(barber_id, start, end):
+            metrics.incr('waitlist.slot_taken')
+            return None
+        claimed = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(
+            status='offered', offered_at=timezone.now(), offered_barber_id=barber_id, offered_start=start,
+        )
+        if not claimed:
+            continue  # withdrawn or offered by another worker meanwhile
+        entry.refresh_from_db()
+        send_waitlist_offer_email(entry, entry.customer.user.email)
+        metrics.incr('waitlist.offered')
+        return entry
+    metrics.incr('waitlist.no_match')
+    return None
+
+
+# -------------------------------
+# CANCELLATION HOOK
+# -------------------------------
+
+def _run_offer(*args):
+    try:
+        offer_slot(*args)
+    except Exception:
+        logger.exception("Waitlist offer failed")
+    finally:
+        close_old_connections()
+
+
+def _submit(*args):
+    global _executor
+    if not getattr(settings, 'WAITLIST_ASYNC', True):
+        offer_slot(*args)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='waitlist')
+    _executor.submit(_run_offer, *args)
+
+
+def _remember(sender, instance, **kwargs):
+    instance._waitlist_status = instance.__dict__.get('status') if instance.pk else None
+
+
+def _after_save(sender, instance, created=False, raw=False, **kwargs):
+    old_status = getattr(instance, '_waitlist_status', None)
+    instance._waitlist_status = instance.status
+    if raw or created or old_status not in ACTIVE_STATUSES or instance.status not in FREED_STATUSES:
+        return
+    if instance.appointment_datetime <= timezone.now():
+        return
+    args = (instance.barber_id, instance.appointment_datetime, instance.duration, instance.customer_id)
+    transaction.on_commit(lambda: _submit(*args))
+
+
+def install():
+    """Match freed slots against the waitlist; called from MainConfig.ready()"""
+    post_init.connect(_remember, sender=Reservation, dispatch_uid='main.waitlist.init')
+    post_save.connect(_after_save, sender=Reservation, dispatch_uid='main.waitlist.save')
@@ -0,0 +1,9 @@
+set -o errexit
+
+# SERVER_MODE=asgi serves the app with uvicorn workers (async slot/dashboard APIs, see
+# trimly/asgi.py); anything else keeps the default WSGI workers. gunicorn binds to $PORT.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn trimly.asgi:application -k uvicorn.workers.UvicornWorker --workers "${WEB_CONCURRENCY:-2}"
+else
+    exec gunicorn trimly.wsgi:application --workers "${WEB_CONCURRENCY:-2}"
+fi
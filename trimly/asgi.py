@@ -14,3 +14,36 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trimly.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (settings are configured by now)
+
+if settings.ASGI_MODE:
+    # WhiteNoiseMiddleware is sync-only and left out of MIDDLEWARE in this mode, so
+    # static files are answered here before Django's (fully async) handler runs
+    if settings.DEBUG:
+        from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+        application = ASGIStaticFilesHandler(application)
+    else:
+        from asgiref.wsgi import WsgiToAsgi
+        from whitenoise import WhiteNoise
+
+        def not_found(environ, start_response):
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return [b'Not Found']
+
+        django_application = application
+        static_application = WsgiToAsgi(WhiteNoise(
+            not_found,
+            root=settings.STATIC_ROOT,
+            prefix=settings.STATIC_URL,
+            # Hashed names from the manifest storage never change
+            immutable_file_test=r'^.+\.[0-9a-f]{12}\..+$',
+        ))
+        static_prefix = '/' + settings.STATIC_URL.lstrip('/')
+
+        async def application(scope, receive, send):
+            if scope['type'] == 'http' and scope['path'].startswith(static_prefix):
+                await static_application(scope, receive, send)
+            else:
+                await django_application(scope, receive, send)
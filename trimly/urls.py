@@ -3,7 +3,17 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 from main import views
+from main.throttle import throttle_post
+
+# ASGI-native variants of the polling APIs when served by uvicorn (SERVER_MODE=asgi)
+if settings.ASGI_MODE:
+    barber_dashboard_api = views.barber_dashboard_api_async
+    get_available_slots_api = views.get_available_slots_api_async
+else:
+    barber_dashboard_api = views.barber_dashboard_api
+    get_available_slots_api = views.get_available_slots_api
 from django.contrib.auth import views as auth_views
+from django.contrib.auth.forms import PasswordResetForm
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -24,11 +34,16 @@ urlpatterns = [
     # Password Reset - All Django Built-in
     path(
         "password-reset/",
-        auth_views.PasswordResetView.as_view(
-            template_name="registration/password_reset_form.html",
-            email_template_name="registration/password_reset_email.html",  # <-- custom email body template
-            subject_template_name="registration/password_reset_subject.txt",  # <-- custom subject template
-            html_email_template_name="registration/password_reset_email.html",  # optional for HTML emails, same as above if styled
+        throttle_post(
+            "password_reset", "registration/password_reset_form.html", account_field="email",
+            context=lambda: {"form": PasswordResetForm()},
+        )(
+            auth_views.PasswordResetView.as_view(
+                template_name="registration/password_reset_form.html",
+                email_template_name="registration/password_reset_email.html",  # <-- custom email body template
+                subject_template_name="registration/password_reset_subject.txt",  # <-- custom subject template
+                html_email_template_name="registration/password_reset_email.html",  # optional for HTML emails, same as above if styled
+            )
         ),
         name="password_reset",
     ),
@@ -48,12 +63,15 @@ urlpatterns = [
     
     # Customer & Barber Dashboards
     path("dashboard/customer/", views.customer_dashboard, name="customer_dashboard"),
+    path("dashboard/customer/history/", views.customer_history_api, name="customer_history_api"),
     path("dashboard/barber/", views.barber_dashboard, name="barber_dashboard"),
     path('dashboard/barber/toggle-availability/', views.toggle_availability, name='toggle_availability'),
-    path('dashboard/barber/api/', views.barber_dashboard_api, name='barber_dashboard_api'),
+    path('dashboard/barber/api/', barber_dashboard_api, name='barber_dashboard_api'),
     path('dashboard/barber/schedule/', views.barber_schedule_view, name='barber_schedule'),
     path('dashboard/barber/availability/', views.manage_weekly_availability, name='manage_weekly_availability'),
     path('dashboard/barber/quick-actions/', views.quick_actions_view, name='quick_actions'),
+    path('dashboard/barber/calendar/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
+    path('calendar/<str:token>.ics', views.barber_calendar_feed, name='barber_calendar_feed'),
     
     # Booking actions
     path("bookings/create/", views.create_booking_view, name="create_booking"),
@@ -61,12 +79,22 @@ urlpatterns = [
     path("bookings/<int:booking_id>/reschedule/", views.reschedule_booking_view, name="reschedule_booking"),
     path("bookings/<int:booking_id>/update-status/", views.update_booking_status, name="update_booking_status"),
     path("bookings/<int:booking_id>/rate/", views.submit_rating_view, name="submit_rating"),
-    path('api/get-slots/<int:barber_id>/<str:date_str>/', views.get_available_slots_api, name='get_available_slots_api'),
+    path('api/get-slots/<int:barber_id>/<str:date_str>/', get_available_slots_api, name='get_available_slots_api'),
+    path('api/slot-holds/', views.hold_slot_api, name='hold_slot_api'),
+    path('api/slot-holds/release/', views.release_slot_api, name='release_slot_api'),
+    path('api/waitlist/', views.join_waitlist_api, name='join_waitlist_api'),
+    path('api/waitlist/<int:entry_id>/leave/', views.leave_waitlist_api, name='leave_waitlist_api'),
+    path('api/catalog/', views.catalog_api, name='catalog_api'),
     path('bookings/<int:booking_id>/reject/', views.barber_reject_booking, name='reject_booking'),
 
 
     #-------ADMIN URL-------
     path('admin-dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
+    path('admin-dashboard/metrics/', views.admin_metrics_view, name='admin_metrics'),
+    path('admin-dashboard/analytics/utilization/', views.admin_utilization_api, name='admin_utilization_api'),
+    path('admin-dashboard/profiles/', views.admin_profiles_view, name='admin_profiles'),
+    path('admin-dashboard/profiles/<str:profile_id>/', views.admin_profile_detail_view, name='admin_profile_detail'),
+    path('admin-dashboard/profiles/<str:profile_id>/download/', views.admin_profile_download, name='admin_profile_download'),
     path('admin-dashboard/customer/create/', views.admin_create_customer_view, name='admin_create_customer'),
     path('admin-dashboard/customer/edit/<int:user_id>/', views.admin_edit_customer_view, name='admin_edit_customer'),
     path('admin-dashboard/customer/delete/<int:user_id>/', views.admin_delete_customer_view, name='admin_delete_customer'),